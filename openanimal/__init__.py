@@ -3,9 +3,26 @@
 __all__ = [
     "agent",
     "archive",
+    "backend",
+    "batch",
+    "cache",
+    "checkpoint",
+    "codec",
     "config",
     "expression",
+    "feed",
+    "files",
+    "indexes",
+    "json_backend",
+    "metrics",
     "memory",
+    "parallel",
+    "phrases",
+    "records",
+    "rng",
+    "scheduler",
+    "segments",
+    "sqlite_backend",
     "storage",
     "timeline",
     "world",
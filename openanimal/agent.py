@@ -3,8 +3,11 @@
 from __future__ import annotations
 
 import random
+import sys
 import time
 import uuid
+from array import array
+from collections.abc import MutableMapping
 from dataclasses import dataclass, field
 
 from .config import (
@@ -32,28 +35,78 @@ from .config import (
 )
 from .expression import generate_expression
 from .memory import MemoryStore
+from .rng import Rng, tick_rng
 from .timeline import Timeline
 from .world import WorldSignals
 
 
+_STATE_OFFSETS = {key: offset for offset, key in enumerate(STATE_KEYS)}
+_AROUSAL, _CURIOSITY, _FATIGUE, _SOCIAL = (
+    _STATE_OFFSETS[key] for key in ("arousal", "curiosity", "fatigue", "social_tolerance")
+)
+
+
 def _clamp(value: float, bounds: tuple[float, float]) -> float:
     return max(bounds[0], min(bounds[1], value))
 
 
-@dataclass
+class AgentState(MutableMapping):
+    """Internal state as floats at fixed offsets (`STATE_KEYS` order).
+
+    Reads and writes by key like the dict it replaces; `values` is the
+    underlying array for code that works on all keys at once.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, values=()) -> None:
+        self.values = array("d", values)
+        if len(self.values) != len(STATE_KEYS):
+            raise ValueError(f"expected {len(STATE_KEYS)} state values, got {len(self.values)}")
+
+    @classmethod
+    def from_mapping(cls, state) -> "AgentState":
+        return cls(state[key] for key in STATE_KEYS)
+
+    def __getitem__(self, key: str) -> float:
+        return self.values[_STATE_OFFSETS[key]]
+
+    def __setitem__(self, key: str, value: float) -> None:
+        self.values[_STATE_OFFSETS[key]] = value
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("state keys are fixed")
+
+    def __iter__(self):
+        return iter(STATE_KEYS)
+
+    def __len__(self) -> int:
+        return len(STATE_KEYS)
+
+    def __repr__(self) -> str:
+        return f"AgentState({dict(self)!r})"
+
+
+@dataclass(slots=True)
+class Encounter:
+    score: float
+    last_tick: int
+
+
+@dataclass(slots=True)
 class LifeAgent:
     animal_id: str
     created_at: float
     age_ticks: int
     phase: str
-    state: dict[str, float]
+    state: AgentState
     pressure: float
     tolerance: float
     last_expression_tick: int
     species: str
     slug: str
     temperament: list[str]
-    encounters: dict[str, dict]
+    encounters: dict[str, Encounter]
     silent_until_tick: int = 0
     missing_until_tick: int = 0
     memory: MemoryStore = field(default_factory=MemoryStore)
@@ -61,10 +114,20 @@ class LifeAgent:
     rng_seed: int = field(default_factory=lambda: random.randint(0, 1_000_000))
     creator: str = ""
 
+    def __post_init__(self) -> None:
+        # Records and callers may still pass the plain dict layouts. Encounter
+        # keys are interned: across a population they name the same animals.
+        if not isinstance(self.state, AgentState):
+            self.state = AgentState.from_mapping(self.state)
+        self.encounters = {
+            sys.intern(other_id): encounter if isinstance(encounter, Encounter) else Encounter(**encounter)
+            for other_id, encounter in self.encounters.items()
+        }
+
     @classmethod
     def birth(cls, creator: str = "") -> "LifeAgent":
         rng = random.Random()
-        state = {key: rng.uniform(0.25, 0.75) for key in STATE_KEYS}
+        state = AgentState(rng.uniform(0.25, 0.75) for _ in STATE_KEYS)
         tolerance = _clamp(
             PRESSURE_TOLERANCE_BASE + rng.uniform(-PRESSURE_TOLERANCE_VARIANCE, PRESSURE_TOLERANCE_VARIANCE),
             (0.35, 0.95),
@@ -99,56 +162,62 @@ class LifeAgent:
         else:
             self.phase = "infant"
 
-    def _drift_state(self, world: WorldSignals, rng: random.Random) -> None:
-        for key in STATE_KEYS:
+    def _drift_state(self, world: WorldSignals, rng: Rng) -> None:
+        # On the state array directly; offsets follow STATE_KEYS.
+        values = self.state.values
+        for offset, key in enumerate(STATE_KEYS):
             drift = STATE_DRIFT[key] * rng.uniform(-1.0, 1.0)
-            self.state[key] = _clamp(self.state[key] + drift, STATE_BOUNDS)
+            values[offset] = _clamp(values[offset] + drift, STATE_BOUNDS)
 
-        self.state["arousal"] = _clamp(
-            self.state["arousal"] + (0.03 * world.environmental_noise) - (0.02 * self.state["fatigue"]),
+        arousal, curiosity, fatigue, social = values
+        values[_AROUSAL] = _clamp(
+            arousal + (0.03 * world.environmental_noise) - (0.02 * fatigue),
             STATE_BOUNDS,
         )
-        self.state["curiosity"] = _clamp(
-            self.state["curiosity"] + (0.02 * world.light_level) - (0.01 * self.state["fatigue"]),
+        values[_CURIOSITY] = _clamp(
+            curiosity + (0.02 * world.light_level) - (0.01 * fatigue),
             STATE_BOUNDS,
         )
-        self.state["fatigue"] = _clamp(
-            self.state["fatigue"] + (0.02 * world.environmental_noise) - (0.015 * world.light_level),
+        values[_FATIGUE] = _clamp(
+            fatigue + (0.02 * world.environmental_noise) - (0.015 * world.light_level),
             STATE_BOUNDS,
         )
-        self.state["social_tolerance"] = _clamp(
-            self.state["social_tolerance"] + (0.01 * world.light_level) - (0.02 * world.environmental_noise),
+        values[_SOCIAL] = _clamp(
+            social + (0.01 * world.light_level) - (0.02 * world.environmental_noise),
             STATE_BOUNDS,
         )
 
     def _pressure_from_state(self) -> float:
-        drive = self.state["arousal"] + self.state["curiosity"]
-        inhibition = self.state["fatigue"] + (1.0 - self.state["social_tolerance"])
+        arousal, curiosity, fatigue, social = self.state.values
+        drive = arousal + curiosity
+        inhibition = fatigue + (1.0 - social)
         return min(1.0, max(0.0, (drive - inhibition + 1.0) / 3.0))
 
     def _decay_encounters(self) -> None:
         if not self.encounters:
             return
-        for other_id in list(self.encounters.keys()):
-            self.encounters[other_id]["score"] *= ENCOUNTER_DECAY
-            if self.encounters[other_id]["score"] < 0.02:
-                self.encounters.pop(other_id, None)
+        for other_id, encounter in list(self.encounters.items()):
+            encounter.score *= ENCOUNTER_DECAY
+            if encounter.score < 0.02:
+                del self.encounters[other_id]
 
-    def _observe_other(self, rng: random.Random, recent_feed: list[dict]) -> None:
+    def _observe_other(self, rng: Rng, recent_feed: list[dict]) -> None:
         if not recent_feed:
             return
         weights = []
         for entry in recent_feed:
             other_id = entry.get("animal_id") or ""
-            score = self.encounters.get(other_id, {}).get("score", 0.1)
-            weights.append(max(0.05, score))
+            encounter = self.encounters.get(other_id)
+            weights.append(max(0.05, encounter.score if encounter is not None else 0.1))
         other = rng.choices(recent_feed, weights=weights, k=1)[0]
         other_id = other.get("animal_id") or ""
         if not other_id:
             return
-        record = self.encounters.setdefault(other_id, {"score": 0.1, "last_tick": self.age_ticks})
-        record["score"] = min(1.0, record["score"] + ENCOUNTER_BOOST)
-        record["last_tick"] = self.age_ticks
+        encounter = self.encounters.get(other_id)
+        if encounter is None:
+            encounter = self.encounters[sys.intern(other_id)] = Encounter(0.1, self.age_ticks)
+        encounter.score = min(1.0, encounter.score + ENCOUNTER_BOOST)
+        encounter.last_tick = self.age_ticks
         if other.get("sentences") and rng.random() < 0.45:
             snippet = rng.choice(other["sentences"])
             self.memory.reinforce(snippet, valence=rng.uniform(-0.2, 0.25), tick=self.age_ticks)
@@ -159,7 +228,16 @@ class LifeAgent:
     def tick(
         self, world: WorldSignals, recent_feed: list[dict] | None = None
     ) -> list[str] | None:
-        rng = random.Random(self.rng_seed + self.age_ticks)
+        rng = tick_rng(self.rng_seed, self.age_ticks)
+        self.advance(world, rng)
+        return self.act(world, rng, recent_feed)
+
+    def advance(self, world: WorldSignals, rng: Rng) -> None:
+        """Deterministic part of a tick: ageing, state drift, decay and pressure.
+
+        `batch.BatchTicker` performs the same steps for many agents at once and
+        must be kept in step with this method.
+        """
         self.age_ticks += 1
         self._update_phase()
 
@@ -173,7 +251,28 @@ class LifeAgent:
             (0.0, 1.2),
         )
 
-        if self.age_ticks < self.silent_until_tick or self.age_ticks < self.missing_until_tick:
+    def is_dormant(self) -> bool:
+        """Silent or missing this tick: the agent does nothing after advancing."""
+        return self.age_ticks < self.silent_until_tick or self.age_ticks < self.missing_until_tick
+
+    def in_cooldown(self) -> bool:
+        """Too soon after the last expression to observe or express this tick."""
+        return self.age_ticks - self.last_expression_tick < EXPRESSION_COOLDOWN_TICKS
+
+    def next_active_tick(self) -> int:
+        """First age at which a tick may read or add to the feed.
+
+        Ticks before it are dormant or in cooldown: they only advance the agent
+        and may roll a rare event, without looking at other animals.
+        """
+        cooldown_end = self.last_expression_tick + EXPRESSION_COOLDOWN_TICKS
+        return max(self.silent_until_tick, self.missing_until_tick, cooldown_end)
+
+    def act(
+        self, world: WorldSignals, rng: Rng, recent_feed: list[dict] | None = None
+    ) -> list[str] | None:
+        """Rare events and the action roll, continuing the tick's `rng` stream."""
+        if self.is_dormant():
             return None
 
         if rng.random() < RARE_EVENT_PROB:
@@ -194,7 +293,7 @@ class LifeAgent:
             elif event_roll < disappear_cutoff:
                 self.missing_until_tick = self.age_ticks + rng.randint(20, 120)
 
-        if self.age_ticks - self.last_expression_tick < EXPRESSION_COOLDOWN_TICKS:
+        if self.in_cooldown():
             return None
 
         roll = rng.random()
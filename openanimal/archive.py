@@ -18,8 +18,9 @@ def create_snapshot(agent: LifeAgent) -> ArchiveSnapshot:
     prominent = [mem.text for mem in agent.memory.most_salient(limit=3)]
     summary = (
         f"Phase: {agent.phase}. "
-        f"Energy {agent.state['energy']:.2f}, "
-        f"Comfort {agent.state['comfort']:.2f}, "
-        f"Stress {agent.state['stress']:.2f}."
+        f"Arousal {agent.state['arousal']:.2f}, "
+        f"Curiosity {agent.state['curiosity']:.2f}, "
+        f"Fatigue {agent.state['fatigue']:.2f}, "
+        f"Social tolerance {agent.state['social_tolerance']:.2f}."
     )
     return ArchiveSnapshot(tick=agent.age_ticks, summary=summary, memory_fragments=prominent)
@@ -16,6 +16,7 @@ from .env import (
     get_supabase_anon_key,
     get_supabase_url,
 )
+from .files import atomic_write_text
 from .storage import DATA_ROOT
 
 USERS_FILE = DATA_ROOT / "users.json"
@@ -40,7 +41,7 @@ def _load_users() -> list[dict]:
 
 def _save_users(users: list[dict]) -> None:
     DATA_ROOT.mkdir(parents=True, exist_ok=True)
-    USERS_FILE.write_text(json.dumps({"users": users}, indent=2), encoding="utf-8")
+    atomic_write_text(USERS_FILE, json.dumps({"users": users}, indent=2))
 
 
 def _load_sessions() -> dict[str, str]:
@@ -55,7 +56,7 @@ def _load_sessions() -> dict[str, str]:
 
 def _save_sessions(tokens: dict[str, str]) -> None:
     DATA_ROOT.mkdir(parents=True, exist_ok=True)
-    SESSIONS_FILE.write_text(json.dumps({"tokens": tokens}, indent=2), encoding="utf-8")
+    atomic_write_text(SESSIONS_FILE, json.dumps({"tokens": tokens}, indent=2))
 
 
 def register(username: str, password: str) -> tuple[str, str] | tuple[None, str]:
@@ -0,0 +1,87 @@
+"""Storage backend interface for OpenAnimal."""
+
+from __future__ import annotations
+
+from .agent import LifeAgent
+from .archive import ArchiveSnapshot
+from .records import AgentView
+from .timeline import TimelineLoader
+
+
+class AgentNotFoundError(FileNotFoundError):
+    """Raised when an animal id has no stored record."""
+
+
+class StorageBackend:
+    """Operations every storage engine must provide."""
+
+    name = "base"
+
+    def save_agent(self, agent: LifeAgent) -> None:
+        raise NotImplementedError
+
+    def save_agents(self, agents: list[LifeAgent]) -> None:
+        """Save several agents; backends may override to batch the writes."""
+        for agent in agents:
+            self.save_agent(agent)
+
+    def load_agent(self, animal_id: str, fields: tuple[str, ...] | None = None) -> LifeAgent | AgentView:
+        """Load an agent, or only the named `fields` of it as an AgentView."""
+        raise NotImplementedError
+
+    def timeline_loader(self, animal_id: str) -> TimelineLoader:
+        """Loader for the stored timeline entries of a record decoded elsewhere (e.g. a checkpoint)."""
+        raise NotImplementedError
+
+    def generation(self, animal_id: str) -> int | None:
+        """Token that changes whenever the stored agent changes (None if missing)."""
+        raise NotImplementedError
+
+    def list_agents(
+        self, creator: str | None = None, species: str | None = None, phase: str | None = None
+    ) -> list[str]:
+        """Animal ids, optionally filtered by creator, species and/or phase."""
+        raise NotImplementedError
+
+    def get_recent_feed(self, exclude_animal_id: str | None = None, limit: int = 15) -> list[dict]:
+        raise NotImplementedError
+
+    def list_public_feed(self, limit: int | None = None) -> list[dict]:
+        raise NotImplementedError
+
+    def find_agent_by_slug(
+        self, slug: str, fields: tuple[str, ...] | None = None
+    ) -> LifeAgent | AgentView | None:
+        raise NotImplementedError
+
+    def save_archive(self, animal_id: str, snapshot: ArchiveSnapshot) -> None:
+        raise NotImplementedError
+
+    def checkpoint_state(self) -> dict:
+        """JSON-compatible index state worth keeping in a checkpoint (see `checkpoint`)."""
+        return {}
+
+    def restore_state(self, state: dict) -> None:
+        """Adopt index state from `checkpoint_state`, where it is still current."""
+
+    def open_args(self) -> dict:
+        """Keyword arguments for `storage.open_backend` that open this same store.
+
+        Used to reopen the backend in worker processes.
+        """
+        raise NotImplementedError
+
+    def migrate(self) -> int:
+        """Rewrite every stored agent in the current record layout.
+
+        Agents are loaded and saved one at a time; backends override this to
+        skip records that are already current. Returns the number rewritten.
+        """
+        migrated = 0
+        for animal_id in self.list_agents():
+            self.save_agent(self.load_agent(animal_id))
+            migrated += 1
+        return migrated
+
+    def close(self) -> None:
+        """Release any open handles."""
@@ -0,0 +1,188 @@
+"""Struct-of-arrays tick engine for a sample of agents."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from typing import Callable
+
+from .agent import LifeAgent
+from .archive import ArchiveSnapshot, create_snapshot
+from .config import (
+    ARCHIVE_INTERVAL_TICKS,
+    PHASE_THRESHOLDS,
+    PRESSURE_BASE_GROWTH,
+    STATE_BOUNDS,
+    STATE_DRIFT,
+    STATE_KEYS,
+)
+from .feed import RecentFeed
+from .records import feed_item
+from .rng import GOLDEN_GAMMA, Rng, TickRandom, tick_rng_factory, tick_state, uniform_block
+from .world import WorldSignals
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the `array` path gives the same results.
+    np = None
+
+_DRIFT = tuple(STATE_DRIFT[key] for key in STATE_KEYS)
+_PHASES = sorted(PHASE_THRESHOLDS.items(), key=lambda item: item[1])
+_PHASE_NAMES = [name for name, _ in _PHASES]
+_PHASE_STARTS = [start for _, start in _PHASES]
+_LOW, _HIGH = STATE_BOUNDS
+
+
+class BatchTicker:
+    """Runs `LifeAgent.advance` for many agents in one pass.
+
+    The only per-agent Python work left is what is inherently per agent:
+    starting each agent's tick RNG (its stream must match the scalar path
+    exactly), decaying non-empty memories and encounters, and writing the
+    results back. Drift, the world terms, clamps, pressure and phase are
+    computed column-wise, with NumPy when it is installed and over typed
+    arrays otherwise; with NumPy the drift draws of `TickRandom` streams are
+    computed column-wise too. All paths give the same floats as `LifeAgent.tick`.
+    """
+
+    def __init__(self, use_numpy: bool | None = None, rng_kind: str | None = None) -> None:
+        self.use_numpy = np is not None and (use_numpy is None or use_numpy)
+        self.make_rng = tick_rng_factory(rng_kind)
+
+    def advance(self, agents: list[LifeAgent], worlds: list[WorldSignals]) -> list[Rng]:
+        """Advance every agent by one tick; returns the RNGs to continue with `act`."""
+        if not agents:
+            return []
+        if self.use_numpy and self.make_rng is TickRandom:
+            starts = [tick_state(agent.rng_seed, agent.age_ticks) for agent in agents]
+            # Same arithmetic as rng.uniform(-1.0, 1.0) on each stream's first four draws.
+            draws = (-1.0 + 2.0 * uniform_block(starts, 4)).ravel()
+            skip = 4 * GOLDEN_GAMMA
+            rngs: list[Rng] = [TickRandom.from_state(start + skip) for start in starts]
+        else:
+            make_rng = self.make_rng
+            rngs = []
+            draws = array("d")
+            for agent in agents:
+                rng = make_rng(agent.rng_seed, agent.age_ticks)
+                r = rng.random
+                # Same arithmetic as rng.uniform(-1.0, 1.0), without the call overhead.
+                draws.extend((-1.0 + 2.0 * r(), -1.0 + 2.0 * r(), -1.0 + 2.0 * r(), -1.0 + 2.0 * r()))
+                rngs.append(rng)
+        conflicts = array("d")
+        for agent in agents:
+            agent.age_ticks += 1
+            memory = agent.memory
+            if len(memory):
+                memory.decay(agent.age_ticks)
+                conflicts.append(memory.conflict_score())
+            else:
+                conflicts.append(0.0)
+            if agent.encounters:
+                agent._decay_encounters()
+
+        states = [agent.state.values for agent in agents]
+        pressures = array("d", [agent.pressure for agent in agents])
+        lights = array("d", [world.light_level for world in worlds])
+        noises = array("d", [world.environmental_noise for world in worlds])
+        ages = [agent.age_ticks for agent in agents]
+        if self.use_numpy:
+            columns = _advance_numpy(states, draws, pressures, lights, noises, conflicts, ages)
+        else:
+            columns = _advance_arrays(states, draws, pressures, lights, noises, conflicts, ages)
+
+        # Columns come in `STATE_KEYS` order, the layout of `AgentState.values`.
+        for agent, arousal, curiosity, fatigue, social, pressure, phase in zip(agents, *columns):
+            values = agent.state.values
+            values[0] = arousal
+            values[1] = curiosity
+            values[2] = fatigue
+            values[3] = social
+            agent.pressure = pressure
+            agent.phase = phase
+        return rngs
+
+
+def tick_agents(
+    agents: list[LifeAgent],
+    worlds: list[WorldSignals],
+    ticker: BatchTicker,
+    recent_feed: RecentFeed,
+    save_archive: Callable[[str, ArchiveSnapshot], None],
+) -> list[dict]:
+    """One simulator tick for `agents`, in order; returns feed items of new expressions.
+
+    `worlds` holds each agent's signals for the tick. Each expression is added
+    to `recent_feed` as it happens, so later agents in the list can react to it.
+    """
+    rngs = ticker.advance(agents, worlds)
+    produced: list[dict] = []
+    for agent, signals, rng in zip(agents, worlds, rngs):
+        if not agent.is_dormant():
+            # Pass recent expressions from other animals so this one can
+            # interact; an agent in cooldown stops before it would look.
+            recent = None if agent.in_cooldown() else recent_feed.view(exclude_animal_id=agent.animal_id)
+            if agent.act(signals, rng, recent_feed=recent):
+                item = feed_item(agent.animal_id, agent.timeline.last)
+                recent_feed.add(item)
+                produced.append(item)
+        if agent.age_ticks % ARCHIVE_INTERVAL_TICKS == 0:
+            save_archive(agent.animal_id, create_snapshot(agent))
+    return produced
+
+
+def _advance_arrays(states, draws, pressures, lights, noises, conflicts, ages):
+    # Clamps are spelled as conditional expressions: the same result as
+    # max(low, min(high, v)) for finite values, without two calls each.
+    low, high = _LOW, _HIGH
+    d0, d1, d2, d3 = _DRIFT
+    arousals, curiosities, fatigues, socials = array("d"), array("d"), array("d"), array("d")
+    out_pressures = array("d")
+    for i, (a, c, f, s) in enumerate(states):
+        j = 4 * i
+        a += d0 * draws[j]
+        a = low if a < low else high if a > high else a
+        c += d1 * draws[j + 1]
+        c = low if c < low else high if c > high else c
+        f += d2 * draws[j + 2]
+        f = low if f < low else high if f > high else f
+        s += d3 * draws[j + 3]
+        s = low if s < low else high if s > high else s
+        light, noise = lights[i], noises[i]
+        a = a + (0.03 * noise) - (0.02 * f)
+        a = low if a < low else high if a > high else a
+        c = c + (0.02 * light) - (0.01 * f)
+        c = low if c < low else high if c > high else c
+        f = f + (0.02 * noise) - (0.015 * light)
+        f = low if f < low else high if f > high else f
+        s = s + (0.01 * light) - (0.02 * noise)
+        s = low if s < low else high if s > high else s
+        from_state = ((a + c) - (f + (1.0 - s)) + 1.0) / 3.0
+        from_state = 0.0 if from_state < 0.0 else 1.0 if from_state > 1.0 else from_state
+        pressure = pressures[i] + PRESSURE_BASE_GROWTH + from_state + conflicts[i] * 0.05
+        pressure = 0.0 if pressure < 0.0 else 1.2 if pressure > 1.2 else pressure
+        arousals.append(a)
+        curiosities.append(c)
+        fatigues.append(f)
+        socials.append(s)
+        out_pressures.append(pressure)
+    phases = [_PHASE_NAMES[bisect_right(_PHASE_STARTS, age) - 1] for age in ages]
+    return arousals, curiosities, fatigues, socials, out_pressures, phases
+
+
+def _advance_numpy(states, draws, pressures, lights, noises, conflicts, ages):
+    low, high = _LOW, _HIGH
+    state = np.array(states, dtype=np.float64).reshape(-1, 4)
+    state = np.maximum(low, np.minimum(high, state + np.array(_DRIFT) * np.asarray(draws, dtype=np.float64).reshape(-1, 4)))
+    a, c, f, s = state.T
+    light, noise = np.frombuffer(lights), np.frombuffer(noises)
+    a = np.maximum(low, np.minimum(high, a + (0.03 * noise) - (0.02 * f)))
+    c = np.maximum(low, np.minimum(high, c + (0.02 * light) - (0.01 * f)))
+    f = np.maximum(low, np.minimum(high, f + (0.02 * noise) - (0.015 * light)))
+    s = np.maximum(low, np.minimum(high, s + (0.01 * light) - (0.02 * noise)))
+    from_state = np.minimum(1.0, np.maximum(0.0, ((a + c) - (f + (1.0 - s)) + 1.0) / 3.0))
+    pressure = np.frombuffer(pressures) + PRESSURE_BASE_GROWTH + from_state + np.frombuffer(conflicts) * 0.05
+    pressure = np.maximum(0.0, np.minimum(1.2, pressure))
+    phase_index = np.searchsorted(np.array(_PHASE_STARTS), np.array(ages), side="right") - 1
+    phases = [_PHASE_NAMES[index] for index in phase_index.tolist()]
+    return a.tolist(), c.tolist(), f.tolist(), s.tolist(), pressure.tolist(), phases
@@ -0,0 +1,153 @@
+"""In-process agent cache (identity map) with write-behind flushing."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+
+from .agent import LifeAgent
+from .backend import StorageBackend
+from .config import AGENT_CACHE_SIZE
+from .codec import decode_record
+from .records import AgentView, agent_from_record, project_agent, project_record
+
+
+class AgentCache:
+    """Bounded LRU of loaded agents shared by the simulator and web handlers.
+
+    Clean entries are revalidated against the backend's per-agent generation
+    before being served, so writes made by another process are picked up.
+    Agents marked dirty are held in memory until `flush` saves them in one
+    batch; a dirty agent evicted by the size bound is saved on the way out.
+
+    `seed` hands it encoded records from a checkpoint: a miss whose stored
+    generation still matches is decoded from the seed instead of read from
+    the backend.
+    """
+
+    def __init__(self, backend: StorageBackend, max_size: int = AGENT_CACHE_SIZE) -> None:
+        self.backend = backend
+        self.max_size = max(1, max_size)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._entries: OrderedDict[str, tuple[LifeAgent, int | None]] = OrderedDict()
+        self._dirty: dict[str, LifeAgent] = {}
+        self._seeds: dict[str, tuple[int | None, bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, animal_id: str) -> bool:
+        return animal_id in self._entries
+
+    def get(self, animal_id: str) -> LifeAgent:
+        with self._lock:
+            cached = self._entries.get(animal_id)
+            if cached is not None:
+                agent, generation = cached
+                if animal_id in self._dirty or self.backend.generation(animal_id) == generation:
+                    self._entries.move_to_end(animal_id)
+                    self.hits += 1
+                    return agent
+            self.misses += 1
+            generation = self.backend.generation(animal_id)
+            payload = self._seeded(self._seeds.pop(animal_id, None), generation)
+            if payload is not None:
+                agent = agent_from_record(payload, timeline_loader=self.backend.timeline_loader(animal_id))
+            else:
+                agent = self.backend.load_agent(animal_id)
+            self._store(agent, generation)
+            return agent
+
+    def view(self, animal_id: str, fields: tuple[str, ...]) -> AgentView:
+        """Projection of an agent, taken from the cache when it holds a current copy.
+
+        Misses are answered from a current seed or by a projected backend load,
+        and are not cached.
+        """
+        with self._lock:
+            cached = self._entries.get(animal_id)
+            if cached is not None:
+                agent, generation = cached
+                if animal_id in self._dirty or self.backend.generation(animal_id) == generation:
+                    self.hits += 1
+                    return project_agent(agent, fields)
+            self.misses += 1
+            seed = self._seeds.get(animal_id)
+        if seed is not None:
+            payload = self._seeded(seed, self.backend.generation(animal_id))
+            if payload is not None:
+                return project_record(payload, fields, timeline_loader=self.backend.timeline_loader(animal_id))
+        return self.backend.load_agent(animal_id, fields=fields)
+
+    def seed(self, records: dict[str, tuple[int | None, bytes]]) -> None:
+        """Offer `codec` records, each tagged with its backend generation, for later misses."""
+        with self._lock:
+            self._seeds.update(records)
+
+    def clean_entries(self) -> dict[str, tuple[LifeAgent, int | None]]:
+        """Cached agents without unsaved changes, with the generation they were read or saved at."""
+        with self._lock:
+            return {animal_id: entry for animal_id, entry in self._entries.items() if animal_id not in self._dirty}
+
+    def add(self, agent: LifeAgent) -> None:
+        """Insert a new agent (e.g. a birth) and schedule it for saving."""
+        with self._lock:
+            self._store(agent, None)
+            self._dirty[agent.animal_id] = agent
+
+    def mark_dirty(self, agent: LifeAgent) -> None:
+        with self._lock:
+            if agent.animal_id not in self._entries:
+                self._store(agent, None)
+            self._dirty[agent.animal_id] = agent
+
+    def dirty_ids(self) -> list[str]:
+        with self._lock:
+            return list(self._dirty)
+
+    def invalidate(self, animal_id: str) -> None:
+        with self._lock:
+            if animal_id not in self._dirty:
+                self._entries.pop(animal_id, None)
+
+    def flush(self) -> int:
+        """Save every dirty agent in one backend batch; returns how many were written."""
+        with self._lock:
+            agents = list(self._dirty.values())
+            self._dirty.clear()
+        if not agents:
+            return 0
+        try:
+            self.backend.save_agents(agents)
+        except BaseException:
+            with self._lock:
+                for agent in agents:
+                    self._dirty.setdefault(agent.animal_id, agent)
+            raise
+        with self._lock:
+            for agent in agents:
+                cached = self._entries.get(agent.animal_id)
+                if cached is not None and cached[0] is agent and agent.animal_id not in self._dirty:
+                    self._entries[agent.animal_id] = (agent, self.backend.generation(agent.animal_id))
+        return len(agents)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.flush()
+            self._entries.clear()
+
+    @staticmethod
+    def _seeded(seed: tuple[int | None, bytes] | None, generation: int | None) -> dict | None:
+        if seed is None or generation is None or seed[0] != generation:
+            return None
+        return decode_record(seed[1])
+
+    def _store(self, agent: LifeAgent, generation: int | None) -> None:
+        self._entries[agent.animal_id] = (agent, generation)
+        self._entries.move_to_end(agent.animal_id)
+        while len(self._entries) > self.max_size:
+            animal_id, (evicted, _) = self._entries.popitem(last=False)
+            if self._dirty.pop(animal_id, None) is not None:
+                self.backend.save_agent(evicted)
@@ -0,0 +1,167 @@
+"""Whole-population checkpoints for fast cold starts.
+
+A checkpoint is one file holding every animal's record in the `codec` layout,
+each tagged with the backend generation it was taken at, plus the backend's
+index state (feed head, secondary indexes). Loading it replaces a parse of
+every record file with one read and one decompression; records that changed
+after the checkpoint are noticed by their generation and read from the
+backend as usual.
+
+Records refer to stock phrases by id, so the checkpoint notes the phrase
+table it was written with and is refused by a process whose table differs.
+
+Layout::
+
+    header   magic "OACP", version u16, flags u16, sha256 of the body
+    body     zlib of: meta length u32, meta JSON, the records back to back
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .agent import LifeAgent
+from .backend import StorageBackend
+from .cache import AgentCache
+from .codec import CodecError, decode_record, encode_record
+from .files import atomic_write_bytes, read_bytes
+from .phrases import phrase_table
+from .records import agent_to_record
+
+MAGIC = b"OACP"
+CHECKPOINT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHH32s")
+_META = struct.Struct("<I")
+
+
+class CheckpointError(ValueError):
+    """Raised for a checkpoint file that is corrupt or of an unsupported version."""
+
+
+@dataclass
+class Checkpoint:
+    created_at: float
+    # animal_id -> (backend generation, codec-encoded record without timeline)
+    records: dict[str, tuple[int | None, bytes]] = field(default_factory=dict)
+    # Backend index state, see `StorageBackend.checkpoint_state`
+    state: dict = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def build_checkpoint(
+    backend: StorageBackend, cache: AgentCache | None = None, previous: Checkpoint | None = None
+) -> Checkpoint:
+    """Snapshot every stored animal and the backend's indexes.
+
+    Each record comes from the cheapest current source: a clean copy held in
+    `cache`, an unchanged entry of `previous`, or a backend load. Flush the
+    cache first so agents with unsaved changes are not missed.
+    """
+    cached = cache.clean_entries() if cache is not None else {}
+    earlier = previous.records if previous is not None else {}
+    records: dict[str, tuple[int | None, bytes]] = {}
+    for animal_id in backend.list_agents():
+        generation = backend.generation(animal_id)
+        if generation is None:
+            continue
+        entry = cached.get(animal_id)
+        if entry is not None and entry[1] == generation:
+            records[animal_id] = (generation, _encode(entry[0]))
+            continue
+        kept = earlier.get(animal_id)
+        if kept is not None and kept[0] == generation:
+            records[animal_id] = kept
+            continue
+        # Tagged with the generation read before the load: if a save lands in
+        # between, the restore sees a mismatch and reads the record again.
+        records[animal_id] = (generation, _encode(backend.load_agent(animal_id)))
+    return Checkpoint(created_at=time.time(), records=records, state=backend.checkpoint_state())
+
+
+def write_checkpoint(path: Path, checkpoint: Checkpoint) -> int:
+    """Atomically replace `path` with `checkpoint`; returns the file size."""
+    entries = list(checkpoint.records.items())
+    meta = {
+        "created_at": checkpoint.created_at,
+        "agents": [[animal_id, generation, len(data)] for animal_id, (generation, data) in entries],
+        "state": checkpoint.state,
+        "phrases": [len(phrase_table()), phrase_table().fingerprint()],
+    }
+    encoded = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    body = zlib.compress(b"".join([_META.pack(len(encoded)), encoded, *(data for _, (_, data) in entries)]))
+    data = _HEADER.pack(MAGIC, CHECKPOINT_VERSION, 0, hashlib.sha256(body).digest()) + body
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(path, data)
+    return len(data)
+
+
+def read_checkpoint(path: Path) -> Checkpoint:
+    """Load a checkpoint file; raises FileNotFoundError or CheckpointError."""
+    data = read_bytes(path)
+    if len(data) < _HEADER.size:
+        raise CheckpointError("truncated checkpoint header")
+    magic, version, _flags, digest = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CheckpointError("not a checkpoint file")
+    if version != CHECKPOINT_VERSION:
+        raise CheckpointError(f"unsupported checkpoint version {version}")
+    body = data[_HEADER.size :]
+    if hashlib.sha256(body).digest() != digest:
+        raise CheckpointError("checkpoint checksum mismatch")
+    try:
+        raw = zlib.decompress(body)
+        (size,) = _META.unpack_from(raw)
+        meta = json.loads(raw[_META.size : _META.size + size])
+    except (zlib.error, struct.error, ValueError) as exc:
+        raise CheckpointError(f"unreadable checkpoint: {exc}") from None
+    # Checkpoints from before phrase ids hold plain-text records.
+    count, fingerprint = meta.get("phrases", (0, phrase_table().fingerprint(0)))
+    table = phrase_table()
+    if count > len(table) or table.fingerprint(count) != fingerprint:
+        raise CheckpointError("checkpoint was written with a different phrase table")
+    records: dict[str, tuple[int | None, bytes]] = {}
+    offset = _META.size + size
+    for animal_id, generation, length in meta["agents"]:
+        records[animal_id] = (generation, raw[offset : offset + length])
+        offset += length
+    if offset != len(raw):
+        raise CheckpointError("checkpoint records do not match their index")
+    return Checkpoint(created_at=meta["created_at"], records=records, state=meta.get("state", {}))
+
+
+def verify_checkpoint(checkpoint: Checkpoint, backend: StorageBackend) -> int:
+    """Decode every record of `checkpoint`; returns how many the backend has changed since.
+
+    Raises CheckpointError for a record that does not decode or names another animal.
+    """
+    stale = 0
+    for animal_id, (generation, data) in checkpoint.records.items():
+        try:
+            payload = decode_record(data)
+        except CodecError as exc:
+            raise CheckpointError(f"record of {animal_id} does not decode: {exc}") from None
+        if payload.get("animal_id") != animal_id:
+            raise CheckpointError(f"record stored under {animal_id} belongs to {payload.get('animal_id')}")
+        if backend.generation(animal_id) != generation:
+            stale += 1
+    return stale
+
+
+def restore_checkpoint(checkpoint: Checkpoint, backend: StorageBackend, cache: AgentCache) -> None:
+    """Warm `backend`'s indexes and `cache` from `checkpoint`."""
+    backend.restore_state(checkpoint.state)
+    cache.seed(checkpoint.records)
+
+
+def _encode(agent: LifeAgent) -> bytes:
+    return encode_record(agent_to_record(agent, include_timeline=False))
@@ -4,10 +4,35 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
+import time
+from pathlib import Path
 
 from .agent import LifeAgent
+from .checkpoint import CheckpointError, build_checkpoint, read_checkpoint, verify_checkpoint, write_checkpoint
+from .config import CATCHUP_BUDGET_SECONDS, CATCHUP_MAX_TICKS
+from .env import (
+    get_catchup_budget,
+    get_catchup_max_ticks,
+    get_profile_dir,
+    get_storage_backend,
+    get_storage_format,
+)
+from .lease import TickLease
+from .metrics import RunProfiler, parse_profile_modes
 from .simulator import Simulator
-from .storage import list_agents, load_agent, save_agent
+from .storage import (
+    DATA_ROOT,
+    get_backend,
+    get_cache,
+    get_checkpoint_path,
+    get_tick_clock,
+    get_tick_lease,
+    list_agents,
+    load_agent,
+    open_backend,
+    save_agent,
+)
 
 
 def _cmd_birth() -> None:
@@ -22,14 +47,14 @@ def _cmd_list() -> None:
 
 
 def _cmd_observe(animal_id: str) -> None:
-    agent = load_agent(animal_id)
+    agent = load_agent(animal_id, fields=("age_ticks", "timeline"))
     rendered = agent.timeline.render(current_tick=agent.age_ticks)
     for line in rendered:
         print(line)
 
 
 def _cmd_state(animal_id: str) -> None:
-    agent = load_agent(animal_id)
+    agent = load_agent(animal_id, fields=("animal_id", "age_ticks", "phase", "state", "pressure"))
     payload = {
         "animal_id": agent.animal_id,
         "age_ticks": agent.age_ticks,
@@ -40,10 +65,116 @@ def _cmd_state(animal_id: str) -> None:
     print(json.dumps(payload, indent=2))
 
 
-def _cmd_tick(ticks: int) -> None:
-    simulator = Simulator()
-    report = simulator.run(ticks=ticks)
-    print(f"ticks={report.ticks} expressions={report.expressions}")
+def _take_lease() -> TickLease:
+    lease = get_tick_lease()
+    if not lease.acquire():
+        holder = lease.holder() or {}
+        sys.exit(f"another process is ticking this data directory (pid {holder.get('pid', '?')}); not ticking")
+    return lease
+
+
+def _profiler(modes: str | None, every: int) -> RunProfiler | None:
+    if modes is None:
+        return None
+    return RunProfiler(parse_profile_modes(modes), Path(get_profile_dir(str(DATA_ROOT / "profiles"))), every=every)
+
+
+def _report_profile(simulator: Simulator) -> None:
+    if simulator.profiler is None:
+        return
+    if simulator.profiler.runs % simulator.profiler.every:
+        simulator.profiler.dump()
+    for path in simulator.profiler.dumped:
+        print(f"profile: {path}")
+
+
+def _cmd_tick(ticks: int, workers: int | None, budget: float | None, profile: str | None, profile_every: int) -> None:
+    lease = _take_lease()
+    simulator = Simulator(workers=workers, profiler=_profiler(profile, profile_every))
+    try:
+        report = simulator.run(ticks=ticks, budget_seconds=budget)
+        # Ticks run here are not missed ones: the webapp must not replay them.
+        get_tick_clock().mark()
+        _report_profile(simulator)
+    finally:
+        simulator.close()
+        lease.release()
+    print(report.summary())
+
+
+def _cmd_catch_up(
+    max_ticks: int | None, budget: float | None, workers: int | None, profile: str | None, profile_every: int
+) -> None:
+    lease = _take_lease()
+    clock = get_tick_clock()
+    now = time.time()
+    limit = max_ticks if max_ticks is not None else get_catchup_max_ticks(CATCHUP_MAX_TICKS)
+    missed = min(clock.missed_ticks(now), limit)
+    simulator = Simulator(workers=workers, profiler=_profiler(profile, profile_every))
+    try:
+        report = simulator.fast_forward(
+            missed,
+            budget_seconds=budget if budget is not None else get_catchup_budget(CATCHUP_BUDGET_SECONDS),
+            progress=lambda done, total: print(f"{done}/{total} ticks", flush=True),
+        )
+        clock.mark(now)
+        _report_profile(simulator)
+    finally:
+        simulator.close()
+        lease.release()
+    print(f"missed={missed} {report.summary()}")
+
+
+def _cmd_checkpoint(verify: bool) -> None:
+    path = get_checkpoint_path()
+    try:
+        existing = read_checkpoint(path)
+    except FileNotFoundError:
+        if verify:
+            sys.exit(f"no checkpoint at {path}")
+        existing = None
+    except CheckpointError as exc:
+        if verify:
+            sys.exit(f"checkpoint {path} is damaged: {exc}")
+        existing = None
+    if verify:
+        try:
+            stale = verify_checkpoint(existing, get_backend())
+        except CheckpointError as exc:
+            sys.exit(f"checkpoint {path} is damaged: {exc}")
+        age = time.time() - existing.created_at
+        print(f"ok agents={len(existing)} stale={stale} age={age:.0f}s")
+        return
+    # Records unchanged since the previous checkpoint are carried over as they are.
+    checkpoint = build_checkpoint(get_backend(), get_cache(), previous=existing)
+    size = write_checkpoint(path, checkpoint)
+    print(f"agents={len(checkpoint)} bytes={size} path={path}")
+
+
+def _cmd_convert(record_format: str, root: str | None) -> None:
+    # Every later save writes the configured format and drops the other one,
+    # so converting to anything else would be undone by the next tick.
+    configured = get_storage_format()
+    if record_format != configured:
+        sys.exit(
+            f"OPENANIMAL_STORAGE_FORMAT is {configured!r}; set it to {record_format!r}"
+            f" before converting, or saves will write {configured} records again"
+        )
+    backend = open_backend("json", root=root or DATA_ROOT, record_format=record_format)
+    try:
+        count = backend.convert()
+    finally:
+        backend.close()
+    print(f"converted={count} format={record_format}")
+
+
+def _cmd_migrate(root: str | None) -> None:
+    backend = open_backend(get_storage_backend(), root=root or DATA_ROOT, record_format=get_storage_format())
+    try:
+        count = backend.migrate()
+    finally:
+        backend.close()
+    print(f"migrated={count}")
 
 
 def main() -> None:
@@ -61,6 +192,40 @@ def main() -> None:
 
     tick = sub.add_parser("tick", help="Advance simulation time")
     tick.add_argument("--ticks", type=int, default=1)
+    tick.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: OPENANIMAL_SIM_WORKERS or 1)"
+    )
+    tick.add_argument(
+        "--budget", type=float, default=None, help="Wall-clock seconds for the whole run; ticks fewer animals to fit"
+    )
+
+    catch_up = sub.add_parser("catch-up", help="Replay the ticks missed since the data directory was last ticked")
+    catch_up.add_argument(
+        "--max-ticks", type=int, default=None, help="Most ticks to replay (default: OPENANIMAL_CATCHUP_MAX_TICKS)"
+    )
+    catch_up.add_argument(
+        "--budget", type=float, default=None, help="Wall-clock seconds to spend (default: OPENANIMAL_CATCHUP_SECONDS)"
+    )
+    catch_up.add_argument("--workers", type=int, default=None)
+    for command in (tick, catch_up):
+        command.add_argument(
+            "--profile",
+            nargs="?",
+            const="all",
+            default=None,
+            help="Capture cpu, memory or cpu,memory profiles (default: all) to OPENANIMAL_PROFILE_DIR or data/profiles",
+        )
+        command.add_argument("--profile-every", type=int, default=1, help="Runs per dumped profile (default: 1)")
+
+    checkpoint = sub.add_parser("checkpoint", help="Write the whole-population checkpoint used for fast starts")
+    checkpoint.add_argument("--verify", action="store_true", help="Check the existing checkpoint instead of writing one")
+
+    convert = sub.add_parser("convert", help="Rewrite file-backend records in another format")
+    convert.add_argument("--to", dest="record_format", choices=("json", "binary"), required=True)
+    convert.add_argument("--root", default=None, help="Data directory (default: data)")
+
+    migrate = sub.add_parser("migrate", help="Upgrade every stored animal to the current record layout")
+    migrate.add_argument("--root", default=None, help="Data directory (default: data)")
 
     args = parser.parse_args()
 
@@ -73,7 +238,15 @@ def main() -> None:
     elif args.command == "state":
         _cmd_state(args.animal_id)
     elif args.command == "tick":
-        _cmd_tick(args.ticks)
+        _cmd_tick(args.ticks, args.workers, args.budget, args.profile, args.profile_every)
+    elif args.command == "catch-up":
+        _cmd_catch_up(args.max_ticks, args.budget, args.workers, args.profile, args.profile_every)
+    elif args.command == "checkpoint":
+        _cmd_checkpoint(args.verify)
+    elif args.command == "convert":
+        _cmd_convert(args.record_format, args.root)
+    elif args.command == "migrate":
+        _cmd_migrate(args.root)
     else:
         parser.print_help()
 
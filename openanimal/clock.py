@@ -0,0 +1,39 @@
+"""Wall-clock bookkeeping for the simulation."""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from .config import TICK_SECONDS
+from .files import atomic_write_text
+
+
+class TickClock:
+    """When the simulation was last advanced, kept in the data directory.
+
+    The ticking process marks it after every interval, so after a restart or
+    a host sleep the gap since the last mark tells how many ticks were missed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+
+    def last(self) -> float | None:
+        try:
+            return float(json.loads(self.path.read_text(encoding="utf-8"))["ticked_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def mark(self, when: float | None = None) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, json.dumps({"ticked_at": when if when is not None else time.time()}))
+
+    def missed_ticks(self, now: float | None = None) -> int:
+        """Whole ticks of wall time since the last mark (0 if never marked)."""
+        last = self.last()
+        if last is None:
+            return 0
+        now = now if now is not None else time.time()
+        return max(0, int((now - last) // TICK_SECONDS))
@@ -0,0 +1,349 @@
+"""Compact binary encoding of agent records (stdlib `struct`/`array` only).
+
+A record is the dict produced by `records.agent_to_record`; the codec maps it
+to a versioned, column-oriented layout and back. Numbers are packed in fixed
+structs or typed arrays and strings are NUL-joined blocks, so decoding a long
+memory list or timeline is a handful of `array.frombytes`/`bytes.split` calls.
+Memory texts and sentences are phrase columns: ids into the process-wide
+`phrases` table, with the text of anything else stored after them.
+
+Layout (little endian)::
+
+    header   magic "OANM", schema version u16, flags u16
+    fixed    created_at, age_ticks, pressure, tolerance, last_expression_tick,
+             rng_seed, silent_until_tick, missing_until_tick, state[4]
+    strings  animal_id, phase, creator, species, slug, *temperament
+    encounters, memory, timeline sections (see the `_pack_*` helpers)
+
+Schema version 1 stored memory texts and sentences as plain string blocks;
+it is still read.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+import uuid
+from array import array
+from itertools import accumulate, islice
+
+from .config import STATE_KEYS
+from .phrases import PhraseTableError, phrase_table
+from .records import RECORD_VERSION
+from .timeline import ExpressionEntry
+
+MAGIC = b"OANM"
+SCHEMA_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+
+FLAG_INLINE_TIMELINE = 0x1
+MEMORY_IDS_UUID = 0
+MEMORY_IDS_TEXT = 1
+NO_TICK = -(2**63)
+# Set in a frame's sentence count when the frame body is a phrase column
+FRAME_PHRASES = 0x8000
+# Phrase code of text stored inline; other codes are phrase id + 1
+INLINE_PHRASE = 0
+
+_HEADER = struct.Struct("<4sHH")
+_FIXED = struct.Struct("<dqddqqqq4d")
+_COUNT = struct.Struct("<I")
+_BLOCK = struct.Struct("<II")
+_FRAME = struct.Struct("<IqqH")
+_SWAP = sys.byteorder != "little"
+_MEMORY_KEYS = ("memory_id", "text", "weight", "valence", "created_tick", "last_tick", "usage_count")
+
+
+class CodecError(ValueError):
+    """Raised for data that is not a supported binary agent record."""
+
+
+def is_binary(data: bytes) -> bool:
+    return data[:4] == MAGIC
+
+
+def _pack_strings(values: list[str]) -> bytes:
+    blob = "\0".join(values).encode("utf-8")
+    return _BLOCK.pack(len(values), len(blob)) + blob
+
+
+def _unpack_strings(data: bytes, offset: int) -> tuple[list[str], int]:
+    count, size = _BLOCK.unpack_from(data, offset)
+    offset += _BLOCK.size
+    if not count:
+        return [], offset + size
+    return data[offset : offset + size].decode("utf-8").split("\0"), offset + size
+
+
+def _pack_phrases(values: list[str]) -> bytes:
+    table = phrase_table()
+    codes = []
+    inline = []
+    for value in values:
+        phrase_id = table.id(value)
+        if phrase_id is None or phrase_id >= 0xFFFF:
+            codes.append(INLINE_PHRASE)
+            inline.append(value)
+        else:
+            codes.append(phrase_id + 1)
+    return _pack_array("H", codes) + _pack_strings(inline)
+
+
+def _unpack_phrases(data: bytes, offset: int) -> tuple[list[str], int]:
+    codes, offset = _unpack_array("H", data, offset)
+    inline, offset = _unpack_strings(data, offset)
+    return _expand_phrases(codes, inline), offset
+
+
+def _expand_phrases(codes, inline: list[str]) -> list[str]:
+    table = phrase_table()
+    pending = iter(inline)
+    return [next(pending) if code == INLINE_PHRASE else table.text(code - 1) for code in codes]
+
+
+def _pack_array(typecode: str, values) -> bytes:
+    column = array(typecode, values)
+    if _SWAP:
+        column.byteswap()
+    return _COUNT.pack(len(column)) + column.tobytes()
+
+
+def _unpack_array(typecode: str, data: bytes, offset: int) -> tuple[array, int]:
+    (count,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    column = array(typecode)
+    end = offset + count * column.itemsize
+    column.frombytes(data[offset:end])
+    if _SWAP:
+        column.byteswap()
+    return column, end
+
+
+def _pack_entries(entries: list[dict]) -> bytes:
+    sentences = [sentence for entry in entries for sentence in entry["sentences"]]
+    public_ticks = [entry.get("public_tick") for entry in entries]
+    return b"".join(
+        (
+            _pack_array("q", [entry["tick"] for entry in entries]),
+            _pack_array("q", [NO_TICK if tick is None else tick for tick in public_ticks]),
+            _pack_array("I", [len(entry["sentences"]) for entry in entries]),
+            _pack_phrases(sentences),
+        )
+    )
+
+
+def _unpack_entries(data: bytes, offset: int, version: int) -> tuple[list[dict], int]:
+    ticks, offset = _unpack_array("q", data, offset)
+    public_ticks, offset = _unpack_array("q", data, offset)
+    counts, offset = _unpack_array("I", data, offset)
+    sentences, offset = (_unpack_strings if version == 1 else _unpack_phrases)(data, offset)
+    ends = list(accumulate(counts))
+    entries = [
+        {"tick": tick, "sentences": sentences[end - count : end], "public_tick": public_tick}
+        for tick, public_tick, count, end in zip(ticks, public_ticks, counts, ends)
+    ]
+    if NO_TICK in public_ticks:
+        for entry in entries:
+            if entry["public_tick"] == NO_TICK:
+                entry["public_tick"] = None
+    return entries, offset
+
+
+def _is_canonical_uuid(value: str) -> bool:
+    try:
+        return str(uuid.UUID(value)) == value
+    except ValueError:
+        return False
+
+
+def _pack_memory(memories: list[dict]) -> bytes:
+    ids = [memory["memory_id"] for memory in memories]
+    if all(isinstance(memory_id, str) and _is_canonical_uuid(memory_id) for memory_id in ids):
+        raw = b"".join(uuid.UUID(memory_id).bytes for memory_id in ids)
+        id_block = bytes([MEMORY_IDS_UUID]) + _COUNT.pack(len(raw)) + raw
+    else:
+        id_block = bytes([MEMORY_IDS_TEXT]) + _pack_strings([str(memory_id) for memory_id in ids])
+    return b"".join(
+        (
+            id_block,
+            _pack_phrases([memory["text"] for memory in memories]),
+            _pack_array("d", [memory["weight"] for memory in memories]),
+            _pack_array("d", [memory["valence"] for memory in memories]),
+            _pack_array("q", [memory["created_tick"] for memory in memories]),
+            _pack_array("q", [memory["last_tick"] for memory in memories]),
+            _pack_array("q", [memory.get("usage_count", 0) for memory in memories]),
+        )
+    )
+
+
+def _unpack_memory(data: bytes, offset: int, version: int) -> tuple[list[dict], int]:
+    mode = data[offset]
+    offset += 1
+    if mode == MEMORY_IDS_UUID:
+        (size,) = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        # Format the hex digits directly; building uuid.UUID objects dominates decode time.
+        h = data[offset : offset + size].hex()
+        ids = [
+            f"{h[i:i+8]}-{h[i+8:i+12]}-{h[i+12:i+16]}-{h[i+16:i+20]}-{h[i+20:i+32]}"
+            for i in range(0, len(h), 32)
+        ]
+        offset += size
+    else:
+        ids, offset = _unpack_strings(data, offset)
+    texts, offset = (_unpack_strings if version == 1 else _unpack_phrases)(data, offset)
+    weights, offset = _unpack_array("d", data, offset)
+    valences, offset = _unpack_array("d", data, offset)
+    created, offset = _unpack_array("q", data, offset)
+    last, offset = _unpack_array("q", data, offset)
+    usage, offset = _unpack_array("q", data, offset)
+    columns = zip(ids, texts, weights, valences, created, last, usage)
+    return [dict(zip(_MEMORY_KEYS, row)) for row in columns], offset
+
+
+def encode_record(payload: dict) -> bytes:
+    """Encode an `agent_to_record` dict of the current record version."""
+    if payload.get("schema_version") != RECORD_VERSION:
+        raise CodecError("only current-version records can be encoded; upgrade the record first")
+    inline = "timeline" in payload
+    state = payload["state"]
+    encounters = payload.get("encounters", {})
+    parts = [
+        _HEADER.pack(MAGIC, SCHEMA_VERSION, FLAG_INLINE_TIMELINE if inline else 0),
+        _FIXED.pack(
+            payload["created_at"],
+            payload["age_ticks"],
+            payload["pressure"],
+            payload["tolerance"],
+            payload["last_expression_tick"],
+            payload.get("rng_seed", 0),
+            payload.get("silent_until_tick", 0),
+            payload.get("missing_until_tick", 0),
+            *(float(state[key]) for key in STATE_KEYS),
+        ),
+        _pack_strings(
+            [
+                payload["animal_id"],
+                payload["phase"],
+                payload.get("creator", "") or "",
+                payload["species"],
+                payload["slug"],
+                *payload.get("temperament", []),
+            ]
+        ),
+        _pack_strings(list(encounters)),
+        _pack_array("d", [record["score"] for record in encounters.values()]),
+        _pack_array("q", [record["last_tick"] for record in encounters.values()]),
+        _pack_memory(payload.get("memory", [])),
+    ]
+    if inline:
+        parts.append(_pack_entries(payload["timeline"]))
+    else:
+        last = payload.get("last_expression")
+        parts.append(_COUNT.pack(payload.get("timeline_count", 0)))
+        parts.append(_pack_entries([last] if last else []))
+    return b"".join(parts)
+
+
+def decode_record(data: bytes) -> dict:
+    """Decode bytes produced by `encode_record` back into a record dict."""
+    try:
+        magic, version, flags = _HEADER.unpack_from(data, 0)
+    except struct.error:
+        raise CodecError("truncated header") from None
+    if magic != MAGIC:
+        raise CodecError("not an OpenAnimal binary record")
+    if version not in READABLE_VERSIONS:
+        raise CodecError(f"unsupported binary schema version {version}")
+    try:
+        return _decode_body(data, version, flags)
+    except (struct.error, IndexError, UnicodeDecodeError, StopIteration, PhraseTableError) as exc:
+        raise CodecError(f"corrupt binary record: {exc}") from None
+
+
+def _decode_body(data: bytes, version: int, flags: int) -> dict:
+    offset = _HEADER.size
+    fixed = _FIXED.unpack_from(data, offset)
+    offset += _FIXED.size
+    strings, offset = _unpack_strings(data, offset)
+    encounter_ids, offset = _unpack_strings(data, offset)
+    scores, offset = _unpack_array("d", data, offset)
+    encounter_ticks, offset = _unpack_array("q", data, offset)
+    memory, offset = _unpack_memory(data, offset, version)
+    # Encoding requires a current record, so the record version is implied by
+    # the binary schema version checked in `decode_record`.
+    payload = {
+        "schema_version": RECORD_VERSION,
+        "animal_id": strings[0],
+        "created_at": fixed[0],
+        "age_ticks": fixed[1],
+        "phase": strings[1],
+        "state": dict(zip(STATE_KEYS, fixed[8:])),
+        "pressure": fixed[2],
+        "tolerance": fixed[3],
+        "last_expression_tick": fixed[4],
+        "rng_seed": fixed[5],
+        "creator": strings[2],
+        "species": strings[3],
+        "slug": strings[4],
+        "temperament": strings[5:],
+        "encounters": {
+            other_id: {"score": score, "last_tick": tick}
+            for other_id, score, tick in zip(encounter_ids, scores, encounter_ticks)
+        },
+        "silent_until_tick": fixed[6],
+        "missing_until_tick": fixed[7],
+        "memory": memory,
+    }
+    if flags & FLAG_INLINE_TIMELINE:
+        payload["timeline"], offset = _unpack_entries(data, offset, version)
+    else:
+        (payload["timeline_count"],) = _COUNT.unpack_from(data, offset)
+        last, offset = _unpack_entries(data, offset + _COUNT.size, version)
+        payload["last_expression"] = last[0] if last else None
+    return payload
+
+
+def encode_entry(entry: ExpressionEntry) -> bytes:
+    """One length-prefixed timeline frame, for binary segment files."""
+    body = _pack_phrases(entry.sentences)
+    public_tick = NO_TICK if entry.public_tick is None else entry.public_tick
+    return _FRAME.pack(len(body), entry.tick, public_tick, len(entry.sentences) | FRAME_PHRASES) + body
+
+
+def decode_entries(data: bytes) -> list[ExpressionEntry]:
+    """All complete frames in `data`; a torn trailing frame is ignored.
+
+    Raises CodecError for a frame naming a phrase the process table lacks.
+    """
+    entries = []
+    for tick, public_tick, count, body in _frames(data):
+        if count & FRAME_PHRASES:
+            try:
+                sentences, _ = _unpack_phrases(body, 0)
+            except (struct.error, StopIteration, PhraseTableError) as exc:
+                raise CodecError(f"corrupt timeline frame: {exc}") from None
+        else:
+            sentences = body.decode("utf-8").split("\0") if count else []
+        public_tick = None if public_tick == NO_TICK else public_tick
+        entries.append(ExpressionEntry(tick=tick, sentences=sentences, public_tick=public_tick))
+    return entries
+
+
+def frames_size(data: bytes, count: int) -> int:
+    """Byte length of the first `count` complete frames in `data`."""
+    size = 0
+    for _, _, _, body in islice(_frames(data), count):
+        size += _FRAME.size + len(body)
+    return size
+
+
+def _frames(data: bytes):
+    offset = 0
+    while offset + _FRAME.size <= len(data):
+        size, tick, public_tick, count = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        if start + size > len(data):
+            break
+        yield tick, public_tick, count, data[start : start + size]
+        offset = start + size
@@ -2,6 +2,9 @@
 
 TICK_SECONDS = 60
 
+# Ticks of world signals each WorldSignalStream keeps memoised
+WORLD_SIGNAL_CACHE_SIZE = 8192
+
 # Species available for new births.
 SPECIES = [
     "aardvark",
@@ -163,6 +166,8 @@ ACTION_PROBS = {
 MEMORY_DECAY_RATE = 0.002
 MEMORY_MIN_WEIGHT = 0.05
 MEMORY_EARLY_BONUS_TICKS = 500
+# Most memories an animal holds; past it the faintest is forgotten
+MEMORY_CAPACITY = 64
 
 ARCHIVE_INTERVAL_TICKS = 1200
 
@@ -184,12 +189,37 @@ RARE_EVENT_DISAPPEAR_PROB = 0.20
 
 # Feed tuning
 FEED_MAX_POSTS = 60
+# Posts kept in the incrementally maintained feed index
+FEED_INDEX_MAX_POSTS = 1000
+# Expressions from others each agent sees per tick
+RECENT_FEED_LIMIT = 10
+
+# Timeline entries per on-disk segment file
+TIMELINE_SEGMENT_ENTRIES = 512
+
+# Agents held in the in-process cache
+AGENT_CACHE_SIZE = 2048
 
 # Background ticking defaults (seconds)
 TICK_INTERVAL_MIN = 60
 TICK_INTERVAL_MAX = 120
 TICKS_PER_INTERVAL = 2
 
+# Budgeted ticking: ranking bonus per unit of pressure (in ticks waited) and
+# the assumed cost of one agent tick (seconds) before any has been measured
+FAIR_PRESSURE_WEIGHT = 2.0
+AGENT_TICK_COST_ESTIMATE = 0.0001
+
+# Catch-up after downtime: at most this many missed ticks are replayed, within
+# this much wall time (seconds), saving after every chunk of ticks
+CATCHUP_MAX_TICKS = 1440
+CATCHUP_BUDGET_SECONDS = 60
+CATCHUP_CHUNK_TICKS = 100
+
+# Whole-population checkpoint for fast cold starts, rewritten by the ticking
+# process every this many ticks (0 disables)
+CHECKPOINT_INTERVAL_TICKS = 60
+
 # Population growth
 POPULATION_TARGET = 100
 POPULATION_GROWTH_PER_RUN = 3
@@ -63,3 +63,81 @@ def get_supabase_anon_key() -> str:
 
 def get_supabase_redirect_url() -> str:
     return get_env("OPENANIMAL_SUPABASE_REDIRECT_URL", "").strip()
+
+
+def get_storage_backend() -> str:
+    return get_env("OPENANIMAL_STORAGE", "json").strip().lower() or "json"
+
+
+def get_storage_format() -> str:
+    return get_env("OPENANIMAL_STORAGE_FORMAT", "json").strip().lower() or "json"
+
+
+def get_fsync() -> bool:
+    return get_env("OPENANIMAL_FSYNC", "0").strip().lower() in ("1", "true", "yes")
+
+
+def get_rng_kind() -> str:
+    return get_env("OPENANIMAL_RNG", "splitmix").strip().lower() or "splitmix"
+
+
+def get_sim_workers(default: int = 1) -> int:
+    try:
+        return max(1, int(get_env("OPENANIMAL_SIM_WORKERS", str(default))))
+    except ValueError:
+        return default
+
+
+def get_sim_defer_idle() -> bool:
+    return get_env("OPENANIMAL_SIM_DEFER_IDLE", "1").strip().lower() not in ("0", "false", "no")
+
+
+def get_tick_budget() -> float | None:
+    """Wall-clock seconds per background tick interval, or None for no budget."""
+    try:
+        return float(get_env("OPENANIMAL_TICK_BUDGET_SECONDS", "")) or None
+    except ValueError:
+        return None
+
+
+def get_catchup_max_ticks(default: int) -> int:
+    try:
+        return max(0, int(get_env("OPENANIMAL_CATCHUP_MAX_TICKS", str(default))))
+    except ValueError:
+        return default
+
+
+def get_catchup_budget(default: float) -> float:
+    try:
+        return float(get_env("OPENANIMAL_CATCHUP_SECONDS", str(default)))
+    except ValueError:
+        return default
+
+
+def get_checkpoint_ticks(default: int) -> int:
+    try:
+        return max(0, int(get_env("OPENANIMAL_CHECKPOINT_TICKS", str(default))))
+    except ValueError:
+        return default
+
+
+def get_profile() -> str:
+    return get_env("OPENANIMAL_PROFILE", "").strip().lower()
+
+
+def get_profile_every(default: int = 1) -> int:
+    try:
+        return max(1, int(get_env("OPENANIMAL_PROFILE_EVERY", str(default))))
+    except ValueError:
+        return default
+
+
+def get_profile_dir(default: str) -> str:
+    return get_env("OPENANIMAL_PROFILE_DIR", default).strip() or default
+
+
+def get_agent_cache_size(default: int) -> int:
+    try:
+        return int(get_env("OPENANIMAL_AGENT_CACHE_SIZE", str(default)))
+    except ValueError:
+        return default
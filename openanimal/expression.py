@@ -2,9 +2,9 @@
 
 from __future__ import annotations
 
-import random
-
+from .config import TEMPERAMENTS
 from .memory import MemoryStore
+from .rng import Rng
 from .world import WorldSignals
 
 
@@ -66,8 +66,15 @@ QUESTION_ENDINGS = [
     "Did you notice it?",
 ]
 
+# Ways of echoing a word picked from another animal's sentence.
+ECHO_TEMPLATES = [
+    "I keep thinking about {}.",
+    "{} is sticking with me.",
+    "That {} feeling again.",
+]
+
 
-def _sensory_from_world(world: WorldSignals, rng: random.Random) -> str:
+def _sensory_from_world(world: WorldSignals, rng: Rng) -> str:
     if world.light_level < 0.35:
         return rng.choice(["Shadow", "Darkness", "Dim light"])
     if world.light_level > 0.8:
@@ -77,23 +84,38 @@ def _sensory_from_world(world: WorldSignals, rng: random.Random) -> str:
     return rng.choice(SENSORY_WORDS)
 
 
-def _echo_fragment(line: str, rng: random.Random) -> str:
-    words = [w.strip(".,!?\"'") for w in line.split() if len(w) > 3]
+def _echo_words(line: str) -> list[str]:
+    return [w.strip(".,!?\"'") for w in line.split() if len(w) > 3]
+
+
+def _echo_fragment(line: str, rng: Rng) -> str:
+    words = _echo_words(line)
     if not words:
         return rng.choice(RESPONSES)
     word = rng.choice(words)[:18]
-    templates = [
-        f"I keep thinking about {word}.",
-        f"{word} is sticking with me.",
-        f"That {word} feeling again.",
-    ]
-    return rng.choice(templates)
+    return rng.choice(ECHO_TEMPLATES).format(word)
+
+
+def stock_phrases() -> list[str]:
+    """Sentences expression produces most, in a stable order.
+
+    The fixed lists, the "feeling" lines, echoes of every word those contain
+    (echoes of echoes included) and one level of "I remember: ...".
+    """
+    phrases = GREETINGS + CHECK_INS + OBSERVATIONS + RESPONSES + QUESTION_ENDINGS
+    phrases += [f"I'm feeling {temperament}." for temperament in TEMPERAMENTS]
+    words: dict[str, None] = {}
+    for line in phrases + ECHO_TEMPLATES:
+        words.update((word[:18], None) for word in _echo_words(line.format("")))
+    phrases += [template.format(word) for word in words for template in ECHO_TEMPLATES]
+    phrases += [f"I remember: {phrase}" for phrase in phrases]
+    return list(dict.fromkeys(phrases))
 
 
 def generate_expression(
     world: WorldSignals,
     memory: MemoryStore,
-    rng: random.Random,
+    rng: Rng,
     recent_from_others: list[dict] | None = None,
     temperament: list[str] | None = None,
 ) -> list[str]:
@@ -117,7 +139,7 @@ def generate_expression(
     else:
         sentences.append(rng.choice(OBSERVATIONS))
 
-    if memory.memories and rng.random() < 0.4:
+    if len(memory) and rng.random() < 0.4:
         remembered = rng.choice(memory.most_salient(limit=3))
         sentences.append(f"I remember: {remembered.text}")
     elif rng.random() < 0.35:
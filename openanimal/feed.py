@@ -0,0 +1,342 @@
+"""Incrementally maintained feed index for OpenAnimal."""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .agent import LifeAgent
+from .config import FEED_INDEX_MAX_POSTS, FEED_MAX_POSTS
+from .files import atomic_write_text, io_stats, locked
+from .records import feed_item, feed_post
+
+
+class FeedIndex:
+    """Newest public posts plus each animal's latest expression.
+
+    Backed by an append-only JSONL log: `record` appends one line per new
+    timeline entry and the log is compacted once it holds far more lines than
+    the index keeps in memory. Queries never touch agent records.
+
+    Posts whose `public_tick` is still ahead of `max_tick` wait in a pending
+    list and only join (and compete for) the capped public posts once the
+    world reaches them. Posts carry the animal id and the entry only; `public`
+    fills in the animal's current slug, species, phase and creator.
+
+    Several processes may share the log: appends and compactions hold a lock
+    file next to it, and `refresh` reads whatever other processes appended
+    since this copy last looked (or reloads after they compacted it).
+    """
+
+    def __init__(self, path: Path, capacity: int = FEED_INDEX_MAX_POSTS) -> None:
+        self.path = Path(path)
+        self.capacity = capacity
+        self.max_tick = 0
+        self._lock = threading.Lock()
+        self._post_keys: list[int] = []
+        self._posts: list[dict] = []
+        self._pending_keys: list[int] = []
+        self._pending: list[dict] = []
+        self._latest: dict[str, dict] = {}
+        self._latest_keys: list[tuple[int, str]] = []
+        self._lines = 0
+        self._lock_path = self.path.with_name(self.path.name + ".lock")
+        # Inode of the log this copy follows and how many of its bytes are indexed.
+        self._inode: int | None = None
+        self._offset = 0
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> None:
+        with self._lock, locked(self._lock_path):
+            self._reset()
+            self._inode = self.path.stat().st_ino
+            self._tail(repair=True)
+
+    def refresh(self) -> None:
+        """Pick up posts other processes have written to the log since the last look."""
+        with self._lock:
+            self._follow(repair=False)
+
+    def snapshot(self) -> dict:
+        """JSON-compatible copy of the index and the log position it covers."""
+        with self._lock:
+            return {
+                "inode": self._inode,
+                "offset": self._offset,
+                "lines": self._lines,
+                "max_tick": self.max_tick,
+                "posts": list(self._posts),
+                "pending": list(self._pending),
+                "latest": list(self._latest.values()),
+            }
+
+    def restore(self, state: dict) -> bool:
+        """Adopt a `snapshot` if the log is still the file it was taken from, then catch up on it.
+
+        Returns False, leaving the index untouched, when the log has been
+        compacted or replaced since.
+        """
+        with self._lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                return False
+            if state.get("inode") != stat.st_ino or stat.st_size < state["offset"]:
+                return False
+            self._reset()
+            self._inode = stat.st_ino
+            self._offset = state["offset"]
+            self._lines = state["lines"]
+            self.max_tick = state["max_tick"]
+            for post in state["posts"] + state.get("pending", []):
+                self._place(post)
+            self._latest = {post["animal_id"]: post for post in state["latest"]}
+            self._latest_keys = sorted((post["tick"], animal_id) for animal_id, post in self._latest.items())
+            self._follow(repair=False)
+            return True
+
+    def rebuild(self, agents: Iterable[LifeAgent]) -> None:
+        """Re-index every timeline entry of the given agents and rewrite the log."""
+        with self._lock, locked(self._lock_path):
+            self._reset()
+            for agent in agents:
+                self._advance(agent.age_ticks)
+                for seq, entry in enumerate(agent.timeline.expressions):
+                    self._insert({**feed_item(agent.animal_id, entry), "seq": seq})
+            self._compact()
+
+    def record(self, agent: LifeAgent) -> None:
+        """Index timeline entries added since the agent was last recorded.
+
+        A new world tick is appended to the log as a `{"max_tick": ...}` line,
+        so reloads and other processes see the same public cut-off.
+        """
+        with self._lock:
+            if agent.age_ticks <= self.max_tick and self.indexed_count(agent.animal_id) >= len(agent.timeline):
+                return
+            with locked(self._lock_path):
+                self._follow(repair=True)
+                lines: list[dict] = []
+                if agent.age_ticks > self.max_tick:
+                    self._advance(agent.age_ticks)
+                    lines.append({"max_tick": self.max_tick})
+                start = self.indexed_count(agent.animal_id)
+                new_posts = [
+                    {**feed_item(agent.animal_id, entry), "seq": seq}
+                    for seq, entry in enumerate(agent.timeline.since(start), start=start)
+                ]
+                for post in new_posts:
+                    self._insert(post)
+                lines.extend(new_posts)
+                if not lines:
+                    return
+                data = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("ab") as handle:
+                    handle.write(data)
+                    io_stats.bytes_written += len(data)
+                    if self._inode is None:
+                        self._inode = os.fstat(handle.fileno()).st_ino
+                self._offset += len(data)
+                self._lines += len(lines)
+                if self._lines > 2 * (self.capacity + len(self._pending) + len(self._latest)):
+                    self._compact()
+
+    def indexed_count(self, animal_id: str) -> int:
+        latest = self._latest.get(animal_id)
+        return latest["seq"] + 1 if latest else 0
+
+    def recent(self, exclude_animal_id: str | None = None, limit: int = 15) -> list[dict]:
+        """Latest expression per animal, newest private tick first."""
+        items: list[dict] = []
+        with self._lock:
+            for _, animal_id in reversed(self._latest_keys):
+                if len(items) >= limit:
+                    break
+                if animal_id == exclude_animal_id:
+                    continue
+                post = self._latest[animal_id]
+                items.append(
+                    {
+                        "animal_id": animal_id,
+                        "tick": post["tick"],
+                        "public_tick": post["public_tick"],
+                        "sentences": post["sentences"],
+                    }
+                )
+        return items
+
+    def public(self, profile: Callable[[str], dict | None], limit: int | None = None) -> list[dict]:
+        """Posts already visible at the current world tick, newest first.
+
+        `profile` gives an animal's current slug, species, phase and creator;
+        posts of animals it does not know (None) are left out.
+        """
+        limit = limit or FEED_MAX_POSTS
+        posts: list[dict] = []
+        with self._lock:
+            for post in reversed(self._posts):
+                if len(posts) >= limit:
+                    break
+                current = profile(post["animal_id"])
+                if current is not None:
+                    posts.append(feed_post(post, current))
+        return posts
+
+    def _reset(self) -> None:
+        self.max_tick = 0
+        self._post_keys = []
+        self._posts = []
+        self._pending_keys = []
+        self._pending = []
+        self._latest = {}
+        self._latest_keys = []
+        self._lines = 0
+        self._offset = 0
+
+    def _follow(self, repair: bool) -> None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # Compacted (or replaced) by another process: start over.
+            self._reset()
+            self._inode = stat.st_ino
+        if stat.st_size > self._offset:
+            self._tail(repair)
+
+    def _tail(self, repair: bool) -> None:
+        """Index complete lines past `_offset`.
+
+        With `repair` (only while holding the lock file) a partial last line
+        left by a crash mid-append is cut off so the next append starts on a
+        fresh line; otherwise it may be an append still in progress and is
+        left for the next look.
+        """
+        with self.path.open("rb") as handle:
+            handle.seek(self._offset)
+            data = handle.read()
+        io_stats.bytes_read += len(data)
+        complete = data.rfind(b"\n") + 1
+        if repair and complete < len(data):
+            with self.path.open("r+b") as handle:
+                handle.truncate(self._offset + complete)
+        for line in data[:complete].splitlines():
+            try:
+                post = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._lines += 1
+            if "max_tick" in post and "animal_id" not in post:
+                self._advance(post["max_tick"])
+                continue
+            self._insert(post, dedupe=True)
+            self._advance(post["tick"])
+        self._offset += complete
+
+    def _insert(self, post: dict, dedupe: bool = False) -> None:
+        animal_id = post["animal_id"]
+        previous = self._latest.get(animal_id)
+        if dedupe and previous is not None and post["seq"] <= previous["seq"]:
+            return
+        if previous is None or post["seq"] > previous["seq"]:
+            if previous is not None:
+                old_key = (previous["tick"], animal_id)
+                index = bisect.bisect_left(self._latest_keys, old_key)
+                if index < len(self._latest_keys) and self._latest_keys[index] == old_key:
+                    del self._latest_keys[index]
+            self._latest[animal_id] = post
+            bisect.insort(self._latest_keys, (post["tick"], animal_id))
+        self._place(post)
+
+    def _place(self, post: dict) -> None:
+        key = post["public_tick"]
+        if key > self.max_tick:
+            index = bisect.bisect_right(self._pending_keys, key)
+            self._pending_keys.insert(index, key)
+            self._pending.insert(index, post)
+            return
+        if len(self._posts) >= self.capacity and self._post_keys and key < self._post_keys[0]:
+            return
+        index = bisect.bisect_right(self._post_keys, key)
+        self._post_keys.insert(index, key)
+        self._posts.insert(index, post)
+        if len(self._posts) > self.capacity:
+            del self._post_keys[0]
+            del self._posts[0]
+
+    def _advance(self, tick: int) -> None:
+        """Move the world tick forward, publishing pending posts that are now due."""
+        if tick <= self.max_tick:
+            return
+        self.max_tick = tick
+        due = bisect.bisect_right(self._pending_keys, tick)
+        if due:
+            posts = self._pending[:due]
+            del self._pending_keys[:due], self._pending[:due]
+            for post in posts:
+                self._place(post)
+
+    def _compact(self) -> None:
+        kept = {(post["animal_id"], post["seq"]): post for post in self._posts + self._pending}
+        for post in self._latest.values():
+            kept.setdefault((post["animal_id"], post["seq"]), post)
+        lines = [json.dumps({"max_tick": self.max_tick})]
+        lines.extend(json.dumps(post) for post in sorted(kept.values(), key=lambda p: p["seq"]))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(line + "\n" for line in lines)
+        atomic_write_text(self.path, data)
+        self._lines = len(lines)
+        self._inode = self.path.stat().st_ino
+        self._offset = len(data.encode("utf-8"))
+
+
+class RecentFeed:
+    """In-memory view of each animal's latest expression, newest tick first.
+
+    The simulator builds one per run from `get_recent_feed` and feeds it the
+    expressions produced while ticking, so agents see the same interaction
+    window without re-reading storage for every animal.
+    """
+
+    def __init__(self, items: Iterable[dict] = (), limit: int = 10, capacity: int | None = None) -> None:
+        self.limit = limit
+        self.capacity = capacity or limit + 1
+        self._keys: list[tuple[int, str]] = []
+        self._items: dict[str, dict] = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item: dict) -> None:
+        animal_id = item["animal_id"]
+        previous = self._items.pop(animal_id, None)
+        if previous is not None:
+            self._keys.remove((previous["tick"], animal_id))
+        key = (item["tick"], animal_id)
+        if len(self._keys) >= self.capacity and key < self._keys[0]:
+            return
+        bisect.insort(self._keys, key)
+        self._items[animal_id] = item
+        if len(self._keys) > self.capacity:
+            _, dropped = self._keys.pop(0)
+            del self._items[dropped]
+
+    def snapshot(self) -> list[dict]:
+        """Every held item, oldest first; `RecentFeed(snapshot, ...)` rebuilds the same view."""
+        return [self._items[animal_id] for _, animal_id in self._keys]
+
+    def view(self, exclude_animal_id: str | None = None) -> list[dict]:
+        items: list[dict] = []
+        for _, animal_id in reversed(self._keys):
+            if len(items) >= self.limit:
+                break
+            if animal_id != exclude_animal_id:
+                items.append(self._items[animal_id])
+        return items
@@ -0,0 +1,108 @@
+"""Crash-safe file writes."""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+
+from .env import get_fsync
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class IOStats:
+    """Bytes this process has read from and written to storage files.
+
+    Counted by the storage helpers below and the backends' own appends; the
+    SQLite engine's page I/O is not included.
+    """
+
+    def __init__(self) -> None:
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+io_stats = IOStats()
+
+
+def read_bytes(path: Path) -> bytes:
+    data = Path(path).read_bytes()
+    io_stats.bytes_read += len(data)
+    return data
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Replace `path` with `data` so readers see either the old or the new file.
+
+    The data goes to a temporary file in the same directory which is then
+    renamed over `path`; a crash mid-write leaves the previous version intact.
+    With `OPENANIMAL_FSYNC=1` the file is also flushed to disk before the rename.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp.open("wb") as handle:
+            handle.write(data)
+            if get_fsync():
+                handle.flush()
+                os.fsync(handle.fileno())
+        os.replace(tmp, path)
+        io_stats.bytes_written += len(data)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def lock_file(handle: IO, blocking: bool = True) -> bool:
+    """Take an exclusive advisory lock on an open file; False if `blocking` is off and it is held.
+
+    The lock belongs to the open file, so the OS drops it when the handle is
+    closed or the process exits.
+    """
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    handle.seek(0)
+    try:
+        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def unlock_file(handle: IO) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def locked(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on `path` (created if missing) for the block.
+
+    Used to serialise writers of files shared by several processes.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+b") as handle:
+        lock_file(handle)
+        try:
+            yield
+        finally:
+            unlock_file(handle)
@@ -0,0 +1,166 @@
+"""Persisted secondary indexes over agent records."""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Iterable
+
+from .agent import LifeAgent
+from .files import atomic_write_text, locked
+
+INDEX_VERSION = 1
+INDEXED_FIELDS = ("slug", "creator", "species", "phase")
+
+
+class AgentIndex:
+    """slug→id plus creator/species/phase→ids, kept in sync by `save_agent(s)`.
+
+    The file stores one `[slug, creator, species, phase]` row per animal and is
+    only rewritten when one of those values changes (births, phase changes),
+    so routine ticks do not touch it. Writers from several processes are
+    serialised by a lock file next to the index, and each process reloads
+    the index when another one has rewritten it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._rows: dict[str, tuple[str, str, str, str]] = {}
+        self._by_slug: dict[str, str] = {}
+        self._by_field: dict[str, dict[str, set[str]]] = {name: {} for name in INDEXED_FIELDS[1:]}
+        self._lock_path = self.path.with_name(self.path.name + ".lock")
+        # (inode, mtime) of the file this copy was loaded from or last wrote.
+        self._stamp: tuple[int, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, animal_id: str) -> bool:
+        return animal_id in self._rows
+
+    def load(self) -> bool:
+        """Load the index file; returns False if it is missing or unreadable."""
+        with self._lock:
+            return self._load()
+
+    def refresh(self) -> None:
+        """Reload the index if another process has rewritten it since."""
+        stamp = self._file_stamp()
+        if stamp is not None and stamp != self._stamp:
+            self.load()
+
+    def snapshot(self) -> dict:
+        """JSON-compatible copy of the rows and the file version they match."""
+        with self._lock:
+            return {"stamp": list(self._stamp) if self._stamp else None, "rows": dict(self._rows)}
+
+    def restore(self, state: dict) -> bool:
+        """Adopt a `snapshot` if the index file has not been rewritten since; returns whether it was."""
+        stamp = self._file_stamp()
+        if stamp is None or state.get("stamp") is None or tuple(state["stamp"]) != stamp:
+            return False
+        with self._lock:
+            self._reset()
+            for animal_id, row in state["rows"].items():
+                self._put(animal_id, tuple(row))
+            self._stamp = stamp
+        return True
+
+    def rebuild(self, agents: Iterable[LifeAgent]) -> None:
+        with self._lock, locked(self._lock_path):
+            self._reset()
+            for agent in agents:
+                self._put(agent.animal_id, _row(agent))
+            self._write()
+
+    def update(self, agent: LifeAgent) -> None:
+        self.update_all([agent])
+
+    def update_all(self, agents: Iterable[LifeAgent]) -> None:
+        """Apply the rows of several agents, rewriting the file at most once."""
+        rows = {agent.animal_id: _row(agent) for agent in agents}
+        with self._lock:
+            changed = {animal_id: row for animal_id, row in rows.items() if self._rows.get(animal_id) != row}
+            if not changed:
+                return
+            with locked(self._lock_path):
+                # Start from the newest file so rows written by other
+                # processes are carried over rather than overwritten.
+                stamp = self._file_stamp()
+                if stamp is not None and stamp != self._stamp:
+                    self._load()
+                for animal_id, row in changed.items():
+                    self._put(animal_id, row)
+                self._write()
+
+    def profile(self, animal_id: str) -> dict | None:
+        """The indexed slug, creator, species and phase of an animal (None if unknown)."""
+        row = self._rows.get(animal_id)
+        return dict(zip(INDEXED_FIELDS, row)) if row is not None else None
+
+    def id_for_slug(self, slug: str) -> str | None:
+        return self._by_slug.get(slug)
+
+    def ids(self, creator: str | None = None, species: str | None = None, phase: str | None = None) -> list[str]:
+        """Ids matching every given filter (all ids when no filter is given)."""
+        values = (creator, species, phase)
+        filters = [(name, value) for name, value in zip(INDEXED_FIELDS[1:], values) if value is not None]
+        with self._lock:
+            if not filters:
+                return list(self._rows)
+            sets = sorted((self._by_field[name].get(value, set()) for name, value in filters), key=len)
+            return sorted(sets[0].intersection(*sets[1:]))
+
+    def _load(self) -> bool:
+        stamp = self._file_stamp()
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return False
+        if payload.get("version") != INDEX_VERSION:
+            return False
+        self._reset()
+        for animal_id, row in payload.get("agents", {}).items():
+            self._put(animal_id, tuple(row))
+        self._stamp = stamp
+        return True
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _reset(self) -> None:
+        self._rows = {}
+        self._by_slug = {}
+        self._by_field = {name: {} for name in INDEXED_FIELDS[1:]}
+
+    def _put(self, animal_id: str, row: tuple[str, str, str, str]) -> None:
+        previous = self._rows.get(animal_id)
+        if previous is not None:
+            if self._by_slug.get(previous[0]) == animal_id:
+                del self._by_slug[previous[0]]
+            for name, value in zip(INDEXED_FIELDS[1:], previous[1:]):
+                bucket = self._by_field[name].get(value)
+                if bucket is not None:
+                    bucket.discard(animal_id)
+                    if not bucket:
+                        del self._by_field[name][value]
+        self._rows[animal_id] = row
+        self._by_slug[row[0]] = animal_id
+        for name, value in zip(INDEXED_FIELDS[1:], row[1:]):
+            self._by_field[name].setdefault(value, set()).add(animal_id)
+
+    def _write(self) -> None:
+        payload = {"version": INDEX_VERSION, "agents": {animal_id: list(row) for animal_id, row in self._rows.items()}}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, json.dumps(payload, separators=(",", ":")))
+        self._stamp = self._file_stamp()
+
+
+def _row(agent: LifeAgent) -> tuple[str, str, str, str]:
+    return (agent.slug, getattr(agent, "creator", "") or "", agent.species, agent.phase)
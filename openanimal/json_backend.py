@@ -0,0 +1,272 @@
+"""One-file-per-animal storage backend (JSON or compact binary records)."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict
+from functools import partial
+from pathlib import Path
+
+from .agent import LifeAgent
+from .archive import ArchiveSnapshot
+from .backend import AgentNotFoundError, StorageBackend
+from .codec import decode_record, encode_record, is_binary
+from .feed import FeedIndex
+from .files import atomic_write_bytes, atomic_write_text, read_bytes
+from .indexes import AgentIndex
+from .phrases import PHRASE_FILE, phrase_table
+from .records import AgentView, agent_from_record, agent_to_record, is_current, project_record
+from .segments import TimelineSegments
+from .timeline import TimelineLoader
+
+RECORD_SUFFIXES = {"json": ".json", "binary": ".oab"}
+
+
+class JsonBackend(StorageBackend):
+    """Stores each animal as `animals/<id>.json` under a data root.
+
+    The record holds the animal's mutable state; its expressions are appended
+    to `timelines/<id>/` segments and only read when the timeline is used.
+    Segments are appended before the record is atomically replaced, and the
+    record's `timeline_count` bounds what readers take from them, so a load
+    always sees one complete generation of the animal without locking.
+    With `record_format="binary"` records are written as `<id>.oab` files in the
+    `codec` layout instead; either kind is read back regardless of the setting.
+    Binary data refers to stock phrases by id, so such a directory keeps the
+    phrase list it was written with in `phrases.json`.
+    """
+
+    name = "json"
+
+    def __init__(self, root: Path, record_format: str = "json") -> None:
+        if record_format not in RECORD_SUFFIXES:
+            expected = ", ".join(RECORD_SUFFIXES)
+            raise ValueError(f"unknown record format: {record_format!r} (expected one of {expected})")
+        self.root = Path(root)
+        self.record_format = record_format
+        self.animals_dir = self.root / "animals"
+        self.archives_dir = self.root / "archives"
+        self.timelines = TimelineSegments(self.root / "timelines", record_format=record_format)
+        self._timeline_counts: dict[str, int] = {}
+        self._feed: FeedIndex | None = None
+        self._index: AgentIndex | None = None
+        phrases = self.root / PHRASE_FILE
+        if record_format == "binary" or phrases.exists():
+            phrase_table().sync(phrases)
+
+    def open_args(self) -> dict:
+        return {"kind": "json", "root": str(self.root), "record_format": self.record_format}
+
+    def _ensure_dirs(self) -> None:
+        self.animals_dir.mkdir(parents=True, exist_ok=True)
+        self.archives_dir.mkdir(parents=True, exist_ok=True)
+
+    def _iter_agents(self):
+        if not self.animals_dir.exists():
+            return
+        for animal_id in self._agent_ids():
+            try:
+                yield self.load_agent(animal_id)
+            except (OSError, ValueError, KeyError):
+                continue
+
+    def _feed_index(self) -> FeedIndex:
+        if self._feed is None:
+            feed = FeedIndex(self.root / "feed.jsonl")
+            if feed.exists():
+                feed.load()
+            else:
+                feed.rebuild(self._iter_agents())
+            self._feed = feed
+        return self._feed
+
+    def _agent_index(self) -> AgentIndex:
+        if self._index is None:
+            index = AgentIndex(self.root / "indexes.json")
+            # A missing file, an old layout or a different set of animals (added,
+            # removed or renamed records) means the index can no longer be
+            # trusted; rebuild it with one full scan.
+            if not index.load() or set(index.ids()) != set(self._agent_ids()):
+                index.rebuild(self._iter_agents())
+            self._index = index
+        return self._index
+
+    # Queries go through these so they also see what other processes sharing
+    # the data directory have written; saves update the indexes under their
+    # lock files and do not need the extra look.
+    def _fresh_feed_index(self) -> FeedIndex:
+        if self._feed is not None:
+            self._feed.refresh()
+        return self._feed_index()
+
+    def _fresh_agent_index(self) -> AgentIndex:
+        if self._index is not None:
+            self._index.refresh()
+        return self._agent_index()
+
+    def _agent_ids(self) -> list[str]:
+        if not self.animals_dir.exists():
+            return []
+        ids: dict[str, None] = {}
+        for suffix in RECORD_SUFFIXES.values():
+            ids.update((path.stem, None) for path in self.animals_dir.glob(f"*{suffix}"))
+        return list(ids)
+
+    def _record_paths(self, animal_id: str) -> list[Path]:
+        """Candidate record files, the configured format first."""
+        preferred = RECORD_SUFFIXES[self.record_format]
+        suffixes = [preferred] + [suffix for suffix in RECORD_SUFFIXES.values() if suffix != preferred]
+        return [self.animals_dir / f"{animal_id}{suffix}" for suffix in suffixes]
+
+    def _read_record(self, animal_id: str) -> dict:
+        for path in self._record_paths(animal_id):
+            try:
+                data = read_bytes(path)
+            except FileNotFoundError:
+                continue
+            return decode_record(data) if is_binary(data) else json.loads(data)
+        raise AgentNotFoundError(animal_id)
+
+    def _write_record(self, animal_id: str, payload: dict) -> None:
+        path, *others = self._record_paths(animal_id)
+        if self.record_format == "binary":
+            atomic_write_bytes(path, encode_record(payload))
+        else:
+            atomic_write_text(path, json.dumps(payload, indent=2))
+        for other in others:
+            other.unlink(missing_ok=True)
+
+    def _stored_timeline_count(self, animal_id: str) -> int:
+        count = self._timeline_counts.get(animal_id)
+        if count is None:
+            try:
+                count = _segment_count(self._read_record(animal_id))
+            except AgentNotFoundError:
+                count = 0
+        return count
+
+    def save_agent(self, agent: LifeAgent) -> None:
+        self.save_agents([agent])
+
+    def save_agents(self, agents: list[LifeAgent]) -> None:
+        # Records and feed posts are written per animal; the index file is
+        # rewritten once for the whole batch rather than once per change.
+        self._ensure_dirs()
+        feed = self._feed_index()
+        index = self._agent_index()
+        for agent in agents:
+            stored = self._stored_timeline_count(agent.animal_id)
+            self.timelines.append(agent.animal_id, stored, agent.timeline.since(stored))
+            self._write_record(agent.animal_id, agent_to_record(agent, include_timeline=False))
+            self._timeline_counts[agent.animal_id] = len(agent.timeline)
+            feed.record(agent)
+        index.update_all(agents)
+
+    def load_agent(self, animal_id: str, fields: tuple[str, ...] | None = None) -> LifeAgent | AgentView:
+        payload = self._read_record(animal_id)
+        loader = self.timeline_loader(animal_id)
+        if fields is not None:
+            return project_record(payload, fields, timeline_loader=loader)
+        # Only seed the count: a reader racing a save may hold an older record,
+        # and the saver's own count is the one appends must continue from.
+        self._timeline_counts.setdefault(animal_id, _segment_count(payload))
+        return agent_from_record(payload, timeline_loader=loader)
+
+    def timeline_loader(self, animal_id: str) -> TimelineLoader:
+        return partial(self.timelines.read, animal_id)
+
+    def generation(self, animal_id: str) -> int | None:
+        # Every save renames a fresh file into place, so the inode changes with
+        # each write even when two writes share an mtime.
+        for path in self._record_paths(animal_id):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            return (stat.st_ino << 64) | stat.st_mtime_ns
+        return None
+
+    def list_agents(
+        self, creator: str | None = None, species: str | None = None, phase: str | None = None
+    ) -> list[str]:
+        if creator is None and species is None and phase is None:
+            return self._agent_ids()
+        return self._fresh_agent_index().ids(creator=creator, species=species, phase=phase)
+
+    def get_recent_feed(self, exclude_animal_id: str | None = None, limit: int = 15) -> list[dict]:
+        return self._fresh_feed_index().recent(exclude_animal_id=exclude_animal_id, limit=limit)
+
+    def list_public_feed(self, limit: int | None = None) -> list[dict]:
+        # Posts hold only the entry; who said it is read from the current rows,
+        # as the SQLite backend joins its agents table.
+        return self._fresh_feed_index().public(self._fresh_agent_index().profile, limit=limit)
+
+    def find_agent_by_slug(
+        self, slug: str, fields: tuple[str, ...] | None = None
+    ) -> LifeAgent | AgentView | None:
+        if not slug:
+            return None
+        index = self._fresh_agent_index()
+        animal_id = index.id_for_slug(slug) or (slug if slug in index else None)
+        if animal_id is None:
+            return None
+        try:
+            return self.load_agent(animal_id, fields=fields)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def migrate(self) -> int:
+        """Upgrade legacy records and move inline timelines into segments."""
+        migrated = 0
+        for animal_id in self._agent_ids():
+            payload = self._read_record(animal_id)
+            if is_current(payload) and "timeline" not in payload:
+                continue
+            self._timeline_counts[animal_id] = _segment_count(payload)
+            self.save_agent(agent_from_record(payload, timeline_loader=partial(self.timelines.read, animal_id)))
+            migrated += 1
+        return migrated
+
+    def convert(self) -> int:
+        """Rewrite every record and timeline segment in this backend's format.
+
+        Records are re-encoded through `agent_from_record`, so legacy layouts are
+        normalised on the way; inline timelines stay inline. Returns the number
+        of animals rewritten.
+        """
+        converted = 0
+        for animal_id in self._agent_ids():
+            payload = self._read_record(animal_id)
+            agent = agent_from_record(payload, timeline_loader=partial(self.timelines.read, animal_id))
+            self._write_record(animal_id, agent_to_record(agent, include_timeline="timeline" in payload))
+            self.timelines.convert(animal_id)
+            converted += 1
+        return converted
+
+    def checkpoint_state(self) -> dict:
+        return {"feed": self._fresh_feed_index().snapshot(), "index": self._fresh_agent_index().snapshot()}
+
+    def restore_state(self, state: dict) -> None:
+        # Each index is only adopted if its file is the one it was taken from;
+        # the feed then reads whatever was appended to its log since.
+        if self._feed is None and "feed" in state:
+            feed = FeedIndex(self.root / "feed.jsonl")
+            if feed.restore(state["feed"]):
+                self._feed = feed
+        if self._index is None and "index" in state:
+            index = AgentIndex(self.root / "indexes.json")
+            if index.restore(state["index"]):
+                self._index = index
+
+    def save_archive(self, animal_id: str, snapshot: ArchiveSnapshot) -> None:
+        self._ensure_dirs()
+        archive_dir = self.archives_dir / animal_id
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        path = archive_dir / f"{snapshot.tick}.json"
+        atomic_write_text(path, json.dumps(asdict(snapshot), indent=2))
+
+
+def _segment_count(payload: dict) -> int:
+    # Records written before timelines moved to segments still carry them
+    # inline; none of those entries are in the segment log yet.
+    return 0 if "timeline" in payload else payload.get("timeline_count", 0)
@@ -0,0 +1,63 @@
+"""Tick leadership shared by every process using one data directory."""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+from pathlib import Path
+from typing import IO
+
+from .files import lock_file, unlock_file
+
+
+class TickLease:
+    """Elects the single process that ticks a data directory.
+
+    The holder keeps an exclusive lock on the lease file for as long as it
+    runs. Other processes call `acquire` before each tick interval and skip the
+    interval while it fails; when the holder stops or dies the OS drops its
+    lock and the next caller takes over. The file itself records the current
+    holder for operators.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._handle: IO | None = None
+
+    @property
+    def held(self) -> bool:
+        return self._handle is not None
+
+    def acquire(self) -> bool:
+        """Take the lease if it is free; True while this object holds it."""
+        if self._handle is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = self.path.open("a+", encoding="utf-8")
+        if not lock_file(handle, blocking=False):
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(json.dumps({"pid": os.getpid(), "host": socket.gethostname(), "since": time.time()}))
+        handle.flush()
+        self._handle = handle
+        return True
+
+    def release(self) -> None:
+        if self._handle is None:
+            return
+        handle, self._handle = self._handle, None
+        try:
+            unlock_file(handle)
+        finally:
+            handle.close()
+
+    def holder(self) -> dict | None:
+        """The last recorded holder (it may no longer be running)."""
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
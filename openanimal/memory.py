@@ -2,69 +2,429 @@
 
 from __future__ import annotations
 
+import bisect
+import heapq
 import math
+import re
 import uuid
 from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import count
 
-from .config import MEMORY_DECAY_RATE, MEMORY_EARLY_BONUS_TICKS, MEMORY_MIN_WEIGHT
+from .config import MEMORY_CAPACITY, MEMORY_DECAY_RATE, MEMORY_EARLY_BONUS_TICKS, MEMORY_MIN_WEIGHT
+from .phrases import shared
 
+# Valence beyond which a memory counts towards conflict
+CONFLICT_VALENCE = 0.35
 
-@dataclass
+# Echo templates of `expression._echo_fragment`, on normalised text: every
+# echo of the same word is one memory.
+_ECHOES = [
+    re.compile(r"i keep thinking about (\S+)"),
+    re.compile(r"(\S+) is sticking with me"),
+    re.compile(r"that (\S+) feeling again"),
+]
+_PUNCTUATION = str.maketrans("", "", ".,!?\"'")
+
+
+@dataclass(slots=True)
 class Memory:
-    memory_id: str
+    # A UUID as its 128-bit integer; ids of other forms from old records stay text.
+    memory_id: int | str
     text: str
+    # Weight as of `anchor_tick`; `MemoryStore.weight` gives the current one.
     weight: float
     valence: float
     created_tick: int
     last_tick: int
     usage_count: int = 0
+    anchor_tick: int = field(default=0, compare=False)
+
+
+@lru_cache(maxsize=4096)
+def consolidation_key(text: str) -> str:
+    """Key under which `text` is remembered; near-duplicate texts share one.
+
+    Case, punctuation and spacing are ignored, and echoes of a word ("I keep
+    thinking about X.", "X is sticking with me.", ...) all map to that word.
+    """
+    normalised = " ".join(text.lower().translate(_PUNCTUATION).split())
+    for echo in _ECHOES:
+        match = echo.fullmatch(normalised)
+        if match:
+            return f"echo {match.group(1)}"
+    return normalised
+
+
+def record_count(records: list[dict], capacity: int = MEMORY_CAPACITY) -> int:
+    """Number of memories `records` load as: near-duplicates merged, at most `capacity`."""
+    return min(len({consolidation_key(record["text"]) for record in records}), max(1, capacity))
+
+
+def _compact_id(memory_id: int | str) -> int | str:
+    if isinstance(memory_id, str) and len(memory_id) == 36:
+        try:
+            value = int(memory_id.replace("-", ""), 16)
+        except ValueError:
+            return memory_id
+        if _uuid_text(value) == memory_id:
+            return value
+    return memory_id
+
+
+def _uuid_text(memory_id: int | str) -> str:
+    if isinstance(memory_id, str):
+        return memory_id
+    h = f"{memory_id:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _decayed(ticks: int) -> float:
+    # Every decay step multiplies by exp(-rate * ticks since the last touch),
+    # so k steps after a touch the exponents add up to rate * k(k+1)/2.
+    return ticks * (ticks + 1) / 2 if ticks > 0 else 0.0
+
+
+def _factor(last_tick: int, anchor_tick: int, tick: int) -> float:
+    """How much of its anchored weight a memory keeps at `tick`."""
+    if tick <= anchor_tick:
+        return 1.0
+    return math.exp(-MEMORY_DECAY_RATE * (_decayed(tick - last_tick) - _decayed(anchor_tick - last_tick)))
+
+
+class _TouchGroup:
+    """Memories sharing a last touch and an anchor tick, which one decay factor scales alike.
+
+    Holds the anchored weight sums of its strongly positive and negative
+    members, and its members ranked by weight (ties in store order).
+    """
+
+    __slots__ = ("last_tick", "anchor_tick", "positive", "negative", "ranked")
+
+    def __init__(self, last_tick: int, anchor_tick: int) -> None:
+        self.last_tick = last_tick
+        self.anchor_tick = anchor_tick
+        self.positive = 0.0
+        self.negative = 0.0
+        # (-anchored weight, store position, text), best first
+        self.ranked: list[tuple[float, int, str]] = []
+
+    def factor(self, tick: int) -> float:
+        return _factor(self.last_tick, self.anchor_tick, tick)
 
 
-@dataclass
 class MemoryStore:
-    memories: list[Memory] = field(default_factory=list)
+    """Weighted memories of one animal.
+
+    Memories are keyed by `consolidation_key`, so reinforcing a near-duplicate
+    of a remembered text reinforces that memory, and at most `capacity` are
+    kept: past it the one with the lowest current weight is forgotten. Each
+    memory keeps the weight it had at its anchor tick (its last touch, or the
+    load); the weight at the store's current tick is computed from that in
+    closed form when it is read, so `decay` does not visit every memory. A
+    min-heap of projected expiry ticks lets `decay` drop exactly the memories
+    that have fallen below `MEMORY_MIN_WEIGHT`.
+
+    Memories touched on the same tick decay alike, so the store keeps them
+    in groups (see `_TouchGroup`): `decay` rescales each group's conflict
+    sums once, making `conflict_score` a read of two running totals, and
+    `most_salient` merges the few best of each group. The decay factor
+    depends on each group's last touch, so there is no single factor for
+    the whole store: a `decay` step costs one factor per group holding
+    strongly valenced memories, not one per memory, and is not O(1).
+
+    Stores loaded from disk may keep their raw records undecoded until the
+    memories are first used; `len()` counts them as loaded either way (see
+    `record_count`). Records hold each
+    memory's weight as of the store's tick (the agent's age); duplicates in
+    older records are merged on load.
+    """
+
+    __slots__ = (
+        "tick",
+        "capacity",
+        "_records",
+        "_record_count",
+        "_by_key",
+        "_expiry",
+        "_expires_at",
+        "_sequence",
+        "_groups",
+        "_ranks",
+        "_polar",
+        "_positive",
+        "_negative",
+        "_version",
+        "_salient",
+    )
+
+    def __init__(
+        self,
+        memories: list[Memory] | None = None,
+        records: list[dict] | None = None,
+        tick: int = 0,
+        capacity: int = MEMORY_CAPACITY,
+    ) -> None:
+        self.tick = tick
+        self.capacity = max(1, capacity)
+        self._records = records if memories is None else None
+        self._record_count: int | None = None
+        self._reset()
+        if memories is not None:
+            self._index(memories)
+
+    def _reset(self) -> None:
+        self._by_key: dict[str, Memory] = {}
+        # (expiry tick, sequence, key); entries left behind by a later touch are skipped
+        self._expiry: list[tuple[int, int, str]] = []
+        self._expires_at: dict[str, int] = {}
+        self._sequence = count()
+        self._groups: dict[tuple[int, int], _TouchGroup] = {}
+        # key -> rank entry in the group of the memory's current touch; entries carry the store position
+        self._ranks: dict[str, tuple[float, int, str]] = {}
+        # Memories with positive / negative valence beyond CONFLICT_VALENCE,
+        # and their summed weights at the store's tick
+        self._polar = [0, 0]
+        self._positive = 0.0
+        self._negative = 0.0
+        self._version = 0
+        self._salient: tuple[tuple[int, int, int], list[Memory]] | None = None
+
+    @property
+    def memories(self) -> list[Memory]:
+        if self._records is not None:
+            records, self._records = self._records, None
+            memories = [Memory(**record, anchor_tick=self.tick) for record in records]
+            for memory in memories:
+                memory.memory_id = _compact_id(memory.memory_id)
+            self._index(memories)
+        return list(self._by_key.values())
+
+    @memories.setter
+    def memories(self, value: list[Memory]) -> None:
+        self._records = None
+        self._reset()
+        self._index(value)
+
+    def __len__(self) -> int:
+        if self._records is not None:
+            if self._record_count is None:
+                self._record_count = record_count(self._records, self.capacity)
+            return self._record_count
+        return len(self._by_key)
+
+    def snapshot(self) -> "MemoryStore":
+        """An independent copy, made without decoding or changing this store."""
+        records = self._records
+        if records is None:
+            records = self.to_records()
+        return MemoryStore(records=list(records), tick=self.tick, capacity=self.capacity)
+
+    def get(self, text: str) -> Memory | None:
+        """The memory `text` is remembered as, if any."""
+        self._materialise()
+        return self._by_key.get(consolidation_key(text))
+
+    def weight(self, memory: Memory) -> float:
+        """Weight of `memory` at the store's current tick."""
+        return self._weight_at(memory, self.tick)
 
     def reinforce(self, text: str, valence: float, tick: int) -> Memory:
-        for memory in self.memories:
-            if memory.text == text:
-                memory.weight = min(1.0, memory.weight + 0.12)
-                memory.valence = max(-1.0, min(1.0, (memory.valence + valence) / 2))
-                memory.last_tick = tick
-                memory.usage_count += 1
-                return memory
+        self._materialise()
+        key = consolidation_key(text)
+        memory = self._by_key.get(key)
+        if memory is not None:
+            weight = self.weight(memory)
+            position = self._ungroup(key, memory)
+            memory.weight = min(1.0, weight + 0.12)
+            memory.valence = max(-1.0, min(1.0, (memory.valence + valence) / 2))
+            memory.last_tick = tick
+            memory.anchor_tick = tick
+            memory.usage_count += 1
+            self._group(key, memory, position)
+            self._schedule(key, memory)
+            return memory
 
         weight = 0.4
         if tick <= MEMORY_EARLY_BONUS_TICKS:
             weight *= 1.3
 
         new_memory = Memory(
-            memory_id=str(uuid.uuid4()),
-            text=text,
+            memory_id=uuid.uuid4().int,
+            text=shared(text),
             weight=min(1.0, weight),
             valence=max(-1.0, min(1.0, valence)),
             created_tick=tick,
             last_tick=tick,
+            anchor_tick=tick,
         )
-        self.memories.append(new_memory)
+        self._add(key, new_memory)
+        self._evict()
         return new_memory
 
     def decay(self, tick: int) -> None:
-        for memory in self.memories:
-            delta = max(0, tick - memory.last_tick)
-            memory.weight *= math.exp(-MEMORY_DECAY_RATE * delta)
+        """Advance the store to `tick`, forgetting memories that have faded below the minimum weight.
 
-        self.memories = [memory for memory in self.memories if memory.weight >= MEMORY_MIN_WEIGHT]
+        Costs O(expired memories + touch groups with conflict sums).
+        """
+        self._materialise()
+        self.tick = tick
+        expiry, expires_at = self._expiry, self._expires_at
+        while expiry and expiry[0][0] <= tick:
+            expires, _, key = heapq.heappop(expiry)
+            if expires_at.get(key) == expires:
+                self._forget(key)
+        # Re-summed from the groups' anchored sums, so rounding never accumulates.
+        positive = negative = 0.0
+        if self._polar[0] or self._polar[1]:
+            for group in self._groups.values():
+                if group.positive or group.negative:
+                    factor = group.factor(tick)
+                    positive += group.positive * factor
+                    negative += group.negative * factor
+        self._positive, self._negative = positive, negative
+        self._version += 1
 
     def most_salient(self, limit: int = 3) -> list[Memory]:
-        return sorted(self.memories, key=lambda item: item.weight, reverse=True)[:limit]
+        """The `limit` heaviest memories, heaviest first (ties in store order)."""
+        self._materialise()
+        cache_key = (self.tick, self._version, limit)
+        if self._salient is not None and self._salient[0] == cache_key:
+            return list(self._salient[1])
+        # Within a group the ranking never changes, so only the first `limit`
+        # of each group can make the cut.
+        candidates = []
+        for group in self._groups.values():
+            factor = group.factor(self.tick)
+            for weight, position, key in group.ranked[:limit]:
+                candidates.append((-weight * factor, -position, key))
+        chosen = [self._by_key[key] for _, _, key in heapq.nlargest(limit, candidates)]
+        self._salient = (cache_key, chosen)
+        return list(chosen)
 
     def conflict_score(self) -> float:
-        if len(self.memories) < 2:
+        self._materialise()
+        if not self._polar[0] or not self._polar[1]:
             return 0.0
+        return min(1.0, (self._positive + self._negative) / 4.0)
 
-        positives = [m.weight for m in self.memories if m.valence > 0.35]
-        negatives = [m.weight for m in self.memories if m.valence < -0.35]
-        if not positives or not negatives:
-            return 0.0
+    def to_records(self) -> list[dict]:
+        """Plain records of every memory, weights as of the store's tick."""
+        return [
+            {
+                "memory_id": _uuid_text(memory.memory_id),
+                "text": memory.text,
+                "weight": self.weight(memory),
+                "valence": memory.valence,
+                "created_tick": memory.created_tick,
+                "last_tick": memory.last_tick,
+                "usage_count": memory.usage_count,
+            }
+            for memory in self.memories
+        ]
+
+    def _materialise(self) -> None:
+        if self._records is not None:
+            self.memories
+
+    def _index(self, memories: list[Memory]) -> None:
+        for memory in memories:
+            key = consolidation_key(memory.text)
+            kept = self._by_key.get(key)
+            if kept is None:
+                self._add(key, memory)
+            else:
+                self._merge(key, kept, memory)
+        self._evict()
+
+    def _merge(self, key: str, kept: Memory, other: Memory) -> None:
+        """Fold `other` into `kept`, both near-duplicates remembered under `key`."""
+        weight, other_weight = self.weight(kept), self.weight(other)
+        position = self._ungroup(key, kept)
+        total = weight + other_weight
+        if total > 0:
+            kept.valence = (kept.valence * weight + other.valence * other_weight) / total
+        kept.weight = min(1.0, total)
+        kept.created_tick = min(kept.created_tick, other.created_tick)
+        kept.last_tick = max(kept.last_tick, other.last_tick)
+        kept.anchor_tick = max(self.tick, kept.last_tick)
+        kept.usage_count += other.usage_count + 1
+        self._group(key, kept, position)
+        self._schedule(key, kept)
+
+    def _evict(self) -> None:
+        # Each group's last member is its faintest, so the store's faintest
+        # is the faintest of those.
+        while len(self._by_key) > self.capacity:
+            _, _, key = min(
+                (-weight * group.factor(self.tick), position, key)
+                for group in self._groups.values()
+                for weight, position, key in group.ranked[-1:]
+            )
+            self._forget(key)
+
+    def _forget(self, key: str) -> None:
+        self._expires_at.pop(key, None)
+        self._ungroup(key, self._by_key.pop(key))
+
+    def _add(self, key: str, memory: Memory) -> None:
+        self._by_key[key] = memory
+        self._group(key, memory, next(self._sequence))
+        self._schedule(key, memory)
+
+    def _group(self, key: str, memory: Memory, position: int) -> None:
+        group_key = (memory.last_tick, memory.anchor_tick)
+        group = self._groups.get(group_key)
+        if group is None:
+            group = self._groups[group_key] = _TouchGroup(*group_key)
+        entry = (-memory.weight, position, key)
+        bisect.insort(group.ranked, entry)
+        self._ranks[key] = entry
+        self._count(memory, group, 1)
+        self._version += 1
+
+    def _ungroup(self, key: str, memory: Memory) -> int:
+        """Take `memory` out of its group (before its touch changes); returns its store position."""
+        group_key = (memory.last_tick, memory.anchor_tick)
+        entry = self._ranks.pop(key)
+        group = self._groups[group_key]
+        del group.ranked[bisect.bisect_left(group.ranked, entry)]
+        self._count(memory, group, -1)
+        if not group.ranked:
+            del self._groups[group_key]
+        self._version += 1
+        return entry[1]
+
+    def _count(self, memory: Memory, group: _TouchGroup, sign: int) -> None:
+        if memory.valence > CONFLICT_VALENCE:
+            self._polar[0] += sign
+            group.positive += sign * memory.weight
+            self._positive += sign * memory.weight * group.factor(self.tick)
+            if not self._polar[0]:
+                self._positive = 0.0
+        elif memory.valence < -CONFLICT_VALENCE:
+            self._polar[1] += sign
+            group.negative += sign * memory.weight
+            self._negative += sign * memory.weight * group.factor(self.tick)
+            if not self._polar[1]:
+                self._negative = 0.0
+
+    def _weight_at(self, memory: Memory, tick: int) -> float:
+        return memory.weight * _factor(memory.last_tick, memory.anchor_tick, tick)
 
-        return min(1.0, (sum(positives) + sum(negatives)) / 4.0)
+    def _schedule(self, key: str, memory: Memory) -> None:
+        # First tick after the anchor at which the weight is below the minimum:
+        # solve k(k+1)/2 > target for k = tick - last_tick, then settle the
+        # rounding against `_weight_at` itself so reads and pruning agree.
+        anchor, last = memory.anchor_tick, memory.last_tick
+        if memory.weight < MEMORY_MIN_WEIGHT:
+            expires = anchor + 1
+        else:
+            target = math.log(memory.weight / MEMORY_MIN_WEIGHT) / MEMORY_DECAY_RATE + _decayed(anchor - last)
+            expires = max(anchor + 1, last + math.floor((math.sqrt(1 + 8 * target) - 1) / 2))
+            while self._weight_at(memory, expires) >= MEMORY_MIN_WEIGHT:
+                expires += 1
+            while expires > anchor + 1 and self._weight_at(memory, expires - 1) < MEMORY_MIN_WEIGHT:
+                expires -= 1
+        self._expires_at[key] = expires
+        heapq.heappush(self._expiry, (expires, next(self._sequence), key))
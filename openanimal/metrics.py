@@ -0,0 +1,132 @@
+"""Phase timing and opt-in profiling for simulator runs."""
+
+from __future__ import annotations
+
+import cProfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+PROFILE_MODES = ("cpu", "memory")
+
+
+class PhaseTimer:
+    """Wall time and call counts per named phase.
+
+    Phases nest: time spent in an inner phase is charged to it alone, so the
+    phases of a run add up to the time they covered.
+    """
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        # [name, start, time spent in nested phases] per open phase
+        self._stack: list[list] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - frame[2]
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def wrap(self, name: str, func: F) -> F:
+        """`func` with every call timed as phase `name`."""
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+
+        return timed
+
+
+class RunProfiler:
+    """Captures cProfile and/or tracemalloc data around simulator runs.
+
+    `modes` holds "cpu" and/or "memory". The profile of `every` consecutive
+    runs is collected and then dumped to `directory`: `*.prof` files for
+    `pstats`/snakeviz, and `*.tracemalloc` snapshots plus a `*.mem.txt`
+    summary of the largest allocation sites. Only the thread calling `run`
+    is profiled.
+    """
+
+    def __init__(self, modes: tuple[str, ...], directory: Path, every: int = 1) -> None:
+        unknown = [mode for mode in modes if mode not in PROFILE_MODES]
+        if unknown:
+            raise ValueError(f"unknown profile mode: {', '.join(unknown)} (expected {', '.join(PROFILE_MODES)})")
+        self.modes = modes
+        self.directory = Path(directory)
+        self.every = max(1, every)
+        self.runs = 0
+        self.dumped: list[Path] = []
+        self._profile: cProfile.Profile | None = None
+        self._started_tracing = False
+
+    @contextmanager
+    def capture(self) -> Iterator[None]:
+        if "memory" in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if "cpu" in self.modes:
+            if self._profile is None:
+                self._profile = cProfile.Profile()
+            self._profile.enable()
+        try:
+            yield
+        finally:
+            if self._profile is not None:
+                self._profile.disable()
+            self.runs += 1
+            if self.runs % self.every == 0:
+                self.dump()
+
+    def dump(self) -> list[Path]:
+        """Write what has been captured since the last dump; returns the new files."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = self.directory / f"run-{time.strftime('%Y%m%d-%H%M%S')}-{self.runs}"
+        paths: list[Path] = []
+        if self._profile is not None:
+            path = stem.with_suffix(".prof")
+            self._profile.dump_stats(path)
+            self._profile = None
+            paths.append(path)
+        if "memory" in self.modes and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            path = stem.with_suffix(".tracemalloc")
+            snapshot.dump(str(path))
+            summary = stem.with_suffix(".mem.txt")
+            current, peak = tracemalloc.get_traced_memory()
+            lines = [f"current={current} peak={peak}"]
+            lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:30])
+            summary.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            tracemalloc.reset_peak()
+            paths.extend((path, summary))
+        self.dumped.extend(paths)
+        return paths
+
+    def close(self) -> None:
+        """Stop memory tracing if this profiler started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+def parse_profile_modes(value: str) -> tuple[str, ...]:
+    """Modes named by a setting such as `cpu`, `memory`, `cpu,memory` or `all`; empty means off."""
+    value = value.strip().lower()
+    if value in ("all", "1", "true", "yes"):
+        return PROFILE_MODES
+    return tuple(mode for mode in (part.strip() for part in value.split(",")) if mode and mode not in ("0", "off"))
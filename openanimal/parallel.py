@@ -0,0 +1,227 @@
+"""Sharded, multi-process execution of simulator runs.
+
+Animal ids are split into stable shards (by a hash of the id) and each shard
+is ticked for the whole run by one task in a `ProcessPoolExecutor`. Between
+ticks the coordinator and the shards exchange only small messages: the merged
+recent-feed snapshot, the sample fraction and any births going in; the
+sampled ids and the feed items of new expressions coming back. At the end of the
+run each shard returns the records of the agents it ticked and the coordinator,
+the only writer, folds them into its cache.
+
+Workers read agents from storage but never save them, so the file backend's
+shared feed and index files keep a single writer. Archives are per-animal and
+are written by the workers directly.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import random
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict
+from typing import Callable
+
+from .agent import LifeAgent
+from .batch import BatchTicker
+from .cache import AgentCache
+from .config import RECENT_FEED_LIMIT
+from .feed import RecentFeed
+from .records import AGENT_FIELDS, agent_from_record, agent_to_record
+from .scheduler import WakeupScheduler
+from .storage import open_backend
+from .world import WorldSignalStream
+
+# Seconds between checks for a failed shard while waiting for replies.
+_POLL_SECONDS = 0.5
+
+
+def shard_of(animal_id: str, shards: int) -> int:
+    return zlib.crc32(animal_id.encode("utf-8")) % shards
+
+
+class ShardPool:
+    """Worker processes plus the queues used to talk to running shards.
+
+    Processes are started on first use and reused across runs; call `close`
+    to stop them.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._manager = self._context.Manager()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._manager.shutdown()
+            self._executor = None
+            self._manager = None
+
+    def run(
+        self,
+        cache: AgentCache,
+        population: list[str],
+        recent_feed: RecentFeed,
+        ticks: int,
+        rng: random.Random,
+        world_seed: int,
+        births: Callable[[int, list[str]], list[LifeAgent]],
+        defer_idle: bool = True,
+    ) -> tuple[int, int, int]:
+        """Tick `population` for `ticks` ticks across the shards.
+
+        Returns the number of expressions, of agent ticks, and of animals
+        (newborns included) that sat out the last tick.
+
+        After every tick `births(sampled, parents)` is called with the number
+        of animals ticked and their ids, as in a serial run, and returns the
+        newborns, which join a shard next tick.
+        """
+        self.start()
+        # Workers load agents from storage, so it has to be current.
+        cache.flush()
+        shards: list[list[str]] = [[] for _ in range(self.workers)]
+        for animal_id in population:
+            shards[shard_of(animal_id, self.workers)].append(animal_id)
+        inboxes = [self._manager.Queue() for _ in shards]
+        outbox = self._manager.Queue()
+        backend_args = cache.backend.open_args()
+        futures = [
+            self._executor.submit(
+                run_shard,
+                backend_args,
+                ids,
+                rng.getrandbits(64),
+                world_seed,
+                inboxes[index],
+                outbox,
+                index,
+                defer_idle,
+            )
+            for index, ids in enumerate(shards)
+        ]
+
+        expressions = agent_ticks = backlog = 0
+        pending_births: list[list[dict]] = [[] for _ in shards]
+        try:
+            for _ in range(ticks):
+                fraction = rng.uniform(0.4, 0.9)
+                snapshot = recent_feed.snapshot()
+                for index, inbox in enumerate(inboxes):
+                    inbox.put(
+                        {
+                            "feed": snapshot,
+                            "capacity": recent_feed.capacity,
+                            "fraction": fraction,
+                            "births": pending_births[index],
+                        }
+                    )
+                pending_births = [[] for _ in shards]
+
+                replies = sorted(_collect(outbox, futures, len(shards)))
+                sampled: list[str] = []
+                for _, sample, produced in replies:
+                    sampled.extend(sample)
+                    expressions += len(produced)
+                    for item in produced:
+                        recent_feed.add(item)
+                agent_ticks += len(sampled)
+                for child in births(len(sampled), sampled):
+                    population.append(child.animal_id)
+                    index = shard_of(child.animal_id, self.workers)
+                    pending_births[index].append(agent_to_record(child))
+                backlog = len(population) - len(sampled)
+        finally:
+            for inbox in inboxes:
+                inbox.put(None)
+
+        for future in futures:
+            for record, entries in future.result():
+                _apply(cache, record, entries)
+        return expressions, agent_ticks, backlog
+
+
+def _collect(outbox, futures: list[Future], count: int) -> list[tuple]:
+    replies = []
+    while len(replies) < count:
+        try:
+            replies.append(outbox.get(timeout=_POLL_SECONDS))
+        except queue.Empty:
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+    return replies
+
+
+def _apply(cache: AgentCache, record: dict, entries: list[dict]) -> None:
+    """Fold a shard's result into the coordinator's copy of the agent."""
+    agent = cache.get(record["animal_id"])
+    ticked = agent_from_record(record)
+    for name in AGENT_FIELDS:
+        if name != "timeline":
+            setattr(agent, name, getattr(ticked, name))
+    for entry in entries:
+        agent.timeline.add_expression(**entry)
+    cache.mark_dirty(agent)
+
+
+def run_shard(
+    backend_args: dict,
+    animal_ids: list[str],
+    seed: int,
+    world_seed: int,
+    inbox,
+    outbox,
+    shard: int,
+    defer_idle: bool = True,
+) -> list:
+    """Worker side: tick one shard until the coordinator sends `None`.
+
+    Returns `(record, new_timeline_entries)` for every agent the shard ticked.
+    """
+    backend = open_backend(**backend_args)
+    rng = random.Random(seed)
+    # Every shard sees the coordinator's world: signals depend only on the tick.
+    world = WorldSignalStream(seed=world_seed)
+    scheduler = WakeupScheduler(BatchTicker(), defer=defer_idle)
+    ids = list(animal_ids)
+    # animal_id -> (agent, timeline length when loaded)
+    loaded: dict[str, tuple[LifeAgent, int]] = {}
+
+    def load(animal_id: str) -> LifeAgent:
+        if animal_id not in loaded:
+            agent = backend.load_agent(animal_id)
+            loaded[animal_id] = (agent, len(agent.timeline))
+        return loaded[animal_id][0]
+
+    try:
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            for record in message["births"]:
+                loaded[record["animal_id"]] = (agent_from_record(record), 0)
+                ids.append(record["animal_id"])
+            sample = ids
+            sample_size = max(1, int(len(ids) * message["fraction"]))
+            if ids and sample_size < len(ids):
+                sample = rng.sample(ids, k=sample_size)
+            feed = RecentFeed(message["feed"], limit=RECENT_FEED_LIMIT, capacity=message["capacity"])
+            _, produced = scheduler.tick(sample, load, world, feed, backend.save_archive)
+            outbox.put((shard, sample, produced))
+        scheduler.settle(load, world, backend.save_archive)
+        return [
+            (agent_to_record(ticked, include_timeline=False), [asdict(e) for e in ticked.timeline.since(start)])
+            for ticked, start in loaded.values()
+        ]
+    finally:
+        backend.close()
@@ -0,0 +1,110 @@
+"""Process-wide dictionary of stock phrases.
+
+Nearly every sentence an animal says or remembers is one of a few hundred
+phrases (see `expression.stock_phrases`). The table numbers them so binary
+records and timeline frames store a small id instead of the text, and hands
+out one shared string per phrase, so the memories and timelines of a whole
+population point at the same few hundred objects. Other text is stored as is.
+
+Ids are append-only. A data directory keeps the list its records were written
+with (`phrases.json`), and `PhraseTable.sync` makes the process table agree
+with it before records there are read or written, so ids stay valid when the
+stock lists change.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable
+
+from .files import atomic_write_text, read_bytes
+
+PHRASE_FILE = "phrases.json"
+
+
+class PhraseTableError(ValueError):
+    """Raised when a persisted phrase list conflicts with the ids already in use."""
+
+
+class PhraseTable:
+    """Two-way map between phrases and ids `0 .. len - 1`."""
+
+    def __init__(self, phrases: Iterable[str] = ()) -> None:
+        self._texts: list[str] = []
+        self._ids: dict[str, int] = {}
+        # Set once ids have been handed out or agreed with a data directory
+        self._frozen = False
+        self._extend(phrases)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def id(self, text: str) -> int | None:
+        self._frozen = True
+        return self._ids.get(text)
+
+    def text(self, phrase_id: int) -> str:
+        self._frozen = True
+        if not 0 <= phrase_id < len(self._texts):
+            raise PhraseTableError(f"unknown phrase id {phrase_id}")
+        return self._texts[phrase_id]
+
+    def shared(self, text: str) -> str:
+        """The table's copy of `text` if it is a stock phrase, else `text` itself."""
+        phrase_id = self._ids.get(text)
+        return text if phrase_id is None else self._texts[phrase_id]
+
+    def fingerprint(self, count: int | None = None) -> str:
+        """Digest of the first `count` phrases (default: all)."""
+        texts = self._texts if count is None else self._texts[:count]
+        return hashlib.sha256("\n".join(texts).encode("utf-8")).hexdigest()
+
+    def sync(self, path: Path) -> None:
+        """Agree with the phrase list persisted at `path`, adding this table's new phrases to it.
+
+        Raises PhraseTableError if the list numbers phrases differently from
+        ids this table has already handed out.
+        """
+        path = Path(path)
+        try:
+            persisted = json.loads(read_bytes(path))
+        except FileNotFoundError:
+            persisted = []
+        if self._texts[: len(persisted)] != persisted[: len(self._texts)]:
+            if self._frozen:
+                raise PhraseTableError(f"{path} numbers phrases differently from ids already in use")
+            current, self._texts, self._ids = self._texts, [], {}
+            self._extend(persisted + current)
+        else:
+            self._extend(persisted)
+        self._frozen = True
+        if len(self._texts) > len(persisted):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(path, json.dumps(self._texts, indent=2))
+
+    def _extend(self, phrases: Iterable[str]) -> None:
+        for text in phrases:
+            if text not in self._ids:
+                self._ids[text] = len(self._texts)
+                self._texts.append(text)
+
+
+_table: PhraseTable | None = None
+
+
+def phrase_table() -> PhraseTable:
+    """The process-wide table, seeded with the stock phrases on first use."""
+    global _table
+    if _table is None:
+        # Imported here: expression depends on memory, which interns through this module.
+        from .expression import stock_phrases
+
+        _table = PhraseTable(stock_phrases())
+    return _table
+
+
+def shared(text: str) -> str:
+    """`text`, as the process-wide table's shared copy when it is a stock phrase."""
+    return phrase_table().shared(text)
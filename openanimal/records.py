@@ -0,0 +1,260 @@
+"""Plain-record encoding of agents, shared by all storage backends."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+
+from .agent import LifeAgent
+from .config import STATE_KEYS
+from .memory import MemoryStore, record_count
+from .timeline import ExpressionEntry, Timeline, TimelineLoader
+
+# Bump when the record layout changes; `upgrade_record` brings older records up.
+RECORD_VERSION = 1
+
+PHASE_MAP = {
+    "infancy": "infant",
+    "early_growth": "juvenile",
+    "adolescence": "mature",
+    "maturity": "elder",
+}
+
+
+def agent_to_record(agent: LifeAgent, include_timeline: bool = True) -> dict:
+    """Serialise an agent into a JSON-compatible dict.
+
+    Without the timeline, the record carries only its length and last entry;
+    backends that store expressions separately use those to answer cheap reads.
+    """
+    payload = {
+        "schema_version": RECORD_VERSION,
+        "animal_id": agent.animal_id,
+        "created_at": agent.created_at,
+        "age_ticks": agent.age_ticks,
+        "phase": agent.phase,
+        "state": dict(agent.state),
+        "pressure": agent.pressure,
+        "tolerance": agent.tolerance,
+        "last_expression_tick": agent.last_expression_tick,
+        "rng_seed": agent.rng_seed,
+        "creator": getattr(agent, "creator", ""),
+        "species": agent.species,
+        "slug": agent.slug,
+        "temperament": agent.temperament,
+        "encounters": _encounter_records(agent),
+        "silent_until_tick": agent.silent_until_tick,
+        "missing_until_tick": agent.missing_until_tick,
+        "memory": agent.memory.to_records(),
+    }
+    if include_timeline:
+        payload["timeline"] = [asdict(entry) for entry in agent.timeline.expressions]
+    else:
+        last = agent.timeline.last
+        payload["timeline_count"] = len(agent.timeline)
+        payload["last_expression"] = asdict(last) if last else None
+    return payload
+
+
+def _encounter_records(agent: LifeAgent) -> dict[str, dict]:
+    return {
+        other_id: {"score": encounter.score, "last_tick": encounter.last_tick}
+        for other_id, encounter in list(agent.encounters.items())
+    }
+
+
+def _phase(payload: dict) -> str:
+    phase = payload.get("phase", "infant")
+    return PHASE_MAP.get(phase, phase)
+
+
+def _state(payload: dict) -> dict[str, float]:
+    state = payload.get("state", {})
+    if not all(key in state for key in STATE_KEYS):
+        state = {
+            "arousal": float(state.get("stress", 0.5)),
+            "curiosity": float(state.get("curiosity", 0.5)),
+            "fatigue": float(1.0 - float(state.get("energy", 0.5))),
+            "social_tolerance": float(1.0 - float(state.get("restlessness", 0.5))),
+        }
+    return state
+
+
+def _slug(payload: dict) -> str:
+    species = payload.get("species", "unknown")
+    slug = payload.get("slug")
+    if not slug:
+        slug = f"{species}-{payload['animal_id'][:6]}" if species != "unknown" else payload["animal_id"][:8]
+    return slug
+
+
+def upgrade_record(payload: dict) -> dict:
+    """Translate a record from an older layout to the current one.
+
+    Covers the old phase names, the energy/stress/restlessness state and
+    missing slugs or optional fields. Timeline fields are left as they are.
+    """
+    upgraded = dict(payload)
+    upgraded.update(
+        schema_version=RECORD_VERSION,
+        phase=_phase(payload),
+        state=_state(payload),
+        slug=_slug(payload),
+        rng_seed=payload.get("rng_seed", 0),
+        creator=payload.get("creator", "") or "",
+        species=payload.get("species", "unknown"),
+        temperament=payload.get("temperament", []),
+        encounters=payload.get("encounters", {}),
+        silent_until_tick=payload.get("silent_until_tick", 0),
+        missing_until_tick=payload.get("missing_until_tick", 0),
+        memory=payload.get("memory", []),
+    )
+    return upgraded
+
+
+def is_current(payload: dict) -> bool:
+    return payload.get("schema_version") == RECORD_VERSION
+
+
+def _current(payload: dict) -> dict:
+    return payload if is_current(payload) else upgrade_record(payload)
+
+
+def _memory(payload: dict) -> MemoryStore:
+    return MemoryStore(records=payload["memory"], tick=payload["age_ticks"])
+
+
+def _timeline(payload: dict, timeline_loader: TimelineLoader | None) -> Timeline:
+    if "timeline" in payload or timeline_loader is None:
+        return Timeline(expressions=[ExpressionEntry(**entry) for entry in payload.get("timeline", [])])
+    last = payload.get("last_expression")
+    return Timeline(
+        stored_count=payload.get("timeline_count", 0),
+        last=ExpressionEntry(**last) if last else None,
+        loader=timeline_loader,
+    )
+
+
+def _last_expression(payload: dict) -> ExpressionEntry | None:
+    if "timeline" in payload:
+        return ExpressionEntry(**payload["timeline"][-1]) if payload["timeline"] else None
+    last = payload.get("last_expression")
+    return ExpressionEntry(**last) if last else None
+
+
+# Decoders for every field a projection may ask for, applied to current-version
+# records. Besides the LifeAgent attributes, `timeline_count`, `memory_count`
+# and `last_expression` are derived without decoding the memory list or
+# reading the timeline.
+FIELD_DECODERS = {
+    "animal_id": lambda p, _: p["animal_id"],
+    "created_at": lambda p, _: p["created_at"],
+    "age_ticks": lambda p, _: p["age_ticks"],
+    "phase": lambda p, _: p["phase"],
+    "state": lambda p, _: p["state"],
+    "pressure": lambda p, _: p["pressure"],
+    "tolerance": lambda p, _: p["tolerance"],
+    "last_expression_tick": lambda p, _: p["last_expression_tick"],
+    "rng_seed": lambda p, _: p["rng_seed"],
+    "creator": lambda p, _: p["creator"],
+    "species": lambda p, _: p["species"],
+    "slug": lambda p, _: p["slug"],
+    "temperament": lambda p, _: p["temperament"],
+    "encounters": lambda p, _: p["encounters"],
+    "silent_until_tick": lambda p, _: p["silent_until_tick"],
+    "missing_until_tick": lambda p, _: p["missing_until_tick"],
+    "memory": lambda p, _: _memory(p),
+    "timeline": _timeline,
+    "memory_count": lambda p, _: record_count(p["memory"]),
+    "timeline_count": lambda p, _: len(p["timeline"]) if "timeline" in p else p.get("timeline_count", 0),
+    "last_expression": lambda p, _: _last_expression(p),
+}
+DERIVED_FIELDS = ("memory_count", "timeline_count", "last_expression")
+AGENT_FIELDS = tuple(name for name in FIELD_DECODERS if name not in DERIVED_FIELDS)
+
+
+class AgentView:
+    """Read-only subset of an agent's fields, as returned by `load_agent(fields=...)`."""
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values: dict) -> None:
+        self._values = values
+
+    def __getattr__(self, name: str):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f"field {name!r} was not loaded") from None
+
+    def __repr__(self) -> str:
+        return f"AgentView({self._values!r})"
+
+    def as_dict(self) -> dict:
+        return dict(self._values)
+
+
+def _check_fields(fields) -> None:
+    unknown = [name for name in fields if name not in FIELD_DECODERS]
+    if unknown:
+        raise ValueError(f"unknown agent fields: {', '.join(unknown)}")
+
+
+def project_record(payload: dict, fields, timeline_loader: TimelineLoader | None = None) -> AgentView:
+    """Decode only `fields` from a stored record."""
+    _check_fields(fields)
+    payload = _current(payload)
+    return AgentView({name: FIELD_DECODERS[name](payload, timeline_loader) for name in fields})
+
+
+def project_agent(agent: LifeAgent, fields) -> AgentView:
+    """Projection of an already materialised agent (e.g. a cached one).
+
+    The view holds copies: the agent may go on being ticked by another thread,
+    and reading a view never loads or decodes anything into the agent itself.
+    """
+    _check_fields(fields)
+    # Derived fields, and mutable or compact fields copied into record form.
+    derived = {
+        "state": lambda: dict(agent.state),
+        "temperament": lambda: list(agent.temperament),
+        "encounters": lambda: _encounter_records(agent),
+        "memory": lambda: agent.memory.snapshot(),
+        "timeline": lambda: agent.timeline.snapshot(),
+        "memory_count": lambda: len(agent.memory),
+        "timeline_count": lambda: len(agent.timeline),
+        "last_expression": lambda: agent.timeline.last,
+    }
+    return AgentView(
+        {name: derived[name]() if name in derived else getattr(agent, name) for name in fields}
+    )
+
+
+def agent_from_record(payload: dict, timeline_loader: TimelineLoader | None = None) -> LifeAgent:
+    """Build an agent from a stored record, translating legacy layouts.
+
+    Current-version records skip the translation entirely. Memories are
+    decoded on first use; records without an inline timeline get a lazy one
+    backed by `timeline_loader`.
+    """
+    payload = _current(payload)
+    return LifeAgent(**{name: FIELD_DECODERS[name](payload, timeline_loader) for name in AGENT_FIELDS})
+
+
+def feed_item(animal_id: str, entry: ExpressionEntry) -> dict:
+    """Recent-feed item used for agent interaction."""
+    public_tick = entry.public_tick if entry.public_tick is not None else entry.tick
+    return {"animal_id": animal_id, "tick": entry.tick, "public_tick": public_tick, "sentences": entry.sentences}
+
+
+def feed_post(item: dict, profile: dict) -> dict:
+    """Public feed post: a feed item with the animal's current slug, species, phase and creator."""
+    return {
+        "animal_id": item["animal_id"],
+        "slug": profile["slug"],
+        "species": profile["species"],
+        "phase": profile["phase"],
+        "tick": item["tick"],
+        "public_tick": item["public_tick"],
+        "sentences": item["sentences"],
+        "creator": profile["creator"],
+    }
@@ -0,0 +1,169 @@
+"""Counter-based random numbers.
+
+SplitMix64 turns a key and a counter into well-mixed 64-bit values without
+any generator state, so the value for a given (key, counter) can be computed
+in any order, in any process.
+"""
+
+from __future__ import annotations
+
+import random
+from bisect import bisect
+from functools import lru_cache
+from itertools import accumulate
+from typing import Callable, Sequence, TypeVar, Union
+
+from .env import get_rng_kind
+
+try:
+    import numpy as np
+except ImportError:  # Only `uniform_block` needs NumPy.
+    np = None
+
+T = TypeVar("T")
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+# 2**-53: scales the top 53 bits of a 64-bit value into [0, 1).
+_UNIT = 1.0 / (1 << 53)
+
+
+def splitmix64(state: int) -> int:
+    """The SplitMix64 output for `state` (advanced by one gamma, then mixed)."""
+    z = (state + GOLDEN_GAMMA) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def counter_bits(key: int, counter: int) -> int:
+    """64 random bits for `counter` in the stream keyed by `key`."""
+    return splitmix64((key + counter * GOLDEN_GAMMA) & MASK64)
+
+
+def unit_float(bits: int) -> float:
+    """Uniform float in [0, 1) from 64 random bits."""
+    return (bits >> 11) * _UNIT
+
+
+_MASK32 = (1 << 32) - 1
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+
+
+def tick_state(seed: int, tick: int) -> int:
+    """Starting state of the stream for one agent tick.
+
+    Seed and tick are packed into one 64-bit word and mixed, so every
+    (seed, tick) pair below 2**32 starts from a distinct, scattered state.
+    """
+    return splitmix64(((seed & _MASK32) << 32) | (tick & _MASK32))
+
+
+class TickRandom:
+    """Small deterministic RNG for one agent tick, keyed by `(seed, tick)`.
+
+    A SplitMix64 sequence: creating one costs a single mix, against seeding
+    a Mersenne Twister's 624-word state. It offers the parts of the
+    `random.Random` interface the simulation uses. `randint` and `choice`
+    scale a float instead of rejecting out-of-range bits, which is
+    unbiased to within 2**-53.
+    """
+
+    __slots__ = ("_state",)
+
+    def __init__(self, seed: int, tick: int) -> None:
+        self._state = tick_state(seed, tick)
+
+    @classmethod
+    def from_state(cls, state: int) -> "TickRandom":
+        rng = cls.__new__(cls)
+        rng._state = state & MASK64
+        return rng
+
+    def random(self) -> float:
+        self._state = z = (self._state + GOLDEN_GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * _MIX1) & MASK64
+        z = ((z ^ (z >> 27)) * _MIX2) & MASK64
+        return ((z ^ (z >> 31)) >> 11) * _UNIT
+
+    def uniform(self, a: float, b: float) -> float:
+        return a + (b - a) * self.random()
+
+    def randint(self, a: int, b: int) -> int:
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq: Sequence[T]) -> T:
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[int(self.random() * len(seq))]
+
+    def choices(self, population: Sequence[T], weights: Sequence[float] | None = None, k: int = 1) -> list[T]:
+        n = len(population)
+        if weights is None:
+            return [population[int(self.random() * n)] for _ in range(k)]
+        cumulative = list(accumulate(weights))
+        if len(cumulative) != n:
+            raise ValueError("The number of weights does not match the population")
+        total = cumulative[-1]
+        return [population[bisect(cumulative, self.random() * total, 0, n - 1)] for _ in range(k)]
+
+    def sample(self, population: Sequence[T], k: int) -> list[T]:
+        pool = list(population)
+        n = len(pool)
+        if not 0 <= k <= n:
+            raise ValueError("Sample larger than population or is negative")
+        # Partial Fisher-Yates: the first k slots end up a uniform sample.
+        for i in range(k):
+            j = i + int(self.random() * (n - i))
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+
+def uniform_block(states: list[int], count: int):
+    """NumPy array of the next `count` `random()` values of each stream, one row per state.
+
+    Gives exactly the floats `TickRandom.from_state(state).random()` would,
+    `count` times; the caller advances its own RNGs by `count` draws.
+    """
+    steps = np.arange(1, count + 1, dtype=np.uint64) * np.uint64(GOLDEN_GAMMA)
+    z = np.array(states, dtype=np.uint64)[:, None] + steps
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX2)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * _UNIT
+
+
+Rng = Union[random.Random, TickRandom]
+RNG_KINDS = ("splitmix", "mt")
+
+
+def _mersenne(seed: int, tick: int) -> random.Random:
+    return random.Random(seed + tick)
+
+
+def tick_rng_factory(kind: str | None = None) -> Callable[[int, int], Rng]:
+    """Constructor for per-tick RNGs: `TickRandom`, or with `kind="mt"` (or
+    `OPENANIMAL_RNG=mt`) the `random.Random(seed + tick)` streams of older
+    releases.
+    """
+    kind = kind or get_rng_kind()
+    if kind == "splitmix":
+        return TickRandom
+    if kind == "mt":
+        return _mersenne
+    raise ValueError(f"unknown RNG kind: {kind!r} (expected one of {', '.join(RNG_KINDS)})")
+
+
+@lru_cache(maxsize=1)
+def configured_tick_rng() -> Callable[[int, int], Rng]:
+    """`tick_rng_factory()` for `OPENANIMAL_RNG`, looked up once per process.
+
+    Call `configured_tick_rng.cache_clear()` after changing the variable.
+    """
+    return tick_rng_factory()
+
+
+def tick_rng(seed: int, tick: int) -> Rng:
+    """The RNG for one agent tick under the configured kind."""
+    return configured_tick_rng()(seed, tick)
@@ -0,0 +1,141 @@
+"""Per-tick scheduling of the agents a simulator run advances."""
+
+from __future__ import annotations
+
+import heapq
+from typing import Callable
+
+from .agent import LifeAgent
+from .archive import ArchiveSnapshot
+from .batch import BatchTicker, tick_agents
+from .config import AGENT_TICK_COST_ESTIMATE, FAIR_PRESSURE_WEIGHT
+from .feed import RecentFeed
+from .world import WorldSignalStream
+
+
+class WakeupScheduler:
+    """Ticks sampled agents, deferring the ticks that cannot involve other animals.
+
+    A tick before an agent's `next_active_tick` is self-contained: the agent
+    ages, drifts, decays and may roll a rare event, but it neither reads nor
+    adds to the feed. Such ticks are only counted when sampled, and replayed
+    in batches right before the agent's next eventful tick, or by `settle` at
+    the end of the run. World signals depend only on the tick, so the outcome
+    is the same as ticking every sampled agent immediately, without loading
+    idle agents on every sample.
+
+    Keep one scheduler per run: it trusts its own view of the agents it has
+    ticked until `settle`.
+    """
+
+    def __init__(self, ticker: BatchTicker, defer: bool = True) -> None:
+        self.ticker = ticker
+        self.defer = defer
+        self.deferred = 0
+        # animal_id -> (age before its next tick, first age that may be eventful)
+        self._known: dict[str, tuple[int, int]] = {}
+        # animal_id -> deferred ticks not yet run
+        self._queued: dict[str, int] = {}
+
+    def tick(
+        self,
+        animal_ids: list[str],
+        load: Callable[[str], LifeAgent],
+        world: WorldSignalStream,
+        recent_feed: RecentFeed,
+        save_archive: Callable[[str, ArchiveSnapshot], None],
+    ) -> tuple[list[LifeAgent], list[dict]]:
+        """One simulator tick for the sampled ids, in order.
+
+        Returns the agents that were advanced and the feed items of their new
+        expressions.
+        """
+        agents: list[LifeAgent] = []
+        for animal_id in animal_ids:
+            known = self._known.get(animal_id)
+            if known is not None and self.defer:
+                age, active = known
+                if age + 1 < active:
+                    self._queued[animal_id] = self._queued.get(animal_id, 0) + 1
+                    self._known[animal_id] = (age + 1, active)
+                    self.deferred += 1
+                    continue
+            agents.append(load(animal_id))
+
+        self._replay([agent for agent in agents if agent.animal_id in self._queued], world, save_archive)
+        worlds = [world.signals_for_tick(agent.age_ticks) for agent in agents]
+        produced = tick_agents(agents, worlds, self.ticker, recent_feed, save_archive)
+        for agent in agents:
+            self._known[agent.animal_id] = (agent.age_ticks, agent.next_active_tick())
+        return agents, produced
+
+    def settle(
+        self,
+        load: Callable[[str], LifeAgent],
+        world: WorldSignalStream,
+        save_archive: Callable[[str, ArchiveSnapshot], None],
+    ) -> list[LifeAgent]:
+        """Run every deferred tick; returns the agents that were advanced."""
+        agents = [load(animal_id) for animal_id in self._queued]
+        self._replay(agents, world, save_archive)
+        self._known.clear()
+        return agents
+
+    def _replay(
+        self,
+        agents: list[LifeAgent],
+        world: WorldSignalStream,
+        save_archive: Callable[[str, ArchiveSnapshot], None],
+    ) -> None:
+        # Each step advances every agent that still has deferred ticks, so
+        # each batch covers as many agents as possible.
+        queues = [(agent, self._queued.pop(agent.animal_id)) for agent in agents]
+        idle_feed = RecentFeed()
+        step = 0
+        while queues:
+            batch = [agent for agent, _ in queues]
+            worlds = [world.signals_for_tick(agent.age_ticks) for agent in batch]
+            tick_agents(batch, worlds, self.ticker, idle_feed, save_archive)
+            step += 1
+            queues = [(agent, count) for agent, count in queues if step < count]
+
+
+class FairScheduler:
+    """Chooses which agents to tick when ticks have a wall-clock budget.
+
+    Agents are ranked by the ticks they have waited since they were last
+    ticked plus a bonus for pressure, so restless animals go first; pressure
+    is bounded while waiting is not, so every animal's rank keeps rising until
+    it is picked and none starves. The sample size follows a running estimate
+    of what one agent tick costs.
+    """
+
+    def __init__(
+        self, pressure_weight: float = FAIR_PRESSURE_WEIGHT, cost_estimate: float = AGENT_TICK_COST_ESTIMATE
+    ) -> None:
+        self.pressure_weight = pressure_weight
+        self.cost = cost_estimate
+        self.tick = 0
+        self._last: dict[str, int] = {}
+        self._pressure: dict[str, float] = {}
+
+    def select(self, animal_ids: list[str], budget_seconds: float) -> list[str]:
+        """The ids that fit in `budget_seconds`, highest rank first."""
+        count = max(1, min(len(animal_ids), int(budget_seconds / self.cost)))
+        last, pressure, weight, now = self._last, self._pressure, self.pressure_weight, self.tick
+
+        def rank(animal_id: str) -> float:
+            # Never-ticked animals rank as if last ticked before the first tick.
+            return now - last.get(animal_id, -1) + weight * pressure.get(animal_id, 0.0)
+
+        return heapq.nlargest(count, animal_ids, key=rank)
+
+    def record(self, animal_ids: list[str], agents: list[LifeAgent], seconds: float) -> None:
+        """Note a tick of `animal_ids` that took `seconds`; `agents` are the ones actually advanced."""
+        for animal_id in animal_ids:
+            self._last[animal_id] = self.tick
+        for agent in agents:
+            self._pressure[agent.animal_id] = agent.pressure
+        if animal_ids:
+            self.cost = 0.7 * self.cost + 0.3 * (seconds / len(animal_ids))
+        self.tick += 1
@@ -0,0 +1,134 @@
+"""Append-only, rolling timeline segments for file-based storage."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict
+from pathlib import Path
+
+from .codec import decode_entries, encode_entry, frames_size
+from .config import TIMELINE_SEGMENT_ENTRIES
+from .files import io_stats, read_bytes
+from .timeline import ExpressionEntry
+
+SEGMENT_SUFFIXES = {"json": ".jsonl", "binary": ".seg"}
+
+
+class TimelineSegments:
+    """Per-animal expression log split into fixed-size JSONL segments.
+
+    Entry `i` of an animal lives on line `i % segment_entries` of segment
+    `i // segment_entries`, so appends only ever touch the newest segment and
+    a range read opens just the segments that overlap it.
+
+    With `record_format="binary"` new segments are `.seg` files of
+    `codec.encode_entry` frames; a segment keeps the format it was started in.
+
+    Bytes past the entries a save committed (left by a crash mid-append) are
+    truncated before the next append, so entry positions never drift.
+    """
+
+    def __init__(
+        self, root: Path, segment_entries: int = TIMELINE_SEGMENT_ENTRIES, record_format: str = "json"
+    ) -> None:
+        self.root = Path(root)
+        self.segment_entries = segment_entries
+        self.record_format = record_format
+        # animal_id -> (segment, byte size) after our last append
+        self._sizes: dict[str, tuple[int, int]] = {}
+
+    def _segment_path(self, animal_id: str, segment: int) -> Path:
+        preferred = self.root / animal_id / f"{segment:06d}{SEGMENT_SUFFIXES[self.record_format]}"
+        if preferred.exists():
+            return preferred
+        for suffix in SEGMENT_SUFFIXES.values():
+            path = preferred.with_suffix(suffix)
+            if path.exists():
+                return path
+        return preferred
+
+    def append(self, animal_id: str, start: int, entries: list[ExpressionEntry]) -> None:
+        """Write `entries` as entries `start`, `start + 1`, ... of the animal's log."""
+        if not entries:
+            return
+        (self.root / animal_id).mkdir(parents=True, exist_ok=True)
+        index = start
+        while index < start + len(entries):
+            segment, offset = divmod(index, self.segment_entries)
+            chunk = entries[index - start : index - start + self.segment_entries - offset]
+            path = self._segment_path(animal_id, segment)
+            binary = path.suffix == SEGMENT_SUFFIXES["binary"]
+            known = self._sizes.get(animal_id)
+            size = known[1] if known and known[0] == segment else None
+            with path.open("ab") as handle:
+                if size is None:
+                    size = _committed_size(path, offset, binary) if handle.tell() else 0
+                if handle.tell() != size:
+                    handle.truncate(size)
+                data = _encode(chunk, binary=binary)
+                handle.write(data)
+                io_stats.bytes_written += len(data)
+                self._sizes[animal_id] = (segment, handle.tell())
+            index += len(chunk)
+
+    def read(self, animal_id: str, start: int, stop: int) -> list[ExpressionEntry]:
+        """Entries `start` up to (not including) `stop`."""
+        entries: list[ExpressionEntry] = []
+        if stop <= start:
+            return entries
+        first, last = start // self.segment_entries, (stop - 1) // self.segment_entries
+        for segment in range(first, last + 1):
+            base = segment * self.segment_entries
+            path = self._segment_path(animal_id, segment)
+            try:
+                if path.suffix == SEGMENT_SUFFIXES["binary"]:
+                    stored = decode_entries(read_bytes(path))
+                    entries.extend(stored[max(start - base, 0) : stop - base])
+                    continue
+                with path.open("r", encoding="utf-8") as handle:
+                    for offset, line in enumerate(handle):
+                        index = base + offset
+                        if index >= stop:
+                            break
+                        io_stats.bytes_read += len(line)
+                        if index >= start:
+                            entries.append(ExpressionEntry(**json.loads(line)))
+            except FileNotFoundError:
+                break
+        return entries
+
+    def convert(self, animal_id: str) -> None:
+        """Rewrite the animal's segments written in the other format."""
+        directory = self.root / animal_id
+        if not directory.exists():
+            return
+        target = SEGMENT_SUFFIXES[self.record_format]
+        for path in sorted(directory.iterdir()):
+            if path.suffix == target or path.suffix not in SEGMENT_SUFFIXES.values():
+                continue
+            segment = int(path.stem)
+            base = segment * self.segment_entries
+            entries = self.read(animal_id, base, base + self.segment_entries)
+            converted = path.with_suffix(target)
+            converted.write_bytes(_encode(entries, binary=target == SEGMENT_SUFFIXES["binary"]))
+            path.unlink()
+
+
+def _committed_size(path: Path, entries: int, binary: bool) -> int:
+    """Byte length of the first `entries` complete entries of a segment file."""
+    data = path.read_bytes()
+    if binary:
+        return frames_size(data, entries)
+    size = 0
+    for _ in range(entries):
+        end = data.find(b"\n", size)
+        if end < 0:
+            break
+        size = end + 1
+    return size
+
+
+def _encode(entries: list[ExpressionEntry], binary: bool) -> bytes:
+    if binary:
+        return b"".join(encode_entry(entry) for entry in entries)
+    return "".join(json.dumps(asdict(entry)) + "\n" for entry in entries).encode("utf-8")
@@ -2,13 +2,47 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
 import random
+import time
+from typing import Callable
 
-from .archive import create_snapshot
-from .config import ARCHIVE_INTERVAL_TICKS, POPULATION_GROWTH_PER_RUN, POPULATION_TARGET, SPECIES
+from .config import (
+    CATCHUP_CHUNK_TICKS,
+    CHECKPOINT_INTERVAL_TICKS,
+    POPULATION_GROWTH_PER_RUN,
+    POPULATION_TARGET,
+    RECENT_FEED_LIMIT,
+    SPECIES,
+)
 from .agent import LifeAgent
-from .storage import get_recent_feed, list_agents, load_agent, save_agent, save_archive
+from .batch import BatchTicker
+from .cache import AgentCache
+from .checkpoint import Checkpoint, build_checkpoint, write_checkpoint
+from .env import (
+    get_checkpoint_ticks,
+    get_profile,
+    get_profile_dir,
+    get_profile_every,
+    get_sim_defer_idle,
+    get_sim_workers,
+)
+from .feed import RecentFeed
+from .files import io_stats
+from .metrics import PhaseTimer, RunProfiler, parse_profile_modes
+from .parallel import ShardPool
+from .scheduler import FairScheduler, WakeupScheduler
+from .storage import (
+    DATA_ROOT,
+    get_cache,
+    get_checkpoint_path,
+    get_recent_feed,
+    list_agents,
+    restore_from_checkpoint,
+    save_archive,
+)
 from .world import WorldSignalStream
 
 
@@ -16,49 +50,263 @@ from .world import WorldSignalStream
 class SimulationReport:
     ticks: int
     expressions: int
+    agent_ticks: int = 0
+    # Animals that sat out the run's last tick
+    backlog: int = 0
+    # Wall time of the whole run, saving and checkpointing included
+    seconds: float = 0.0
+    births: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # Storage file traffic of this process (see `files.IOStats`)
+    bytes_read: int = 0
+    bytes_written: int = 0
+    # Seconds per phase: list, feed, load, tick, archive, births, save, checkpoint
+    phases: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """Agent ticks per second of wall time."""
+        return self.agent_ticks / self.seconds if self.seconds > 0 else 0.0
+
+    def add(self, other: SimulationReport) -> None:
+        """Fold a later run into this one."""
+        for name in ("ticks", "expressions", "agent_ticks", "seconds", "births", "cache_hits", "cache_misses"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+        self.backlog = other.backlog
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def summary(self) -> str:
+        """One log line with the counters and the time spent in each phase."""
+        phases = " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        return (
+            f"ticks={self.ticks} agent_ticks={self.agent_ticks} expressions={self.expressions}"
+            f" births={self.births} backlog={self.backlog} seconds={self.seconds:.2f}"
+            f" throughput={self.throughput:.0f}/s cache={self.cache_hits}/{self.cache_hits + self.cache_misses}"
+            f" read={self.bytes_read} written={self.bytes_written}" + (f" {phases}" if phases else "")
+        )
 
 
 class Simulator:
-    def __init__(self, seed: int | None = None) -> None:
+    """Ticks the population; with `workers > 1` (or `OPENANIMAL_SIM_WORKERS`)
+    runs are split into shards ticked in worker processes.
+
+    Sharded runs are reproducible for a given seed and worker count, but
+    animals only see expressions from other shards made in earlier ticks.
+
+    `run(..., budget_seconds=...)` replaces the random sample with the animals
+    that fit in the budget, most overdue and most pressured first (see
+    `FairScheduler`); it applies to in-process runs only.
+
+    Ticks of silent, missing or cooling-down animals are deferred and replayed
+    in batches (see `WakeupScheduler`); `defer_idle=False` (or
+    `OPENANIMAL_SIM_DEFER_IDLE=0`) runs every sampled tick immediately, with
+    the same results.
+
+    The first run warms the cache from the data directory's checkpoint, if
+    there is one, and every `checkpoint_ticks` ticks (default
+    `OPENANIMAL_CHECKPOINT_TICKS`; 0 disables) the checkpoint is rewritten.
+
+    Every report carries per-phase timings and I/O counters. A `profiler`
+    (by default one configured by `OPENANIMAL_PROFILE`) additionally captures
+    cProfile / tracemalloc data around runs.
+    """
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        cache: AgentCache | None = None,
+        workers: int | None = None,
+        defer_idle: bool | None = None,
+        checkpoint_ticks: int | None = None,
+        profiler: RunProfiler | None = None,
+    ) -> None:
         self.world = WorldSignalStream(seed=seed)
         self.rng = random.Random(seed)
+        self.ticker = BatchTicker()
+        self.workers = max(1, workers if workers is not None else get_sim_workers())
+        self.defer_idle = defer_idle if defer_idle is not None else get_sim_defer_idle()
+        self._cache = cache
+        self._pool: ShardPool | None = None
+        self.fair = FairScheduler()
+        self.checkpoint_ticks = (
+            checkpoint_ticks if checkpoint_ticks is not None else get_checkpoint_ticks(CHECKPOINT_INTERVAL_TICKS)
+        )
+        self._checkpoint: Checkpoint | None = None
+        self._booted = False
+        self._since_checkpoint = 0
+        self.profiler = profiler if profiler is not None else _env_profiler()
+
+    @property
+    def cache(self) -> AgentCache:
+        return self._cache if self._cache is not None else get_cache()
+
+    def run(self, ticks: int = 1, budget_seconds: float | None = None) -> SimulationReport:
+        """Advance the population `ticks` times.
+
+        With `budget_seconds`, each tick advances only as many animals as fit
+        in its share of the budget.
+        """
+        cache = self.cache
+        if not self._booted:
+            self._booted = True
+            self._checkpoint = restore_from_checkpoint(self._cache)
+        timer = PhaseTimer()
+        hits, misses = cache.hits, cache.misses
+        read, written = io_stats.bytes_read, io_stats.bytes_written
+        started = time.perf_counter()
+        with self.profiler.capture() if self.profiler is not None else nullcontext():
+            try:
+                report = self._run(cache, ticks, budget_seconds, timer)
+            finally:
+                # Write-behind: every agent touched during the run is saved once here.
+                with timer.phase("save"):
+                    cache.flush()
+            self._since_checkpoint += report.ticks
+            if self.checkpoint_ticks and self._since_checkpoint >= self.checkpoint_ticks:
+                with timer.phase("checkpoint"):
+                    self.checkpoint()
+        report.seconds = time.perf_counter() - started
+        report.cache_hits = cache.hits - hits
+        report.cache_misses = cache.misses - misses
+        report.bytes_read = io_stats.bytes_read - read
+        report.bytes_written = io_stats.bytes_written - written
+        report.phases = timer.seconds
+        return report
 
-    def run(self, ticks: int = 1) -> SimulationReport:
-        expressions = 0
-        for _ in range(ticks):
-            animal_ids = list_agents()
+    def checkpoint(self) -> Checkpoint:
+        """Rewrite the data directory's whole-population checkpoint now."""
+        cache = self.cache
+        cache.flush()
+        checkpoint = build_checkpoint(cache.backend, cache, previous=self._checkpoint)
+        write_checkpoint(get_checkpoint_path(cache.backend), checkpoint)
+        self._checkpoint = checkpoint
+        self._since_checkpoint = 0
+        return checkpoint
+
+    def fast_forward(
+        self,
+        ticks: int,
+        budget_seconds: float | None = None,
+        chunk: int = CATCHUP_CHUNK_TICKS,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> SimulationReport:
+        """Run `ticks` ticks back to back, e.g. to catch up after downtime.
+
+        Ticks run in chunks of `chunk`, each one a normal `run` that saves the
+        animals it touched once. No further chunk starts after `budget_seconds`
+        of wall time; the report counts the ticks actually run. `progress` is
+        called with (ticks done, ticks requested) after every chunk.
+        """
+        started = time.monotonic()
+        total = SimulationReport(ticks=0, expressions=0)
+        while total.ticks < ticks:
+            if budget_seconds is not None and time.monotonic() - started >= budget_seconds:
+                break
+            total.add(self.run(ticks=min(chunk, ticks - total.ticks)))
+            if progress is not None:
+                progress(total.ticks, ticks)
+        return total
+
+    def close(self) -> None:
+        """Stop worker processes, if any were started, and any memory profiling."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self.profiler is not None:
+            self.profiler.close()
+
+    def _run(self, cache: AgentCache, ticks: int, budget_seconds: float | None, timer: PhaseTimer) -> SimulationReport:
+        with timer.phase("list"):
+            population = list_agents()
+        # One storage read per run; expressions made during the run are
+        # folded in so later animals still see them.
+        capacity = 2 * RECENT_FEED_LIMIT + 1
+        with timer.phase("feed"):
+            recent_feed = RecentFeed(get_recent_feed(limit=capacity), limit=RECENT_FEED_LIMIT, capacity=capacity)
+        born: list[LifeAgent] = []
+
+        def births(sampled: int, parents: list[str]) -> list[LifeAgent]:
+            with timer.phase("births"):
+                children = self._grow(cache, sampled, parents)
+            born.extend(children)
+            return children
+
+        if self.workers > 1 and budget_seconds is None:
+            if self._pool is None:
+                self._pool = ShardPool(self.workers)
+            # Worker processes load, tick and save their shards; only their
+            # wall time is seen from here.
+            with timer.phase("tick"):
+                expressions, agent_ticks, backlog = self._pool.run(
+                    cache, population, recent_feed, ticks, self.rng, self.world.seed, births, self.defer_idle
+                )
+            return SimulationReport(
+                ticks=ticks, expressions=expressions, agent_ticks=agent_ticks, backlog=backlog, births=len(born)
+            )
+
+        scheduler = WakeupScheduler(self.ticker, defer=self.defer_idle)
+        load = timer.wrap("load", cache.get)
+        archive = timer.wrap("archive", save_archive)
+        deadline = time.perf_counter() + budget_seconds if budget_seconds is not None else None
+        expressions = agent_ticks = backlog = 0
+        for remaining in range(ticks, 0, -1):
+            animal_ids = list(population)
             if not animal_ids:
                 continue
-            sample_fraction = self.rng.uniform(0.4, 0.9)
-            sample_size = max(1, int(len(animal_ids) * sample_fraction))
-            if sample_size < len(animal_ids):
-                animal_ids = self.rng.sample(animal_ids, k=sample_size)
-            for animal_id in animal_ids:
-                agent = load_agent(animal_id)
-                world_signals = self.world.signals_for_tick(agent.age_ticks)
-                # Pass recent expressions from other animals so this one can interact
-                recent = get_recent_feed(exclude_animal_id=animal_id, limit=10)
-                output = agent.tick(world_signals, recent_feed=recent)
-                if output:
-                    expressions += 1
-                if agent.age_ticks % ARCHIVE_INTERVAL_TICKS == 0:
-                    snapshot = create_snapshot(agent)
-                    save_archive(agent.animal_id, snapshot)
-                save_agent(agent)
-            if len(animal_ids) < POPULATION_TARGET:
-                births = min(POPULATION_GROWTH_PER_RUN, POPULATION_TARGET - len(animal_ids))
-                for _ in range(births):
-                    parent_id = self.rng.choice(animal_ids)
-                    parent = load_agent(parent_id)
-                    child = LifeAgent.birth(creator=parent.creator)
-                    child.species = self.rng.choice([parent.species] + SPECIES)
-                    child.slug = f"{child.species}-{child.animal_id[:6]}"
-                    save_agent(child)
-            elif self.rng.random() < 0.01:
-                parent_id = self.rng.choice(animal_ids)
-                parent = load_agent(parent_id)
-                child = LifeAgent.birth(creator=parent.creator)
-                child.species = self.rng.choice([parent.species] + SPECIES)
-                child.slug = f"{child.species}-{child.animal_id[:6]}"
-                save_agent(child)
-        return SimulationReport(ticks=ticks, expressions=expressions)
+            if deadline is not None:
+                # Spread what is left of the budget over the remaining ticks.
+                animal_ids = self.fair.select(animal_ids, (deadline - time.perf_counter()) / remaining)
+            else:
+                sample_fraction = self.rng.uniform(0.4, 0.9)
+                sample_size = max(1, int(len(animal_ids) * sample_fraction))
+                if sample_size < len(animal_ids):
+                    animal_ids = self.rng.sample(animal_ids, k=sample_size)
+            # The deterministic part of the tick runs for the whole sample at
+            # once; only agents that are awake continue per object, in order.
+            started = time.perf_counter()
+            with timer.phase("tick"):
+                agents, produced = scheduler.tick(animal_ids, load, self.world, recent_feed, archive)
+            if deadline is not None:
+                self.fair.record(animal_ids, agents, time.perf_counter() - started)
+            expressions += len(produced)
+            agent_ticks += len(animal_ids)
+            for agent in agents:
+                cache.mark_dirty(agent)
+            population.extend(child.animal_id for child in births(len(animal_ids), animal_ids))
+            backlog = len(population) - len(animal_ids)
+        with timer.phase("tick"):
+            settled = scheduler.settle(load, self.world, archive)
+        for agent in settled:
+            cache.mark_dirty(agent)
+        return SimulationReport(
+            ticks=ticks, expressions=expressions, agent_ticks=agent_ticks, backlog=backlog, births=len(born)
+        )
+
+    def _grow(self, cache: AgentCache, sampled: int, parents: list[str]) -> list[LifeAgent]:
+        """Births after a tick that advanced `sampled` animals."""
+        if not parents:
+            return []
+        if sampled < POPULATION_TARGET:
+            births = min(POPULATION_GROWTH_PER_RUN, POPULATION_TARGET - sampled)
+        else:
+            births = 1 if self.rng.random() < 0.01 else 0
+        return [self._birth(cache, self.rng.choice(parents)) for _ in range(births)]
+
+    def _birth(self, cache: AgentCache, parent_id: str) -> LifeAgent:
+        parent = cache.view(parent_id, ("creator", "species"))
+        child = LifeAgent.birth(creator=parent.creator)
+        child.species = self.rng.choice([parent.species] + SPECIES)
+        child.slug = f"{child.species}-{child.animal_id[:6]}"
+        cache.add(child)
+        return child
+
+
+def _env_profiler() -> RunProfiler | None:
+    modes = parse_profile_modes(get_profile())
+    if not modes:
+        return None
+    return RunProfiler(modes, Path(get_profile_dir(str(DATA_ROOT / "profiles"))), every=get_profile_every())
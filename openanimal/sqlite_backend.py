@@ -0,0 +1,256 @@
+"""SQLite storage backend (stdlib `sqlite3`, WAL mode)."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from dataclasses import asdict
+from functools import partial
+from pathlib import Path
+
+from .agent import LifeAgent
+from .archive import ArchiveSnapshot
+from .backend import AgentNotFoundError, StorageBackend
+from .config import FEED_MAX_POSTS
+from .records import RECORD_VERSION, AgentView, agent_from_record, agent_to_record, project_record
+from .timeline import ExpressionEntry, TimelineLoader
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agents (
+    animal_id TEXT PRIMARY KEY,
+    slug TEXT NOT NULL,
+    creator TEXT NOT NULL DEFAULT '',
+    species TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    age_ticks INTEGER NOT NULL,
+    last_tick INTEGER,
+    last_public_tick INTEGER,
+    last_sentences TEXT,
+    generation INTEGER NOT NULL DEFAULT 0,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_agents_slug ON agents (slug);
+CREATE INDEX IF NOT EXISTS idx_agents_creator ON agents (creator);
+CREATE INDEX IF NOT EXISTS idx_agents_species ON agents (species);
+CREATE INDEX IF NOT EXISTS idx_agents_phase ON agents (phase);
+CREATE INDEX IF NOT EXISTS idx_agents_last_tick ON agents (last_tick);
+CREATE INDEX IF NOT EXISTS idx_agents_age_ticks ON agents (age_ticks);
+
+CREATE TABLE IF NOT EXISTS expressions (
+    animal_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    tick INTEGER NOT NULL,
+    public_tick INTEGER,
+    feed_tick INTEGER NOT NULL,
+    sentences TEXT NOT NULL,
+    PRIMARY KEY (animal_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_expressions_feed_tick ON expressions (feed_tick);
+
+CREATE TABLE IF NOT EXISTS archives (
+    animal_id TEXT NOT NULL,
+    tick INTEGER NOT NULL,
+    snapshot TEXT NOT NULL,
+    PRIMARY KEY (animal_id, tick)
+);
+"""
+
+
+# Projections limited to these are answered from columns, skipping the record.
+COLUMN_FIELDS = ("animal_id", "slug", "creator", "species", "phase", "age_ticks")
+
+
+class SQLiteBackend(StorageBackend):
+    """Stores agents, expressions and archives in one SQLite database."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        # Every thread's connection, so `close` can reach them all.
+        self._connections: set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def open_args(self) -> dict:
+        return {"kind": "sqlite", "root": str(self.path.parent)}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn not in self._connections:
+            # Each connection is only used by its own thread; `close` may run
+            # on another one, hence check_same_thread=False.
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._connections_lock:
+                self._connections.add(conn)
+            self._local.conn = conn
+        return conn
+
+    def save_agent(self, agent: LifeAgent) -> None:
+        self.save_agents([agent])
+
+    def save_agents(self, agents: list[LifeAgent]) -> None:
+        conn = self._conn()
+        with conn:
+            for agent in agents:
+                self._write_agent(conn, agent)
+
+    def _write_agent(self, conn: sqlite3.Connection, agent: LifeAgent) -> None:
+        record = agent_to_record(agent, include_timeline=False)
+        last = agent.timeline.last
+        conn.execute(
+            "INSERT INTO agents (animal_id, slug, creator, species, phase, age_ticks,"
+            " last_tick, last_public_tick, last_sentences, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (animal_id) DO UPDATE SET slug = excluded.slug, creator = excluded.creator,"
+            " species = excluded.species, phase = excluded.phase, age_ticks = excluded.age_ticks,"
+            " last_tick = excluded.last_tick, last_public_tick = excluded.last_public_tick,"
+            " last_sentences = excluded.last_sentences, record = excluded.record,"
+            " generation = agents.generation + 1",
+            (
+                agent.animal_id,
+                agent.slug,
+                getattr(agent, "creator", "") or "",
+                agent.species,
+                agent.phase,
+                agent.age_ticks,
+                last.tick if last else None,
+                _feed_tick(last) if last else None,
+                json.dumps(last.sentences) if last else None,
+                json.dumps(record),
+            ),
+        )
+        row = conn.execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM expressions WHERE animal_id = ?", (agent.animal_id,)
+        ).fetchone()
+        conn.executemany(
+            "INSERT INTO expressions (animal_id, seq, tick, public_tick, feed_tick, sentences)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (agent.animal_id, seq, entry.tick, entry.public_tick, _feed_tick(entry), json.dumps(entry.sentences))
+                for seq, entry in enumerate(agent.timeline.since(row[0]), start=row[0])
+            ],
+        )
+
+    def load_agent(self, animal_id: str, fields: tuple[str, ...] | None = None) -> LifeAgent | AgentView:
+        conn = self._conn()
+        if fields is not None and all(name in COLUMN_FIELDS for name in fields):
+            row = conn.execute(
+                f"SELECT {', '.join(fields) or 'animal_id'} FROM agents WHERE animal_id = ?", (animal_id,)
+            ).fetchone()
+            if row is None:
+                raise AgentNotFoundError(animal_id)
+            return AgentView(dict(zip(fields, row)))
+        row = conn.execute("SELECT record FROM agents WHERE animal_id = ?", (animal_id,)).fetchone()
+        if row is None:
+            raise AgentNotFoundError(animal_id)
+        loader = self.timeline_loader(animal_id)
+        if fields is not None:
+            return project_record(json.loads(row[0]), fields, timeline_loader=loader)
+        return agent_from_record(json.loads(row[0]), timeline_loader=loader)
+
+    def timeline_loader(self, animal_id: str) -> TimelineLoader:
+        return partial(self._read_timeline, animal_id)
+
+    def _read_timeline(self, animal_id: str, start: int, stop: int) -> list[ExpressionEntry]:
+        rows = self._conn().execute(
+            "SELECT tick, sentences, public_tick FROM expressions WHERE animal_id = ? AND seq >= ? AND seq < ?"
+            " ORDER BY seq",
+            (animal_id, start, stop),
+        ).fetchall()
+        return [ExpressionEntry(tick=t, sentences=json.loads(s), public_tick=pt) for t, s, pt in rows]
+
+    def generation(self, animal_id: str) -> int | None:
+        row = self._conn().execute("SELECT generation FROM agents WHERE animal_id = ?", (animal_id,)).fetchone()
+        return row[0] if row else None
+
+    def list_agents(
+        self, creator: str | None = None, species: str | None = None, phase: str | None = None
+    ) -> list[str]:
+        filters = [
+            (column, value)
+            for column, value in (("creator", creator), ("species", species), ("phase", phase))
+            if value is not None
+        ]
+        sql = "SELECT animal_id FROM agents"
+        if filters:
+            sql += " WHERE " + " AND ".join(f"{column} = ?" for column, _ in filters)
+        rows = self._conn().execute(sql, [value for _, value in filters]).fetchall()
+        return [row[0] for row in rows]
+
+    def get_recent_feed(self, exclude_animal_id: str | None = None, limit: int = 15) -> list[dict]:
+        rows = self._conn().execute(
+            "SELECT animal_id, last_tick, last_public_tick, last_sentences FROM agents"
+            " WHERE last_tick IS NOT NULL AND animal_id IS NOT ? ORDER BY last_tick DESC LIMIT ?",
+            (exclude_animal_id, limit),
+        ).fetchall()
+        return [
+            {"animal_id": aid, "tick": tick, "public_tick": pt, "sentences": json.loads(s)}
+            for aid, tick, pt, s in rows
+        ]
+
+    def list_public_feed(self, limit: int | None = None) -> list[dict]:
+        conn = self._conn()
+        max_tick = conn.execute("SELECT COALESCE(MAX(age_ticks), 0) FROM agents").fetchone()[0]
+        rows = conn.execute(
+            "SELECT e.animal_id, a.slug, a.species, a.phase, e.tick, e.feed_tick, e.sentences, a.creator"
+            " FROM expressions e JOIN agents a ON a.animal_id = e.animal_id"
+            " WHERE e.feed_tick <= ? ORDER BY e.feed_tick DESC LIMIT ?",
+            (max_tick, limit or FEED_MAX_POSTS),
+        ).fetchall()
+        return [
+            {
+                "animal_id": aid,
+                "slug": slug,
+                "species": species,
+                "phase": phase,
+                "tick": tick,
+                "public_tick": public_tick,
+                "sentences": json.loads(sentences),
+                "creator": creator,
+            }
+            for aid, slug, species, phase, tick, public_tick, sentences, creator in rows
+        ]
+
+    def find_agent_by_slug(
+        self, slug: str, fields: tuple[str, ...] | None = None
+    ) -> LifeAgent | AgentView | None:
+        if not slug:
+            return None
+        row = self._conn().execute(
+            "SELECT animal_id FROM agents WHERE slug = ? OR animal_id = ? LIMIT 1", (slug, slug)
+        ).fetchone()
+        return self.load_agent(row[0], fields=fields) if row else None
+
+    def save_archive(self, animal_id: str, snapshot: ArchiveSnapshot) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO archives (animal_id, tick, snapshot) VALUES (?, ?, ?)",
+                (animal_id, snapshot.tick, json.dumps(asdict(snapshot))),
+            )
+
+    def migrate(self) -> int:
+        rows = self._conn().execute(
+            "SELECT animal_id FROM agents WHERE json_extract(record, '$.schema_version') IS NOT ?",
+            (RECORD_VERSION,),
+        ).fetchall()
+        for (animal_id,) in rows:
+            self.save_agent(self.load_agent(animal_id))
+        return len(rows)
+
+    def close(self) -> None:
+        """Close the connections of every thread; a later call opens a fresh one."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+
+def _feed_tick(entry: ExpressionEntry) -> int:
+    return entry.public_tick if entry.public_tick is not None else entry.tick
@@ -1,195 +1,166 @@
-"""Persistence helpers for OpenAnimal."""
+"""Persistence helpers for OpenAnimal.
+
+The module-level functions delegate to a pluggable backend. The JSON backend
+(one file per animal) is the default; set `OPENANIMAL_STORAGE=sqlite` to use
+the SQLite engine instead, or `OPENANIMAL_STORAGE_FORMAT=binary` to write the
+file backend's records in the compact `codec` format.
+"""
 
 from __future__ import annotations
 
-import json
-from dataclasses import asdict
+import sys
 from pathlib import Path
 
 from .agent import LifeAgent
 from .archive import ArchiveSnapshot
-from .memory import Memory, MemoryStore
-from .timeline import ExpressionEntry, Timeline
-from .config import FEED_MAX_POSTS, STATE_KEYS
+from .backend import AgentNotFoundError, StorageBackend
+from .cache import AgentCache
+from .checkpoint import Checkpoint, CheckpointError, read_checkpoint, restore_checkpoint
+from .clock import TickClock
+from .config import AGENT_CACHE_SIZE
+from .env import get_agent_cache_size, get_storage_backend, get_storage_format
+from .json_backend import JsonBackend
+from .lease import TickLease
+from .records import AgentView
+from .sqlite_backend import SQLiteBackend
 
 DATA_ROOT = Path("data")
 ANIMALS_DIR = DATA_ROOT / "animals"
 ARCHIVES_DIR = DATA_ROOT / "archives"
+SQLITE_PATH = DATA_ROOT / "openanimal.db"
+TICK_LEASE_NAME = "tick.lock"
+TICK_CLOCK_NAME = "clock.json"
+CHECKPOINT_NAME = "checkpoint.oac"
+
+BACKENDS = ("json", "sqlite")
+
+__all__ = [
+    "AgentCache",
+    "AgentNotFoundError",
+    "AgentView",
+    "StorageBackend",
+    "find_agent_by_slug",
+    "get_backend",
+    "get_cache",
+    "get_checkpoint_path",
+    "get_recent_feed",
+    "get_tick_clock",
+    "get_tick_lease",
+    "list_agents",
+    "list_public_feed",
+    "load_agent",
+    "open_backend",
+    "restore_from_checkpoint",
+    "save_agent",
+    "save_archive",
+    "set_backend",
+]
+
+_backend: StorageBackend | None = None
+_cache: AgentCache | None = None
+_checkpoint: Checkpoint | None = None
+
+
+def open_backend(kind: str = "json", root: Path | None = None, record_format: str = "json") -> StorageBackend:
+    """Create a backend of the given kind rooted at `root` (default: DATA_ROOT).
+
+    `record_format` ("json" or "binary") selects the file backend's record encoding.
+    """
+    root = Path(root) if root is not None else DATA_ROOT
+    if kind == "json":
+        return JsonBackend(root, record_format=record_format)
+    if kind == "sqlite":
+        return SQLiteBackend(root / SQLITE_PATH.name)
+    raise ValueError(f"unknown storage backend: {kind!r} (expected one of {', '.join(BACKENDS)})")
+
+
+def get_backend() -> StorageBackend:
+    global _backend
+    if _backend is None:
+        _backend = open_backend(get_storage_backend(), record_format=get_storage_format())
+    return _backend
+
+
+def set_backend(backend: StorageBackend | None) -> StorageBackend | None:
+    """Swap the active backend; returns the previous one."""
+    global _backend, _cache, _checkpoint
+    if _cache is not None:
+        _cache.flush()
+    previous, _backend, _cache, _checkpoint = _backend, backend, None, None
+    return previous
+
+
+def get_cache() -> AgentCache:
+    """Process-wide agent cache bound to the active backend."""
+    global _cache
+    if _cache is None:
+        _cache = AgentCache(get_backend(), max_size=get_agent_cache_size(AGENT_CACHE_SIZE))
+    return _cache
+
+
+def get_tick_clock() -> TickClock:
+    """When the active backend's data directory was last ticked."""
+    return TickClock(Path(get_backend().open_args()["root"]) / TICK_CLOCK_NAME)
+
+
+def get_tick_lease() -> TickLease:
+    """Lease that elects the one process ticking the active backend's data directory."""
+    return TickLease(Path(get_backend().open_args()["root"]) / TICK_LEASE_NAME)
+
+
+def get_checkpoint_path(backend: StorageBackend | None = None) -> Path:
+    """Where the data directory's whole-population checkpoint lives."""
+    return Path((backend or get_backend()).open_args()["root"]) / CHECKPOINT_NAME
+
+
+def restore_from_checkpoint(cache: AgentCache | None = None) -> Checkpoint | None:
+    """Warm `cache` (default: the process cache) and its backend from the data directory's checkpoint.
+
+    The process cache is only warmed once. Returns None when there is no
+    usable checkpoint; a damaged one is reported on stderr and ignored.
+    """
+    global _checkpoint
+    if cache is None and _checkpoint is not None:
+        return _checkpoint
+    target = cache if cache is not None else get_cache()
+    try:
+        checkpoint = read_checkpoint(get_checkpoint_path(target.backend))
+    except FileNotFoundError:
+        return None
+    except CheckpointError as exc:
+        print(f"openanimal: ignoring checkpoint: {exc}", file=sys.stderr, flush=True)
+        return None
+    restore_checkpoint(checkpoint, target.backend, target)
+    if cache is None:
+        _checkpoint = checkpoint
+    return checkpoint
 
 
-def _ensure_dirs() -> None:
-    ANIMALS_DIR.mkdir(parents=True, exist_ok=True)
-    ARCHIVES_DIR.mkdir(parents=True, exist_ok=True)
+def save_agent(agent: LifeAgent) -> None:
+    get_backend().save_agent(agent)
 
 
-def save_agent(agent: LifeAgent) -> None:
-    _ensure_dirs()
-    path = ANIMALS_DIR / f"{agent.animal_id}.json"
-    payload = {
-        "animal_id": agent.animal_id,
-        "created_at": agent.created_at,
-        "age_ticks": agent.age_ticks,
-        "phase": agent.phase,
-        "state": agent.state,
-        "pressure": agent.pressure,
-        "tolerance": agent.tolerance,
-        "last_expression_tick": agent.last_expression_tick,
-        "rng_seed": agent.rng_seed,
-        "creator": getattr(agent, "creator", ""),
-        "species": agent.species,
-        "slug": agent.slug,
-        "temperament": agent.temperament,
-        "encounters": agent.encounters,
-        "silent_until_tick": agent.silent_until_tick,
-        "missing_until_tick": agent.missing_until_tick,
-        "memory": [asdict(mem) for mem in agent.memory.memories],
-        "timeline": [asdict(entry) for entry in agent.timeline.expressions],
-    }
-    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-
-
-def load_agent(animal_id: str) -> LifeAgent:
-    path = ANIMALS_DIR / f"{animal_id}.json"
-    payload = json.loads(path.read_text(encoding="utf-8"))
-    phase = payload.get("phase", "infant")
-    phase_map = {
-        "infancy": "infant",
-        "early_growth": "juvenile",
-        "adolescence": "mature",
-        "maturity": "elder",
-    }
-    phase = phase_map.get(phase, phase)
-    state = payload.get("state", {})
-    if not all(key in state for key in STATE_KEYS):
-        state = {
-            "arousal": float(state.get("stress", 0.5)),
-            "curiosity": float(state.get("curiosity", 0.5)),
-            "fatigue": float(1.0 - float(state.get("energy", 0.5))),
-            "social_tolerance": float(1.0 - float(state.get("restlessness", 0.5))),
-        }
-
-    species = payload.get("species", "unknown")
-    slug = payload.get("slug")
-    if not slug:
-        slug = f"{species}-{payload['animal_id'][:6]}" if species != "unknown" else payload["animal_id"][:8]
-
-    agent = LifeAgent(
-        animal_id=payload["animal_id"],
-        created_at=payload["created_at"],
-        age_ticks=payload["age_ticks"],
-        phase=phase,
-        state=state,
-        pressure=payload["pressure"],
-        tolerance=payload["tolerance"],
-        last_expression_tick=payload["last_expression_tick"],
-        rng_seed=payload.get("rng_seed", 0),
-        creator=payload.get("creator", ""),
-        species=species,
-        slug=slug,
-        temperament=payload.get("temperament", []),
-        encounters=payload.get("encounters", {}),
-        silent_until_tick=payload.get("silent_until_tick", 0),
-        missing_until_tick=payload.get("missing_until_tick", 0),
-    )
-
-    agent.memory = MemoryStore(
-        memories=[Memory(**mem) for mem in payload.get("memory", [])],
-    )
-    agent.timeline = Timeline(
-        expressions=[ExpressionEntry(**entry) for entry in payload.get("timeline", [])],
-    )
-    return agent
-
-
-def list_agents(creator: str | None = None) -> list[str]:
-    if not ANIMALS_DIR.exists():
-        return []
-    ids = [path.stem for path in ANIMALS_DIR.glob("*.json")]
-    if creator is None:
-        return ids
-    out = []
-    for animal_id in ids:
-        try:
-            agent = load_agent(animal_id)
-            if getattr(agent, "creator", "") == creator:
-                out.append(animal_id)
-        except (OSError, json.JSONDecodeError, KeyError):
-            continue
-    return out
+def load_agent(animal_id: str, fields: tuple[str, ...] | None = None) -> LifeAgent | AgentView:
+    """Load an agent; with `fields`, decode only those into a read-only AgentView."""
+    return get_backend().load_agent(animal_id, fields=fields)
+
+
+def list_agents(creator: str | None = None, species: str | None = None, phase: str | None = None) -> list[str]:
+    return get_backend().list_agents(creator=creator, species=species, phase=phase)
 
 
 def get_recent_feed(exclude_animal_id: str | None = None, limit: int = 15) -> list[dict]:
     """Recent expressions from all animals (for interaction). Each item: animal_id, tick, sentences."""
-    if not ANIMALS_DIR.exists():
-        return []
-    items: list[tuple[int, str, int, list[str]]] = []  # (tick, animal_id, _, sentences)
-    for path in ANIMALS_DIR.glob("*.json"):
-        animal_id = path.stem
-        if animal_id == exclude_animal_id:
-            continue
-        try:
-            agent = load_agent(animal_id)
-            if not agent.timeline.expressions:
-                continue
-            last = agent.timeline.expressions[-1]
-            public_tick = last.public_tick if last.public_tick is not None else last.tick
-            items.append((last.tick, animal_id, public_tick, last.sentences))
-        except (OSError, json.JSONDecodeError, KeyError):
-            continue
-    items.sort(key=lambda x: x[0], reverse=True)
-    return [
-        {"animal_id": aid, "tick": tick, "public_tick": pt, "sentences": s}
-        for tick, aid, pt, s in items[:limit]
-    ]
+    return get_backend().get_recent_feed(exclude_animal_id=exclude_animal_id, limit=limit)
 
 
 def list_public_feed(limit: int | None = None) -> list[dict]:
-    if not ANIMALS_DIR.exists():
-        return []
-    posts: list[dict] = []
-    max_tick = 0
-    for path in ANIMALS_DIR.glob("*.json"):
-        try:
-            agent = load_agent(path.stem)
-        except (OSError, json.JSONDecodeError, KeyError):
-            continue
-        max_tick = max(max_tick, agent.age_ticks)
-        for entry in agent.timeline.expressions:
-            public_tick = entry.public_tick if entry.public_tick is not None else entry.tick
-            posts.append(
-                {
-                    "animal_id": agent.animal_id,
-                    "slug": agent.slug,
-                    "species": agent.species,
-                    "phase": agent.phase,
-                    "tick": entry.tick,
-                    "public_tick": public_tick,
-                    "sentences": entry.sentences,
-                    "creator": getattr(agent, "creator", ""),
-                }
-            )
-    posts = [p for p in posts if p["public_tick"] <= max_tick]
-    posts.sort(key=lambda p: p["public_tick"], reverse=True)
-    limit = limit or FEED_MAX_POSTS
-    return posts[:limit]
-
-
-def find_agent_by_slug(slug: str) -> LifeAgent | None:
-    if not slug or not ANIMALS_DIR.exists():
-        return None
-    for path in ANIMALS_DIR.glob("*.json"):
-        try:
-            agent = load_agent(path.stem)
-        except (OSError, json.JSONDecodeError, KeyError):
-            continue
-        if agent.slug == slug or agent.animal_id == slug:
-            return agent
-    return None
+    return get_backend().list_public_feed(limit=limit)
+
+
+def find_agent_by_slug(slug: str, fields: tuple[str, ...] | None = None) -> LifeAgent | AgentView | None:
+    return get_backend().find_agent_by_slug(slug, fields=fields)
 
 
 def save_archive(animal_id: str, snapshot: ArchiveSnapshot) -> None:
-    _ensure_dirs()
-    archive_dir = ARCHIVES_DIR / animal_id
-    archive_dir.mkdir(parents=True, exist_ok=True)
-    path = archive_dir / f"{snapshot.tick}.json"
-    path.write_text(json.dumps(asdict(snapshot), indent=2), encoding="utf-8")
+    get_backend().save_archive(animal_id, snapshot)
@@ -2,22 +2,82 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+from typing import Callable
 
+from .phrases import shared
 
-@dataclass
+# loader(start, stop) -> stored entries [start:stop]
+TimelineLoader = Callable[[int, int], list["ExpressionEntry"]]
+
+
+@dataclass(slots=True)
 class ExpressionEntry:
     tick: int
     sentences: list[str]
     public_tick: int | None = None
 
 
-@dataclass
 class Timeline:
-    expressions: list[ExpressionEntry] = field(default_factory=list)
+    """Ordered expressions of one animal.
+
+    A timeline loaded from storage may leave its first `stored_count` entries on
+    disk: only entries added since the load are held in memory until something
+    reads `expressions`, at which point the stored part is fetched once through
+    `loader`. Length, the last entry and short tails are answered without it.
+    """
+
+    __slots__ = ("_tail", "_stored", "_stored_last", "_loader")
+
+    def __init__(
+        self,
+        expressions: list[ExpressionEntry] | None = None,
+        stored_count: int = 0,
+        last: ExpressionEntry | None = None,
+        loader: TimelineLoader | None = None,
+    ) -> None:
+        self._tail: list[ExpressionEntry] = list(expressions or [])
+        self._stored = stored_count if loader is not None else 0
+        self._stored_last = last
+        self._loader = loader
+
+    @property
+    def expressions(self) -> list[ExpressionEntry]:
+        if self._stored:
+            self._tail = self._loader(0, self._stored) + self._tail
+            self._stored = 0
+            self._loader = None
+        return self._tail
+
+    @property
+    def is_loaded(self) -> bool:
+        return not self._stored
+
+    @property
+    def last(self) -> ExpressionEntry | None:
+        if self._tail:
+            return self._tail[-1]
+        return self._stored_last if self._stored else None
+
+    def __len__(self) -> int:
+        return self._stored + len(self._tail)
+
+    def snapshot(self) -> "Timeline":
+        """An independent copy, made without loading or changing this timeline."""
+        return Timeline(list(self._tail), stored_count=self._stored, last=self._stored_last, loader=self._loader)
+
+    def since(self, start: int) -> list[ExpressionEntry]:
+        """Entries from index `start` onwards, loading only what is needed."""
+        if start >= self._stored:
+            return self._tail[start - self._stored :]
+        return self._loader(start, self._stored) + self._tail
+
+    def recent(self, limit: int) -> list[ExpressionEntry]:
+        return self.since(max(0, len(self) - limit)) if limit > 0 else []
 
     def add_expression(self, tick: int, sentences: list[str], public_tick: int | None = None) -> None:
-        self.expressions.append(ExpressionEntry(tick=tick, sentences=sentences, public_tick=public_tick))
+        sentences = [shared(sentence) for sentence in sentences]
+        self._tail.append(ExpressionEntry(tick=tick, sentences=sentences, public_tick=public_tick))
 
     def render(self, current_tick: int, silence_marker: str = "...") -> list[str]:
         rendered: list[str] = []
@@ -6,6 +6,7 @@ import html
 import json
 import os
 import random
+import sys
 import threading
 import time
 import uuid
@@ -14,18 +15,43 @@ from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 
 from .agent import LifeAgent
-from .config import TICK_INTERVAL_MAX, TICK_INTERVAL_MIN, TICKS_PER_INTERVAL
+from .clock import TickClock
+from .config import (
+    CATCHUP_BUDGET_SECONDS,
+    CATCHUP_MAX_TICKS,
+    TICK_INTERVAL_MAX,
+    TICK_INTERVAL_MIN,
+    TICKS_PER_INTERVAL,
+)
+from .env import get_catchup_budget, get_catchup_max_ticks, get_tick_budget
 from .simulator import Simulator
-from .storage import find_agent_by_slug, list_agents, list_public_feed, load_agent, save_agent
+from .storage import (
+    AgentView,
+    find_agent_by_slug,
+    get_cache,
+    get_tick_clock,
+    get_tick_lease,
+    list_agents,
+    list_public_feed,
+    restore_from_checkpoint,
+    save_agent,
+)
 
 
 STATIC_ROOT = Path(__file__).resolve().parent.parent / "web"
 
+# Projections requested from storage; handlers never decode more than these.
+ACTIVITY_FIELDS = ("age_ticks", "last_expression_tick", "missing_until_tick", "timeline_count")
+LIST_FIELDS = ("animal_id", "slug", "species", "age_ticks", "phase", "last_expression_tick", "creator")
+ANIMAL_FIELDS = LIST_FIELDS + ("pressure", "state", "missing_until_tick", "memory_count", "timeline_count")
+TIMELINE_FIELDS = ("animal_id", "age_ticks", "timeline")
+PAGE_FIELDS = ("slug", "species", "phase", "temperament", "timeline") + ACTIVITY_FIELDS
 
-def _describe_activity(agent: LifeAgent) -> str:
+
+def _describe_activity(agent: AgentView) -> str:
     if agent.missing_until_tick and agent.age_ticks < agent.missing_until_tick:
         return "Absent. No trace."
-    if not agent.timeline.expressions:
+    if not agent.timeline_count:
         return "Quiet since birth."
     gap = agent.age_ticks - agent.last_expression_tick
     if gap > 200:
@@ -91,10 +117,13 @@ class OpenAnimalHandler(BaseHTTPRequestHandler):
 
         self._send_bytes(full_path.read_bytes(), content_type)
 
-    def _api_list_animals(self, creator: str | None = None) -> None:
+    def _api_list_animals(
+        self, creator: str | None = None, species: str | None = None, phase: str | None = None
+    ) -> None:
         animals = []
-        for animal_id in list_agents(creator=creator):
-            agent = load_agent(animal_id)
+        cache = get_cache()
+        for animal_id in list_agents(creator=creator, species=species, phase=phase):
+            agent = cache.view(animal_id, LIST_FIELDS)
             animals.append(
                 {
                     "animal_id": agent.animal_id,
@@ -103,14 +132,14 @@ class OpenAnimalHandler(BaseHTTPRequestHandler):
                     "age_ticks": agent.age_ticks,
                     "phase": agent.phase,
                     "last_expression_tick": agent.last_expression_tick,
-                    "creator": getattr(agent, "creator", "") or "",
+                    "creator": agent.creator or "",
                 }
             )
         self._send_json({"animals": animals})
 
     def _api_get_animal(self, animal_id: str) -> None:
         try:
-            agent = load_agent(animal_id)
+            agent = get_cache().view(animal_id, ANIMAL_FIELDS)
         except FileNotFoundError:
             self._send_json({"error": "not_found"}, status=404)
             return
@@ -125,15 +154,15 @@ class OpenAnimalHandler(BaseHTTPRequestHandler):
             "pressure": agent.pressure,
             "state": agent.state,
             "last_expression_tick": agent.last_expression_tick,
-            "memory_count": len(agent.memory.memories),
-            "expressions_count": len(agent.timeline.expressions),
+            "memory_count": agent.memory_count,
+            "expressions_count": agent.timeline_count,
             "last_activity": last_activity,
         }
         self._send_json(payload)
 
     def _api_get_timeline(self, animal_id: str) -> None:
         try:
-            agent = load_agent(animal_id)
+            agent = get_cache().view(animal_id, TIMELINE_FIELDS)
         except FileNotFoundError:
             self._send_json({"error": "not_found"}, status=404)
             return
@@ -176,7 +205,7 @@ class OpenAnimalHandler(BaseHTTPRequestHandler):
         })
 
     def _send_animal_page(self, slug: str) -> None:
-        agent = find_agent_by_slug(slug)
+        agent = find_agent_by_slug(slug, fields=PAGE_FIELDS)
         if not agent:
             self._send_json({"error": "not_found"}, status=404)
             return
@@ -190,7 +219,7 @@ class OpenAnimalHandler(BaseHTTPRequestHandler):
         title = f"OpenAnimal · {agent.species.title()}"
         description = f"{_phase_label(agent.phase)} {agent.species}. {activity}"
         og_image = f"{base_url}/assets/logo.svg"
-        recent_entries = agent.timeline.expressions[-4:]
+        recent_entries = agent.timeline.recent(4)
         recent_lines = [
             " ".join(entry.sentences).strip()
             for entry in recent_entries
@@ -267,7 +296,9 @@ class OpenAnimalHandler(BaseHTTPRequestHandler):
             if parts == ["api", "animals"]:
                 qs = parse_qs(parsed.query)
                 creator = qs.get("creator", [None])[0] if qs else None
-                self._api_list_animals(creator=creator)
+                species = qs.get("species", [None])[0] if qs else None
+                phase = qs.get("phase", [None])[0] if qs else None
+                self._api_list_animals(creator=creator, species=species, phase=phase)
                 return
             if len(parts) >= 3 and parts[0] == "api" and parts[1] == "animals":
                 animal_id = parts[2]
@@ -300,11 +331,49 @@ class OpenAnimalHandler(BaseHTTPRequestHandler):
 
 
 def _tick_loop(interval_min: float, interval_max: float, ticks_per_interval: int, stop_event: threading.Event) -> None:
+    # Several instances may serve one data directory; only the lease holder
+    # ticks, and another instance takes over within an interval if it dies.
     simulator = Simulator()
-    while not stop_event.is_set():
-        interval = random.uniform(interval_min, interval_max)
-        time.sleep(interval)
-        simulator.run(ticks=ticks_per_interval)
+    lease = get_tick_lease()
+    clock = get_tick_clock()
+    try:
+        if lease.acquire():
+            _advance(simulator, clock, 0)
+        while not stop_event.is_set():
+            interval = random.uniform(interval_min, interval_max)
+            time.sleep(interval)
+            if lease.acquire():
+                _advance(simulator, clock, ticks_per_interval)
+    finally:
+        lease.release()
+        simulator.close()
+
+
+def _advance(simulator: Simulator, clock: TickClock, ticks: int) -> None:
+    """Run one interval's ticks, or catch up first if more wall time has passed.
+
+    Missed ticks (after a restart, a host sleep or a lease takeover) beyond the
+    interval's share are replayed back to back, bounded by the catch-up limits;
+    whatever does not fit is skipped.
+    """
+    now = time.time()
+    missed = min(clock.missed_ticks(now), get_catchup_max_ticks(CATCHUP_MAX_TICKS))
+    if missed > ticks:
+        report = simulator.fast_forward(
+            missed, budget_seconds=get_catchup_budget(CATCHUP_BUDGET_SECONDS), progress=_report_catch_up
+        )
+        print(f"openanimal: caught up {report.ticks} of {missed} missed ticks", file=sys.stderr, flush=True)
+    elif ticks:
+        report = simulator.run(ticks=ticks, budget_seconds=get_tick_budget())
+    else:
+        report = None
+    clock.mark(now)
+    if report is not None:
+        print(f"openanimal: tick {report.summary()}", file=sys.stderr, flush=True)
+
+
+def _report_catch_up(done: int, total: int) -> None:
+    print(f"openanimal: catching up, {done}/{total} ticks", file=sys.stderr, flush=True)
 
 
 def run(host: str | None = None, port: int | None = None) -> None:
@@ -320,6 +389,9 @@ def run(host: str | None = None, port: int | None = None) -> None:
     if host is None:
         host = "0.0.0.0" if os.getenv("PORT") else "127.0.0.1"
 
+    # Warm the indexes and the agent cache before the first request.
+    restore_from_checkpoint()
+
     stop_event = threading.Event()
     tick_thread = threading.Thread(
         target=_tick_loop,
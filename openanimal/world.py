@@ -5,12 +5,19 @@ from __future__ import annotations
 import math
 import random
 import time
+from array import array
 from dataclasses import dataclass
 
-from .config import TICK_SECONDS
+from .config import TICK_SECONDS, WORLD_SIGNAL_CACHE_SIZE
+from .rng import MASK64, counter_bits, splitmix64, unit_float
 
+_DAY = 2 * math.pi / (24 * 60 * 60)
+_YEAR = 2 * math.pi / (365 * 24 * 60 * 60)
+# Counter-based draws per tick: two for the noise's normal deviate, one for randomness.
+_DRAWS_PER_TICK = 3
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class WorldSignals:
     tick: int
     time_elapsed: float
@@ -21,29 +28,83 @@ class WorldSignals:
     randomness: float
 
 
+@dataclass
+class WorldSignalTable:
+    """Signals for the consecutive ticks `start .. start + len - 1`, one array per field."""
+
+    start: int
+    circadian: array
+    seasonality: array
+    light_level: array
+    environmental_noise: array
+    randomness: array
+
+    def __len__(self) -> int:
+        return len(self.light_level)
+
+    def at(self, tick: int) -> WorldSignals:
+        index = tick - self.start
+        return WorldSignals(
+            tick=tick,
+            time_elapsed=tick * TICK_SECONDS,
+            circadian=self.circadian[index],
+            seasonality=self.seasonality[index],
+            light_level=self.light_level[index],
+            environmental_noise=self.environmental_noise[index],
+            randomness=self.randomness[index],
+        )
+
+
 class WorldSignalStream:
-    """Shared, non-human input signals for all animals."""
+    """Shared, non-human input signals for all animals.
 
-    def __init__(self, seed: int | None = None, start_time: float | None = None) -> None:
-        self._rng = random.Random(seed)
+    Signals are a pure function of `(seed, tick)`: the random parts come from
+    a counter-based generator keyed by the tick, so every caller, shard and
+    process sees the same world whatever order it asks in. The signals of
+    recently requested ticks are kept (up to `cache_size` ticks) and shared
+    between callers.
+    """
+
+    def __init__(
+        self, seed: int | None = None, start_time: float | None = None, cache_size: int = WORLD_SIGNAL_CACHE_SIZE
+    ) -> None:
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self._key = splitmix64(self.seed & MASK64)
         self._start_time = start_time if start_time is not None else time.time()
+        self._cache: dict[int, WorldSignals] = {}
+        self._cache_size = max(1, cache_size)
 
     def signals_for_tick(self, tick: int) -> WorldSignals:
+        signals = self._cache.get(tick)
+        if signals is None:
+            signals = WorldSignals(tick, *self._compute(tick))
+            if len(self._cache) >= self._cache_size:
+                del self._cache[next(iter(self._cache))]
+            self._cache[tick] = signals
+        return signals
+
+    def signals_range(self, start: int, stop: int) -> WorldSignalTable:
+        """Signals for ticks `start` up to (not including) `stop`, as arrays."""
+        columns = [array("d") for _ in range(5)]
+        for tick in range(start, stop):
+            _, *values = self._compute(tick)
+            for column, value in zip(columns, values):
+                column.append(value)
+        return WorldSignalTable(start, *columns)
+
+    def _compute(self, tick: int) -> tuple[float, float, float, float, float, float]:
         time_elapsed = tick * TICK_SECONDS
 
-        circadian = math.sin(2 * math.pi * (time_elapsed / (24 * 60 * 60)))
-        seasonality = math.sin(2 * math.pi * (time_elapsed / (365 * 24 * 60 * 60)))
+        circadian = math.sin(time_elapsed * _DAY)
+        seasonality = math.sin(time_elapsed * _YEAR)
         light_level = max(0.0, circadian) * 0.8 + 0.2
 
-        environmental_noise = max(0.0, self._rng.gauss(0.35, 0.15))
-        randomness = self._rng.random()
+        counter = tick * _DRAWS_PER_TICK
+        u1 = unit_float(counter_bits(self._key, counter))
+        u2 = unit_float(counter_bits(self._key, counter + 1))
+        # Box-Muller normal deviate with mean 0.35 and sigma 0.15, as gauss() drew before.
+        normal = math.sqrt(-2.0 * math.log(1.0 - u1)) * math.cos(2.0 * math.pi * u2)
+        environmental_noise = max(0.0, 0.35 + 0.15 * normal)
+        randomness = unit_float(counter_bits(self._key, counter + 2))
 
-        return WorldSignals(
-            tick=tick,
-            time_elapsed=time_elapsed,
-            circadian=circadian,
-            seasonality=seasonality,
-            light_level=light_level,
-            environmental_noise=environmental_noise,
-            randomness=randomness,
-        )
+        return time_elapsed, circadian, seasonality, light_level, environmental_noise, randomness
@@ -0,0 +1,78 @@
+import copy
+import os
+import unittest
+from unittest import mock
+
+from openanimal.agent import LifeAgent
+from openanimal.batch import BatchTicker, np
+from openanimal.feed import RecentFeed
+from openanimal.records import agent_to_record, feed_item
+from openanimal.rng import TickRandom, configured_tick_rng
+from openanimal.world import WorldSignalStream
+
+
+def _population(size: int) -> list[LifeAgent]:
+    agents = []
+    for index in range(size):
+        agent = LifeAgent.birth()
+        agent.rng_seed = 1000 + index
+        # Spread ages over phase boundaries and make some agents start dormant
+        agent.age_ticks = (index * 173) % 7200
+        agent.silent_until_tick = agent.age_ticks + 5 if index % 7 == 0 else 0
+        agents.append(agent)
+    return agents
+
+
+def _run_scalar(agents: list[LifeAgent], ticks: int) -> None:
+    world = WorldSignalStream(seed=7)
+    feed = RecentFeed(limit=5, capacity=11)
+    for _ in range(ticks):
+        for agent in agents:
+            signals = world.signals_for_tick(agent.age_ticks)
+            if agent.tick(signals, recent_feed=feed.view(exclude_animal_id=agent.animal_id)):
+                feed.add(feed_item(agent.animal_id, agent.timeline.last))
+
+
+def _run_batch(agents: list[LifeAgent], ticks: int, ticker: BatchTicker) -> None:
+    world = WorldSignalStream(seed=7)
+    feed = RecentFeed(limit=5, capacity=11)
+    for _ in range(ticks):
+        worlds = [world.signals_for_tick(agent.age_ticks) for agent in agents]
+        for agent, signals, rng in zip(agents, worlds, ticker.advance(agents, worlds)):
+            if not agent.is_dormant() and agent.act(signals, rng, feed.view(exclude_animal_id=agent.animal_id)):
+                feed.add(feed_item(agent.animal_id, agent.timeline.last))
+
+
+def _comparable(agent: LifeAgent) -> dict:
+    record = agent_to_record(agent)
+    # Memory ids are random uuids, independent of the tick RNG.
+    record["memory"] = [{k: v for k, v in memory.items() if k != "memory_id"} for memory in record["memory"]]
+    return record
+
+
+class TestBatchTicker(unittest.TestCase):
+    def _assert_matches_scalar(self, ticker: BatchTicker) -> None:
+        scalar = _population(40)
+        batch = copy.deepcopy(scalar)
+        _run_scalar(scalar, 300)
+        _run_batch(batch, 300, ticker)
+        self.assertTrue(any(len(agent.timeline) for agent in scalar))
+        self.assertEqual([_comparable(a) for a in batch], [_comparable(a) for a in scalar])
+
+    def test_array_path_matches_scalar(self):
+        self._assert_matches_scalar(BatchTicker(use_numpy=False))
+
+    @unittest.skipIf(np is None, "NumPy not installed")
+    def test_numpy_path_matches_scalar(self):
+        self._assert_matches_scalar(BatchTicker(use_numpy=True))
+
+    def test_legacy_rng_matches_scalar(self):
+        self.addCleanup(configured_tick_rng.cache_clear)
+        with mock.patch.dict(os.environ, {"OPENANIMAL_RNG": "mt"}):
+            configured_tick_rng.cache_clear()
+            self.assertIsNot(configured_tick_rng(), TickRandom)
+            self._assert_matches_scalar(BatchTicker(use_numpy=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
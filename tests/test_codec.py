@@ -0,0 +1,71 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from openanimal.agent import Encounter, LifeAgent
+from openanimal.codec import CodecError, decode_entries, decode_record, encode_entry, encode_record
+from openanimal.phrases import PhraseTable, PhraseTableError, phrase_table
+from openanimal.records import agent_to_record
+from openanimal.timeline import ExpressionEntry
+
+
+class TestCodec(unittest.TestCase):
+    def _agent(self) -> LifeAgent:
+        agent = LifeAgent.birth(creator="alice")
+        agent.age_ticks = 30
+        agent.encounters["other"] = Encounter(score=0.25, last_tick=12)
+        agent.memory.reinforce("Hey.", valence=0.4, tick=10)
+        agent.memory.reinforce("Warm — sun.", valence=-0.1, tick=20)
+        agent.timeline.add_expression(10, ["Hey.", "Hm."], public_tick=11)
+        agent.timeline.add_expression(20, [])
+        return agent
+
+    def test_record_round_trip(self):
+        agent = self._agent()
+        for include_timeline in (True, False):
+            payload = agent_to_record(agent, include_timeline=include_timeline)
+            data = encode_record(payload)
+            self.assertEqual(decode_record(data), payload)
+
+    def test_rejects_foreign_data(self):
+        with self.assertRaises(CodecError):
+            decode_record(b'{"animal_id": "x"}')
+        data = encode_record(agent_to_record(self._agent()))
+        with self.assertRaises(CodecError):
+            decode_record(data[:40])
+
+    def test_entries_ignore_torn_frame(self):
+        timeline = self._agent().timeline
+        data = b"".join(encode_entry(entry) for entry in timeline.expressions)
+        self.assertEqual(decode_entries(data), timeline.expressions)
+        self.assertEqual(decode_entries(data[:-1]), timeline.expressions[:1])
+
+    def test_stock_phrases_are_stored_by_id(self):
+        stock = ExpressionEntry(tick=5, sentences=["Hey.", "I keep thinking about light."])
+        other = ExpressionEntry(tick=5, sentences=["Hey!", "I keep thinking about tea."])
+        self.assertLess(len(encode_entry(stock)), len(encode_entry(other)) - 20)
+        decoded = decode_entries(encode_entry(stock) + encode_entry(other))
+        self.assertEqual(decoded, [stock, other])
+        self.assertIs(decoded[0].sentences[0], phrase_table().text(phrase_table().id("Hey.")))
+
+
+class TestPhraseTable(unittest.TestCase):
+    def test_sync_keeps_persisted_ids(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "phrases.json"
+            PhraseTable(["Hey.", "Hi."]).sync(path)
+            # A fresh table adopts the stored numbering and appends its new phrases.
+            table = PhraseTable(["Hi.", "Hello."])
+            table.sync(path)
+            self.assertEqual([table.id(text) for text in ("Hey.", "Hi.", "Hello.")], [0, 1, 2])
+            self.assertEqual(json.loads(path.read_text()), ["Hey.", "Hi.", "Hello."])
+            # A table whose ids are already in use cannot be renumbered.
+            used = PhraseTable(["Hello."])
+            used.id("Hello.")
+            with self.assertRaises(PhraseTableError):
+                used.sync(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import math
+import random
+import unittest
+
+from openanimal.config import MEMORY_DECAY_RATE, MEMORY_MIN_WEIGHT
+from openanimal.memory import CONFLICT_VALENCE, MemoryStore, consolidation_key
+from openanimal.records import RECORD_VERSION, project_record
+
+
+class TestMemoryStore(unittest.TestCase):
+    def test_lazy_decay_matches_stepwise_decay(self):
+        store = MemoryStore()
+        memory = store.reinforce("Warm.", valence=0.5, tick=600)
+        expected = memory.weight
+        tick = 600
+        while store.get("Warm.") is not None:
+            tick += 1
+            expected *= math.exp(-MEMORY_DECAY_RATE * (tick - 600))
+            store.decay(tick)
+            if expected < MEMORY_MIN_WEIGHT:
+                break
+            self.assertAlmostEqual(store.weight(memory), expected, places=12)
+        # Forgotten on exactly the tick its weight fell below the minimum.
+        self.assertIsNone(store.get("Warm."))
+        self.assertLess(expected, MEMORY_MIN_WEIGHT)
+
+    def test_reinforce_resets_decay_and_tracks_conflict(self):
+        store = MemoryStore()
+        store.reinforce("Warm.", valence=0.8, tick=10)
+        self.assertEqual(store.conflict_score(), 0.0)
+        store.reinforce("Cold.", valence=-0.8, tick=10)
+        store.decay(30)
+        faded = store.weight(store.get("Warm."))
+        store.reinforce("Warm.", valence=0.8, tick=30)
+        self.assertAlmostEqual(store.weight(store.get("Warm.")), faded + 0.12)
+        self.assertGreater(store.conflict_score(), 0.0)
+        self.assertEqual([m.text for m in store.most_salient(limit=1)], ["Warm."])
+
+    def test_records_round_trip_at_store_tick(self):
+        store = MemoryStore()
+        store.reinforce("Warm.", valence=0.5, tick=10)
+        store.decay(25)
+        loaded = MemoryStore(records=store.to_records(), tick=25)
+        self.assertEqual(len(loaded), 1)
+        for tick in (26, 40):
+            store.decay(tick)
+            loaded.decay(tick)
+            self.assertAlmostEqual(loaded.weight(loaded.get("Warm.")), store.weight(store.get("Warm.")), places=12)
+
+    def test_aggregates_match_a_full_scan(self):
+        rng = random.Random(5)
+        store = MemoryStore()
+        texts = [f"Thing {index}." for index in range(25)]
+        for tick in range(1, 400):
+            store.decay(tick)
+            for _ in range(rng.randint(0, 3)):
+                store.reinforce(rng.choice(texts), valence=rng.uniform(-1, 1), tick=tick)
+            if tick % 50 == 0:
+                store = MemoryStore(records=store.to_records(), tick=tick)
+            memories = store.memories
+            weights = [store.weight(m) for m in memories]
+            positive = [w for m, w in zip(memories, weights) if m.valence > CONFLICT_VALENCE]
+            negative = [w for m, w in zip(memories, weights) if m.valence < -CONFLICT_VALENCE]
+            expected = min(1.0, (sum(positive) + sum(negative)) / 4.0) if positive and negative else 0.0
+            self.assertAlmostEqual(store.conflict_score(), expected, places=12)
+            ranked = sorted(memories, key=store.weight, reverse=True)[:3]
+            self.assertEqual(store.most_salient(), ranked)
+
+    def test_near_duplicates_consolidate(self):
+        self.assertEqual(consolidation_key("I keep thinking about Cold."), consolidation_key("cold is sticking with me"))
+        self.assertEqual(consolidation_key("The  air feels different!"), consolidation_key("the air feels different."))
+        store = MemoryStore()
+        first = store.reinforce("I keep thinking about Cold.", valence=0.2, tick=10)
+        merged = store.reinforce("That Cold feeling again.", valence=0.4, tick=11)
+        self.assertIs(merged, first)
+        self.assertEqual((len(store), first.usage_count), (1, 1))
+        self.assertEqual(first.text, "I keep thinking about Cold.")
+
+        # Duplicates written by older versions are merged on load.
+        records = store.to_records() + [dict(store.to_records()[0], text="Cold is sticking with me.", usage_count=2)]
+        loaded = MemoryStore(records=records, tick=11)
+        self.assertEqual(len(loaded), 1)
+        view = project_record({"schema_version": RECORD_VERSION, "memory": records}, ("memory_count",))
+        self.assertEqual(view.memory_count, 1)
+        memory = loaded.get("cold is sticking with me")
+        self.assertEqual((len(loaded), memory.usage_count), (1, 4))
+        self.assertAlmostEqual(loaded.weight(memory), min(1.0, 2 * store.weight(first)))
+
+    def test_capacity_forgets_the_faintest(self):
+        store = MemoryStore(capacity=3)
+        for tick, text in enumerate(["One.", "Two.", "Three."], start=600):
+            store.reinforce(text, valence=0.0, tick=tick)
+        store.reinforce("Two.", valence=0.0, tick=603)
+        store.decay(604)
+        store.reinforce("Four.", valence=0.0, tick=604)
+        self.assertEqual(len(store), 3)
+        self.assertIsNone(store.get("One."))
+        self.assertEqual(len(MemoryStore(records=store.to_records(), tick=604, capacity=2).memories), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
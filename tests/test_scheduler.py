@@ -0,0 +1,79 @@
+import copy
+import random
+import unittest
+
+from openanimal.agent import LifeAgent
+from openanimal.batch import BatchTicker
+from openanimal.feed import RecentFeed
+from openanimal.records import feed_item
+from openanimal.scheduler import FairScheduler, WakeupScheduler
+from openanimal.world import WorldSignalStream
+
+from tests.test_batch import _comparable, _population
+
+
+def _samples(ids: list[str], ticks: int) -> list[list[str]]:
+    rng = random.Random(11)
+    return [rng.sample(ids, k=max(1, int(len(ids) * rng.uniform(0.4, 0.9)))) for _ in range(ticks)]
+
+
+class TestWakeupScheduler(unittest.TestCase):
+    def test_deferred_ticks_match_immediate_ticks(self):
+        eager = _population(40)
+        lazy = copy.deepcopy(eager)
+        samples = _samples([agent.animal_id for agent in eager], 300)
+
+        world = WorldSignalStream(seed=7)
+        feed = RecentFeed(limit=5, capacity=11)
+        by_id = {agent.animal_id: agent for agent in eager}
+        expected = []
+        for sample in samples:
+            for animal_id in sample:
+                agent = by_id[animal_id]
+                signals = world.signals_for_tick(agent.age_ticks)
+                if agent.tick(signals, recent_feed=feed.view(exclude_animal_id=animal_id)):
+                    item = feed_item(animal_id, agent.timeline.last)
+                    feed.add(item)
+                    expected.append(item)
+
+        world = WorldSignalStream(seed=7)
+        feed = RecentFeed(limit=5, capacity=11)
+        by_id = {agent.animal_id: agent for agent in lazy}
+        scheduler = WakeupScheduler(BatchTicker())
+        produced = []
+        for sample in samples:
+            produced.extend(scheduler.tick(sample, by_id.__getitem__, world, feed, lambda *args: None)[1])
+        scheduler.settle(by_id.__getitem__, world, lambda *args: None)
+
+        self.assertGreater(scheduler.deferred, 0)
+        self.assertTrue(expected)
+        self.assertEqual(produced, expected)
+        self.assertEqual([_comparable(a) for a in lazy], [_comparable(a) for a in eager])
+
+
+class TestFairScheduler(unittest.TestCase):
+    def test_budget_bounds_sample_and_nobody_starves(self):
+        agents = [LifeAgent.birth() for _ in range(10)]
+        for index, agent in enumerate(agents):
+            agent.pressure = index / 10
+        ids = [agent.animal_id for agent in agents]
+        by_id = {agent.animal_id: agent for agent in agents}
+        fair = FairScheduler(cost_estimate=0.01)
+        last_picked = {}
+        for tick in range(12):
+            chosen = fair.select(ids, budget_seconds=0.03)
+            self.assertEqual(len(chosen), 3)
+            for animal_id in chosen:
+                last_picked[animal_id] = tick
+            fair.record(chosen, [by_id[animal_id] for animal_id in chosen], seconds=0.03)
+        # Every animal is picked at least once every few ticks...
+        self.assertEqual(len(last_picked), 10)
+        self.assertTrue(all(tick >= 8 for tick in last_picked.values()))
+        # ...and among equally overdue animals the most pressured go first.
+        fair = FairScheduler(cost_estimate=0.01)
+        fair.record(ids, agents, seconds=0.1)
+        self.assertEqual(fair.select(ids, budget_seconds=0.02), [ids[9], ids[8]])
+
+
+if __name__ == "__main__":
+    unittest.main()
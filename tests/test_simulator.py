@@ -0,0 +1,177 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from openanimal import storage
+from openanimal.agent import LifeAgent
+from openanimal.checkpoint import CheckpointError, read_checkpoint, verify_checkpoint
+from openanimal.config import TICK_SECONDS
+from openanimal.feed import RecentFeed
+from openanimal.metrics import RunProfiler
+from openanimal.records import agent_to_record
+from openanimal.simulator import Simulator
+
+
+class SimulatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.backend = storage.open_backend("json", Path(self._tmp.name))
+        self._previous = storage.set_backend(self.backend)
+
+    def tearDown(self):
+        storage.set_backend(self._previous)
+        self.backend.close()
+        self._tmp.cleanup()
+
+
+class TestRecentFeed(SimulatorTestCase):
+    def test_matches_storage_view(self):
+        agents = [LifeAgent.birth() for _ in range(5)]
+        for index, agent in enumerate(agents):
+            agent.timeline.add_expression(index * 3, [f"Line {index}."], public_tick=index * 3)
+            storage.save_agent(agent)
+        feed = RecentFeed(storage.get_recent_feed(limit=7), limit=3, capacity=7)
+        for agent in agents:
+            self.assertEqual(
+                feed.view(exclude_animal_id=agent.animal_id),
+                storage.get_recent_feed(exclude_animal_id=agent.animal_id, limit=3),
+            )
+
+        agents[0].timeline.add_expression(99, ["Again."], public_tick=99)
+        storage.save_agent(agents[0])
+        feed.add(storage.get_recent_feed(limit=1)[0])
+        self.assertEqual(feed.view(), storage.get_recent_feed(limit=3))
+
+
+class TestSimulator(SimulatorTestCase):
+    def test_run_ticks_population(self):
+        for _ in range(4):
+            storage.save_agent(LifeAgent.birth(creator="alice"))
+        report = Simulator(seed=7).run(ticks=20)
+        self.assertEqual(report.ticks, 20)
+        ages = [storage.load_agent(animal_id).age_ticks for animal_id in storage.list_agents()]
+        self.assertTrue(any(age > 0 for age in ages))
+        self.assertGreater(len(ages), 4)
+
+    def test_sharded_run(self):
+        originals = []
+        for _ in range(6):
+            agent = LifeAgent.birth(creator="alice")
+            agent.last_expression_tick = -100
+            storage.save_agent(agent)
+            originals.append(agent.animal_id)
+        simulator = Simulator(seed=3, workers=2)
+        grown = []
+        grow = simulator._grow
+
+        def record_grow(cache, sampled, parents):
+            grown.append((sampled, list(parents)))
+            return grow(cache, sampled, parents)
+
+        simulator._grow = record_grow
+        try:
+            report = simulator.run(ticks=30)
+        finally:
+            simulator.close()
+        self.assertEqual(report.ticks, 30)
+        # Parents come from the animals ticked that tick, as in a serial run.
+        self.assertTrue(all(sampled == len(parents) == len(set(parents)) for sampled, parents in grown))
+        self.assertEqual(sum(sampled for sampled, _ in grown), report.agent_ticks)
+        agents = [storage.load_agent(animal_id) for animal_id in storage.list_agents()]
+        self.assertGreater(len(agents), 6)
+        self.assertTrue(all(storage.load_agent(animal_id).age_ticks > 0 for animal_id in originals))
+        self.assertEqual(sum(len(agent.timeline) for agent in agents), report.expressions)
+        self.assertEqual(len(storage.list_public_feed(limit=1000)) > 0, report.expressions > 0)
+
+    def test_fast_forward_in_chunks_within_budget(self):
+        storage.save_agent(LifeAgent.birth())
+        seen = []
+        report = Simulator(seed=1).fast_forward(25, chunk=10, progress=lambda done, total: seen.append((done, total)))
+        self.assertEqual(report.ticks, 25)
+        self.assertEqual(seen, [(10, 25), (20, 25), (25, 25)])
+        self.assertEqual(Simulator(seed=1).fast_forward(25, budget_seconds=0).ticks, 0)
+
+    def test_budgeted_run_reports_throughput_and_backlog(self):
+        for _ in range(40):
+            storage.save_agent(LifeAgent.birth())
+        simulator = Simulator(seed=2)
+        simulator.fair.cost = 0.01
+        report = simulator.run(ticks=3, budget_seconds=0.0)
+        # An exhausted budget still advances one animal per tick.
+        self.assertEqual(report.agent_ticks, 3)
+        self.assertGreater(report.backlog, 0)
+        self.assertGreater(report.throughput, 0)
+
+    def test_report_phases_and_profiles(self):
+        for _ in range(6):
+            storage.save_agent(LifeAgent.birth())
+        profiler = RunProfiler(("cpu", "memory"), Path(self._tmp.name) / "profiles", every=2)
+        simulator = Simulator(seed=2, checkpoint_ticks=0, profiler=profiler)
+        first = simulator.run(ticks=2)
+        self.assertEqual(profiler.dumped, [])
+        second = simulator.run(ticks=2)
+        simulator.close()
+        self.assertEqual(sorted(path.suffix for path in profiler.dumped), [".prof", ".tracemalloc", ".txt"])
+
+        for report in (first, second):
+            self.assertGreater(report.agent_ticks, 0)
+            self.assertGreater(report.bytes_written, 0)
+            self.assertGreater(report.cache_hits + report.cache_misses, 0)
+            self.assertLessEqual({"list", "feed", "load", "tick", "save"}, set(report.phases))
+            self.assertLessEqual(sum(report.phases.values()), report.seconds)
+        first.add(second)
+        self.assertEqual(first.ticks, 4)
+        self.assertIn("agent_ticks=", first.summary())
+
+
+class TestTickClock(SimulatorTestCase):
+    def test_missed_ticks(self):
+        clock = storage.get_tick_clock()
+        self.assertEqual(clock.missed_ticks(now=1000.0), 0)
+        clock.mark(1000.0)
+        self.assertEqual(clock.last(), 1000.0)
+        self.assertEqual(clock.missed_ticks(now=1000.0 + 10.5 * TICK_SECONDS), 10)
+        self.assertEqual(clock.missed_ticks(now=900.0), 0)
+
+
+class TestCheckpoint(SimulatorTestCase):
+    def test_cold_start_from_checkpoint_sees_newer_writes(self):
+        for _ in range(12):
+            storage.save_agent(LifeAgent.birth())
+        simulator = Simulator(seed=4, checkpoint_ticks=3)
+        simulator.run(ticks=3)
+        path = storage.get_checkpoint_path()
+        checkpoint = read_checkpoint(path)
+        self.assertEqual(sorted(checkpoint.records), sorted(storage.list_agents()))
+        self.assertEqual(verify_checkpoint(checkpoint, self.backend), 0)
+
+        # A write after the checkpoint must win over the checkpointed copy.
+        changed = storage.load_agent(storage.list_agents()[0])
+        changed.age_ticks += 50
+        changed.timeline.add_expression(changed.age_ticks, ["Later."], public_tick=changed.age_ticks)
+        storage.save_agent(changed)
+        expected = {animal_id: agent_to_record(storage.load_agent(animal_id)) for animal_id in storage.list_agents()}
+        feed = storage.list_public_feed()
+
+        storage.set_backend(storage.open_backend("json", Path(self._tmp.name)))
+        self.assertIs(storage.restore_from_checkpoint(), storage.restore_from_checkpoint())
+        cache = storage.get_cache()
+        self.assertEqual({animal_id: agent_to_record(cache.get(animal_id)) for animal_id in expected}, expected)
+        self.assertEqual(storage.list_public_feed(), feed)
+        self.assertEqual(cache.view(changed.animal_id, ("age_ticks",)).age_ticks, changed.age_ticks)
+
+    def test_damaged_checkpoint_is_ignored(self):
+        storage.save_agent(LifeAgent.birth())
+        Simulator(checkpoint_ticks=1).run(ticks=1)
+        path = storage.get_checkpoint_path()
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+        with self.assertRaises(CheckpointError):
+            read_checkpoint(path)
+        storage.set_backend(storage.open_backend("json", Path(self._tmp.name)))
+        self.assertIsNone(storage.restore_from_checkpoint())
+
+
+if __name__ == "__main__":
+    unittest.main()
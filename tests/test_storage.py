@@ -0,0 +1,452 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from openanimal.agent import LifeAgent
+from openanimal.lease import TickLease
+from openanimal.records import RECORD_VERSION, agent_to_record
+from openanimal.storage import AgentCache, AgentNotFoundError, open_backend
+
+
+class BackendContract:
+    kind = ""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.backend = open_backend(self.kind, Path(self._tmp.name))
+
+    def tearDown(self):
+        self.backend.close()
+        self._tmp.cleanup()
+
+    def _agent(self, creator: str = "") -> LifeAgent:
+        agent = LifeAgent.birth(creator=creator)
+        self.backend.save_agent(agent)
+        return agent
+
+    def test_round_trip(self):
+        agent = LifeAgent.birth(creator="alice")
+        agent.age_ticks = 40
+        agent.memory.reinforce("Hey.", valence=0.2, tick=40)
+        agent.timeline.add_expression(40, ["Hey."], public_tick=38)
+        self.backend.save_agent(agent)
+        loaded = self.backend.load_agent(agent.animal_id)
+        self.assertEqual(loaded.slug, agent.slug)
+        self.assertEqual(loaded.state, agent.state)
+        self.assertEqual(loaded.memory.memories[0].text, "Hey.")
+        self.assertEqual(loaded.timeline.expressions, agent.timeline.expressions)
+
+    def test_projection(self):
+        agent = LifeAgent.birth(creator="alice")
+        agent.memory.reinforce("Hey.", valence=0.2, tick=1)
+        agent.timeline.add_expression(4, ["Hi."], public_tick=4)
+        self.backend.save_agent(agent)
+        view = self.backend.load_agent(agent.animal_id, fields=("slug", "memory_count", "last_expression"))
+        self.assertEqual(view.slug, agent.slug)
+        self.assertEqual(view.memory_count, 1)
+        self.assertEqual(view.last_expression.sentences, ["Hi."])
+        with self.assertRaises(AttributeError):
+            view.state
+        columns = self.backend.load_agent(agent.animal_id, fields=("species", "phase"))
+        self.assertEqual((columns.species, columns.phase), (agent.species, "infant"))
+        with self.assertRaises(ValueError):
+            self.backend.load_agent(agent.animal_id, fields=("nonsense",))
+
+    def test_missing_agent(self):
+        with self.assertRaises(AgentNotFoundError):
+            self.backend.load_agent("nope")
+        with self.assertRaises(FileNotFoundError):
+            self.backend.load_agent("nope")
+
+    def test_lookups(self):
+        mine = self._agent(creator="alice")
+        other = self._agent(creator="bob")
+        self.assertCountEqual(self.backend.list_agents(), [mine.animal_id, other.animal_id])
+        self.assertEqual(self.backend.list_agents(creator="alice"), [mine.animal_id])
+        self.assertEqual(self.backend.find_agent_by_slug(other.slug).animal_id, other.animal_id)
+        self.assertIsNone(self.backend.find_agent_by_slug("missing-slug"))
+        self.assertEqual(self.backend.find_agent_by_slug(mine.animal_id).slug, mine.slug)
+
+    def test_filtered_listing(self):
+        young = self._agent(creator="alice")
+        old = self._agent(creator="alice")
+        old.age_ticks = 3000
+        old.species = "unicorn"
+        old._update_phase()
+        self.backend.save_agent(old)
+        self.assertEqual(self.backend.list_agents(creator="alice", phase="mature"), [old.animal_id])
+        self.assertEqual(self.backend.list_agents(phase="infant"), [young.animal_id])
+        self.assertEqual(self.backend.list_agents(species="unicorn"), [old.animal_id])
+        self.assertEqual(self.backend.list_agents(creator="bob", species="unicorn"), [])
+
+    def test_feeds(self):
+        first = self._agent()
+        second = self._agent()
+        first.age_ticks = second.age_ticks = 20
+        first.timeline.add_expression(10, ["Hi."], public_tick=12)
+        first.timeline.add_expression(18, ["Hello."], public_tick=30)
+        second.timeline.add_expression(15, ["Same here."], public_tick=15)
+        self.backend.save_agent(first)
+        self.backend.save_agent(second)
+
+        recent = self.backend.get_recent_feed(limit=10)
+        self.assertEqual([item["sentences"] for item in recent], [["Hello."], ["Same here."]])
+        excluded = self.backend.get_recent_feed(exclude_animal_id=first.animal_id)
+        self.assertEqual([item["animal_id"] for item in excluded], [second.animal_id])
+
+        posts = self.backend.list_public_feed()
+        # public_tick 30 is still in the future for every animal
+        self.assertEqual([p["public_tick"] for p in posts], [15, 12])
+        self.assertEqual(posts[1]["slug"], first.slug)
+
+    def test_feed_survives_reopen(self):
+        agent = self._agent()
+        agent.age_ticks = 30
+        for tick in range(5, 30, 5):
+            agent.timeline.add_expression(tick, [f"Tick {tick}."], public_tick=tick)
+            self.backend.save_agent(agent)
+        expected = self.backend.list_public_feed()
+        self.assertEqual(len(expected), 5)
+        self.backend.close()
+        self.backend = open_backend(self.kind, Path(self._tmp.name))
+        self.assertEqual(self.backend.list_public_feed(), expected)
+        self.assertEqual(self.backend.get_recent_feed()[0]["tick"], 25)
+
+    def test_feed_shows_current_phase(self):
+        agent = self._agent(creator="alice")
+        agent.age_ticks = 5
+        agent.timeline.add_expression(5, ["Small."], public_tick=5)
+        self.backend.save_agent(agent)
+        self.assertEqual(self.backend.list_public_feed()[0]["phase"], "infant")
+        agent.age_ticks = 3000
+        agent._update_phase()
+        self.backend.save_agent(agent)
+        post = self.backend.list_public_feed()[0]
+        self.assertEqual((post["phase"], post["slug"], post["creator"]), ("mature", agent.slug, "alice"))
+
+    def test_public_cutoff_survives_reopen(self):
+        agent = self._agent()
+        agent.age_ticks = 20
+        agent.timeline.add_expression(10, ["Later."], public_tick=30)
+        self.backend.save_agent(agent)
+        other = open_backend(self.kind, Path(self._tmp.name))
+        self.assertEqual(other.list_public_feed(), [])
+        # The world moves on without anything new being said.
+        agent.age_ticks = 35
+        self.backend.save_agent(agent)
+        self.assertEqual(len(other.list_public_feed()), 1)
+        other.close()
+        self.backend.close()
+        self.backend = open_backend(self.kind, Path(self._tmp.name))
+        self.assertEqual([post["sentences"] for post in self.backend.list_public_feed()], [["Later."]])
+
+
+class TestJsonBackend(BackendContract, unittest.TestCase):
+    kind = "json"
+
+    def test_timeline_segments_are_appended_and_lazy(self):
+        self.backend.timelines.segment_entries = 3
+        agent = self._agent()
+        for tick in range(1, 8):
+            agent.timeline.add_expression(tick, [f"Tick {tick}."])
+            self.backend.save_agent(agent)
+        root = Path(self._tmp.name)
+        segments = sorted(path.name for path in (root / "timelines" / agent.animal_id).iterdir())
+        self.assertEqual(segments, ["000000.jsonl", "000001.jsonl", "000002.jsonl"])
+        record = json.loads((root / "animals" / f"{agent.animal_id}.json").read_text())
+        self.assertNotIn("timeline", record)
+
+        fresh = open_backend(self.kind, root)
+        fresh.timelines.segment_entries = 3
+        loaded = fresh.load_agent(agent.animal_id)
+        self.assertFalse(loaded.timeline.is_loaded)
+        self.assertEqual(len(loaded.timeline), 7)
+        self.assertEqual([e.tick for e in loaded.timeline.recent(2)], [6, 7])
+        loaded.timeline.add_expression(8, ["Tick 8."])
+        fresh.save_agent(loaded)
+        self.assertEqual([e.tick for e in loaded.timeline.expressions], list(range(1, 9)))
+        self.assertEqual(self.backend.load_agent(agent.animal_id).timeline.expressions, loaded.timeline.expressions)
+
+    def test_future_posts_do_not_evict_visible_ones(self):
+        self.backend._feed_index().capacity = 3
+        early, late = self._agent(), self._agent()
+        early.age_ticks = late.age_ticks = 10
+        for tick in range(1, 4):
+            early.timeline.add_expression(tick, [f"Now {tick}."], public_tick=tick)
+        for tick in range(4, 9):
+            late.timeline.add_expression(tick, [f"Later {tick}."], public_tick=50 + tick)
+        self.backend.save_agents([early, late])
+        self.assertEqual([post["public_tick"] for post in self.backend.list_public_feed()], [3, 2, 1])
+        late.age_ticks = 57
+        self.backend.save_agent(late)
+        self.assertEqual([post["public_tick"] for post in self.backend.list_public_feed()], [57, 56, 55])
+        reopened = open_backend(self.kind, Path(self._tmp.name))
+        self.assertEqual([post["public_tick"] for post in reopened.list_public_feed(limit=3)], [57, 56, 55])
+
+    def test_index_rebuilt_when_records_are_swapped(self):
+        gone = self._agent(creator="alice")
+        self._agent(creator="bob")
+        self.backend.list_agents(creator="alice")
+        # Another record takes the place of one, keeping the file count.
+        swapped = LifeAgent.birth(creator="carol")
+        self.backend._write_record(swapped.animal_id, agent_to_record(swapped, include_timeline=False))
+        for path in self.backend._record_paths(gone.animal_id):
+            path.unlink(missing_ok=True)
+        fresh = open_backend(self.kind, Path(self._tmp.name))
+        self.assertEqual(fresh.list_agents(creator="carol"), [swapped.animal_id])
+        self.assertEqual(fresh.list_agents(creator="alice"), [])
+        self.assertIsNone(fresh.find_agent_by_slug(gone.slug))
+
+    def test_batch_save_rewrites_index_once(self):
+        self._agent()
+        index = self.backend._agent_index()
+        writes = []
+        original = index._write
+        index._write = lambda: (writes.append(1), original())
+        agents = [LifeAgent.birth(creator="alice") for _ in range(3)]
+        self.backend.save_agents(agents)
+        self.assertEqual(len(writes), 1)
+        self.assertCountEqual(self.backend.list_agents(creator="alice"), [agent.animal_id for agent in agents])
+        self.backend.save_agents(agents)
+        self.assertEqual(len(writes), 1)
+
+    def test_legacy_inline_timeline_moves_to_segments(self):
+        agent = LifeAgent.birth()
+        agent.timeline.add_expression(3, ["Hey."])
+        (Path(self._tmp.name) / "animals").mkdir(parents=True)
+        path = Path(self._tmp.name) / "animals" / f"{agent.animal_id}.json"
+        path.write_text(json.dumps(agent_to_record(agent)))
+        loaded = self.backend.load_agent(agent.animal_id)
+        self.backend.save_agent(loaded)
+        reloaded = open_backend(self.kind, Path(self._tmp.name)).load_agent(agent.animal_id)
+        self.assertEqual(reloaded.timeline.expressions, agent.timeline.expressions)
+
+    def test_migrate_upgrades_legacy_records_once(self):
+        agent = LifeAgent.birth()
+        agent.timeline.add_expression(3, ["Hey."])
+        legacy = agent_to_record(agent)
+        del legacy["schema_version"], legacy["slug"], legacy["rng_seed"]
+        legacy.update(phase="adolescence", state={"energy": 0.8, "stress": 0.3, "curiosity": 0.6, "restlessness": 0.1})
+        (Path(self._tmp.name) / "animals").mkdir(parents=True)
+        path = Path(self._tmp.name) / "animals" / f"{agent.animal_id}.json"
+        path.write_text(json.dumps(legacy))
+
+        view = self.backend.load_agent(agent.animal_id, fields=("phase", "slug"))
+        self.assertEqual((view.phase, view.slug), ("mature", f"{agent.species}-{agent.animal_id[:6]}"))
+        self.assertEqual(self.backend.migrate(), 1)
+        record = json.loads(path.read_text())
+        self.assertEqual(record["schema_version"], RECORD_VERSION)
+        self.assertAlmostEqual(record["state"]["fatigue"], 0.2)
+        self.assertNotIn("timeline", record)
+        self.assertEqual(self.backend.migrate(), 0)
+        reloaded = open_backend(self.kind, Path(self._tmp.name)).load_agent(agent.animal_id)
+        self.assertEqual(reloaded.timeline.expressions, agent.timeline.expressions)
+
+    def test_torn_appends_are_repaired(self):
+        root = Path(self._tmp.name)
+        agent = self._agent()
+        agent.timeline.add_expression(1, ["One."])
+        self.backend.save_agent(agent)
+        # Simulate a crash after partial appends that never reached the record.
+        with (root / "timelines" / agent.animal_id / "000000.jsonl").open("a") as handle:
+            handle.write('{"tick": 2, "sente')
+        with (root / "feed.jsonl").open("a") as handle:
+            handle.write('{"animal_id": "x", "ti')
+
+        reopened = open_backend(self.kind, root)
+        loaded = reopened.load_agent(agent.animal_id)
+        generation = reopened.generation(agent.animal_id)
+        loaded.timeline.add_expression(3, ["Three."])
+        reopened.save_agent(loaded)
+        self.assertNotEqual(reopened.generation(agent.animal_id), generation)
+        self.assertEqual(list((root / "animals").iterdir()), [root / "animals" / f"{agent.animal_id}.json"])
+
+        fresh = open_backend(self.kind, root)
+        self.assertEqual([e.tick for e in fresh.load_agent(agent.animal_id).timeline.expressions], [1, 3])
+        self.assertEqual([p["tick"] for p in fresh.list_public_feed()], [3, 1])
+
+    def test_feed_index_rebuilt_when_missing(self):
+        agent = self._agent()
+        agent.age_ticks = 10
+        agent.timeline.add_expression(9, ["Hi."], public_tick=9)
+        self.backend.save_agent(agent)
+        (Path(self._tmp.name) / "feed.jsonl").unlink()
+        reopened = open_backend(self.kind, Path(self._tmp.name))
+        self.assertEqual([p["sentences"] for p in reopened.list_public_feed()], [["Hi."]])
+
+    def test_stale_agent_index_is_rebuilt(self):
+        mine = self._agent(creator="alice")
+        # A record copied in without going through save_agent
+        stray = LifeAgent.birth(creator="alice")
+        (Path(self._tmp.name) / "animals" / f"{stray.animal_id}.json").write_text(
+            (Path(self._tmp.name) / "animals" / f"{mine.animal_id}.json")
+            .read_text()
+            .replace(mine.animal_id, stray.animal_id)
+            .replace(mine.slug, stray.slug)
+        )
+        reopened = open_backend(self.kind, Path(self._tmp.name))
+        self.assertCountEqual(reopened.list_agents(creator="alice"), [mine.animal_id, stray.animal_id])
+        self.assertEqual(reopened.find_agent_by_slug(stray.slug).animal_id, stray.animal_id)
+
+    def test_two_processes_share_indexes(self):
+        root = Path(self._tmp.name)
+        first = self._agent(creator="alice")
+        other = open_backend(self.kind, root)
+        self.assertEqual(other.list_public_feed(), [])
+        self.assertEqual(other.list_agents(creator="alice"), [first.animal_id])
+
+        # Each instance writes while the other holds an already loaded index.
+        first.timeline.add_expression(3, ["Hi."], public_tick=3)
+        first.age_ticks = 3
+        self.backend.save_agent(first)
+        second = LifeAgent.birth(creator="alice")
+        other.save_agent(second)
+
+        self.assertEqual([p["sentences"] for p in other.list_public_feed()], [["Hi."]])
+        self.assertEqual(self.backend.find_agent_by_slug(second.slug).animal_id, second.animal_id)
+        for backend in (self.backend, other, open_backend(self.kind, root)):
+            self.assertCountEqual(backend.list_agents(creator="alice"), [first.animal_id, second.animal_id])
+
+
+class TestBinaryBackend(BackendContract, unittest.TestCase):
+    kind = "json"
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.backend = open_backend(self.kind, Path(self._tmp.name), record_format="binary")
+
+    def test_convert_both_ways(self):
+        root = Path(self._tmp.name)
+        agent = self._agent(creator="alice")
+        agent.timeline.add_expression(5, ["Hey."], public_tick=5)
+        self.backend.save_agent(agent)
+        self.assertTrue((root / "animals" / f"{agent.animal_id}.oab").exists())
+        self.assertTrue((root / "timelines" / agent.animal_id / "000000.seg").exists())
+
+        as_json = open_backend(self.kind, root, record_format="json")
+        self.assertEqual(as_json.convert(), 1)
+        self.assertEqual(sorted(p.name for p in (root / "animals").iterdir()), [f"{agent.animal_id}.json"])
+        self.assertTrue((root / "timelines" / agent.animal_id / "000000.jsonl").exists())
+        self.assertEqual(as_json.load_agent(agent.animal_id).timeline.expressions, agent.timeline.expressions)
+
+        self.assertEqual(self.backend.convert(), 1)
+        loaded = self.backend.load_agent(agent.animal_id)
+        self.assertEqual(loaded.creator, "alice")
+        self.assertEqual(loaded.timeline.expressions, agent.timeline.expressions)
+
+
+class TestSQLiteBackend(BackendContract, unittest.TestCase):
+    kind = "sqlite"
+
+    def test_migrate_skips_current_records(self):
+        old, current = self._agent(), self._agent()
+        legacy = agent_to_record(old, include_timeline=False)
+        del legacy["schema_version"]
+        legacy["phase"] = "infancy"
+        conn = self.backend._conn()
+        with conn:
+            conn.execute("UPDATE agents SET record = ? WHERE animal_id = ?", (json.dumps(legacy), old.animal_id))
+        self.assertEqual(self.backend.migrate(), 1)
+        self.assertEqual(self.backend.migrate(), 0)
+        self.assertEqual(self.backend.load_agent(old.animal_id).phase, "infant")
+        self.assertEqual(self.backend.load_agent(current.animal_id).slug, current.slug)
+
+    def test_close_reaches_every_thread(self):
+        agent = self._agent()
+        connections = [self.backend._conn()]
+        worker = threading.Thread(target=lambda: connections.append(self.backend._conn()))
+        worker.start()
+        worker.join()
+        self.assertIsNot(connections[0], connections[1])
+        self.backend.close()
+        for conn in connections:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        self.assertEqual(self.backend.load_agent(agent.animal_id).slug, agent.slug)
+
+
+class TestTickLease(unittest.TestCase):
+    def test_single_holder_until_released(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "tick.lock"
+            leader, standby = TickLease(path), TickLease(path)
+            self.assertTrue(leader.acquire())
+            self.assertTrue(leader.acquire())
+            self.assertFalse(standby.acquire())
+            self.assertEqual(standby.holder()["pid"], os.getpid())
+            leader.release()
+            self.assertTrue(standby.acquire())
+            self.assertFalse(leader.acquire())
+            standby.release()
+
+
+class TestAgentCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.backend = open_backend("sqlite", Path(self._tmp.name))
+
+    def tearDown(self):
+        self.backend.close()
+        self._tmp.cleanup()
+
+    def test_identity_and_revalidation(self):
+        agent = LifeAgent.birth()
+        self.backend.save_agent(agent)
+        cache = AgentCache(self.backend)
+        first = cache.get(agent.animal_id)
+        self.assertIs(cache.get(agent.animal_id), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        agent.age_ticks = 99
+        self.backend.save_agent(agent)
+        self.assertEqual(cache.get(agent.animal_id).age_ticks, 99)
+
+    def test_write_behind(self):
+        agent = LifeAgent.birth()
+        self.backend.save_agent(agent)
+        cache = AgentCache(self.backend)
+        cached = cache.get(agent.animal_id)
+        cached.age_ticks = 5
+        cache.mark_dirty(cached)
+        child = LifeAgent.birth()
+        cache.add(child)
+        self.assertEqual(self.backend.load_agent(agent.animal_id).age_ticks, 0)
+        self.assertEqual(cache.flush(), 2)
+        self.assertEqual(self.backend.load_agent(agent.animal_id).age_ticks, 5)
+        self.assertIs(cache.get(child.animal_id), child)
+
+    def test_views_copy_live_members(self):
+        agent = LifeAgent.birth()
+        agent.timeline.add_expression(1, ["Hey."])
+        agent.memory.reinforce("Hey.", valence=0.2, tick=1)
+        self.backend.save_agent(agent)
+        cache = AgentCache(self.backend)
+        live = cache.get(agent.animal_id)
+        view = cache.view(agent.animal_id, ("temperament", "memory", "timeline"))
+        self.assertEqual([entry.sentences for entry in view.timeline.expressions], [["Hey."]])
+        self.assertEqual(len(view.memory), 1)
+        # Reading the view loaded nothing into the cached agent, and ticks
+        # after the view was taken do not show through it.
+        self.assertFalse(live.timeline.is_loaded)
+        live.timeline.add_expression(2, ["Hi."])
+        live.temperament.append("odd")
+        live.memory.reinforce("Hi.", valence=0.1, tick=2)
+        self.assertEqual((len(view.timeline), len(view.memory)), (1, 1))
+        self.assertNotIn("odd", view.temperament)
+        self.assertEqual(len(live.timeline.expressions), 2)
+
+    def test_evicting_dirty_agent_saves_it(self):
+        cache = AgentCache(self.backend, max_size=1)
+        first, second = LifeAgent.birth(), LifeAgent.birth()
+        cache.add(first)
+        cache.add(second)
+        self.assertNotIn(first.animal_id, cache)
+        self.assertEqual(self.backend.load_agent(first.animal_id).slug, first.slug)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from openanimal.rng import TickRandom, np, tick_state, uniform_block
+from openanimal.world import WorldSignalStream
+
+
+class TestWorldSignalStream(unittest.TestCase):
+    def test_signals_depend_only_on_seed_and_tick(self):
+        forward = WorldSignalStream(seed=5)
+        backward = WorldSignalStream(seed=5, cache_size=4)
+        ticks = list(range(50))
+        self.assertEqual(
+            [forward.signals_for_tick(tick) for tick in ticks],
+            list(reversed([backward.signals_for_tick(tick) for tick in reversed(ticks)])),
+        )
+        self.assertLessEqual(len(backward._cache), 4)
+        self.assertNotEqual(
+            WorldSignalStream(seed=6).signals_for_tick(3).environmental_noise,
+            forward.signals_for_tick(3).environmental_noise,
+        )
+
+    def test_range_table_matches_single_ticks(self):
+        world = WorldSignalStream(seed=9)
+        table = world.signals_range(100, 140)
+        self.assertEqual(len(table), 40)
+        self.assertEqual([table.at(tick) for tick in range(100, 140)], [world.signals_for_tick(t) for t in range(100, 140)])
+
+    def test_noise_keeps_its_distribution(self):
+        table = WorldSignalStream(seed=1).signals_range(0, 20000)
+        noise = sorted(table.environmental_noise)
+        self.assertAlmostEqual(noise[len(noise) // 2], 0.35, delta=0.01)
+        self.assertTrue(all(0.0 <= value < 1.0 for value in table.randomness))
+        self.assertEqual(min(noise), 0.0)
+
+
+class TestTickRandom(unittest.TestCase):
+    def test_streams_are_keyed_by_seed_and_tick(self):
+        draws = [TickRandom(3, 10).random() for _ in range(2)]
+        self.assertEqual(draws[0], draws[1])
+        rng = TickRandom(3, 10)
+        self.assertEqual(rng.random(), draws[0])
+        self.assertNotEqual(rng.random(), draws[0])
+        # A neighbouring tick does not simply continue the same sequence.
+        self.assertNotIn(TickRandom(3, 11).random(), [TickRandom(3, 10).random() for _ in range(100)][1:])
+
+    def test_sampling_helpers(self):
+        rng = TickRandom(1, 1)
+        rolls = [rng.randint(2, 5) for _ in range(4000)]
+        self.assertEqual(set(rolls), {2, 3, 4, 5})
+        picks = rng.choices("ab", weights=[1, 3], k=4000)
+        self.assertAlmostEqual(picks.count("b") / 4000, 0.75, delta=0.03)
+        sample = rng.sample(range(10), 4)
+        self.assertEqual(len(set(sample)), 4)
+        self.assertTrue(all(0 <= value < 10 for value in sample))
+        self.assertTrue(0.5 <= rng.uniform(0.5, 0.6) < 0.6)
+        with self.assertRaises(IndexError):
+            rng.choice([])
+
+    @unittest.skipIf(np is None, "NumPy not installed")
+    def test_block_matches_sequential_draws(self):
+        starts = [tick_state(seed, 40) for seed in range(5)]
+        rows = []
+        for seed in range(5):
+            rng = TickRandom(seed, 40)
+            rows.append([rng.random() for _ in range(3)])
+        self.assertEqual(uniform_block(starts, 3).tolist(), rows)
+
+
+if __name__ == "__main__":
+    unittest.main()